@@ -0,0 +1,233 @@
+"""
+이용 현황 분석용 컬럼 스냅샷 (Parquet).
+운영 DB에서 마지막으로 내보낸 id 이후의 행과 그 사이의 취소 내역만 읽어 part 파일로 추가하고,
+방/상품/요일/월별 집계는 스냅샷을 pandas 벡터 연산으로 계산합니다. (운영 테이블과 경쟁하지 않음)
+
+    python analytics.py          # 스냅샷 갱신
+    python analytics.py rebuild  # 스냅샷 전체 재생성
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+import database
+
+SNAPSHOT_DIR = os.environ.get('ANALYTICS_DIR', 'analytics_snapshot')
+COMPRESSION = 'zstd'
+EXPORT_CHUNK_SIZE = 100000
+# part 파일이 이 개수를 넘으면 하나로 합침
+MAX_PARTS = 32
+
+WEEKDAYS = ['월', '화', '수', '목', '금', '토', '일']
+
+_lock = threading.Lock()
+_cache = None  # (refreshed_at, usage DataFrame, employees DataFrame)
+
+# 보관 DB로 옮겨진 내역까지 포함하는 뷰
+USAGE_SOURCE = database.ALL_USAGE_SOURCE
+USAGE_COLUMNS = ['id', 'emp_id', 'usage_date', 'item_name', 'quantity', 'amount', 'room_number', 'is_canceled']
+
+
+def _usage_dir():
+    return os.path.join(SNAPSHOT_DIR, 'usage')
+
+
+def _cancel_dir():
+    return os.path.join(SNAPSHOT_DIR, 'canceled')
+
+
+def _meta_path():
+    return os.path.join(SNAPSHOT_DIR, 'meta.json')
+
+
+def read_meta():
+    try:
+        with open(_meta_path(), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'last_id': 0, 'last_canceled_at': '', 'refreshed_at': None, 'generation': None}
+
+
+def _write_meta(meta):
+    tmp = _meta_path() + f'.{uuid.uuid4().hex}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, _meta_path())
+
+
+def _write_part(df, directory, prefix):
+    path = os.path.join(directory, f'{prefix}_{uuid.uuid4().hex}.parquet')
+    df.to_parquet(path, compression=COMPRESSION, index=False)
+
+
+def _normalize_usage(df):
+    df = df.astype({'id': 'int64', 'quantity': 'int64', 'amount': 'int64', 'is_canceled': 'int8'})
+    df['room_number'] = pd.to_numeric(df['room_number'], errors='coerce').astype('Int64')
+    return df
+
+
+def refresh_snapshot(full=False):
+    """
+    스냅샷 갱신. 반환: {'new_rows', 'new_cancels', 'last_id'}
+    full=True이면 기존 스냅샷을 지우고 처음부터 다시 만듭니다.
+    """
+    with _lock:
+        conn = database.get_pool().acquire()
+        try:
+            # 아래 조회(id 범위, 취소 워터마크, 사원)를 모두 같은 스냅샷에서 읽음
+            conn.execute('BEGIN')
+            # 데이터 초기화/스냅샷 복원으로 DB 내용이 바뀐 경우에는 전체 재생성
+            # (세대가 바뀌면 새 id가 예전 last_id를 넘었더라도 이전 part와 섞이지 않도록)
+            generation = database.get_data_generation(conn)
+            max_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {USAGE_SOURCE}').fetchone()[0]
+            previous = read_meta()
+            if previous.get('generation') != generation or max_id < previous['last_id']:
+                full = True
+            if full and os.path.isdir(SNAPSHOT_DIR):
+                shutil.rmtree(SNAPSHOT_DIR)
+            os.makedirs(_usage_dir(), exist_ok=True)
+            os.makedirs(_cancel_dir(), exist_ok=True)
+            meta = read_meta()
+
+            # 취소 워터마크는 먼저 읽음 (이후 취소분은 다음 갱신에서 반영)
+            last_canceled = conn.execute(
+                f'SELECT MAX(canceled_at) FROM {USAGE_SOURCE} WHERE is_canceled = 1'
+            ).fetchone()[0]
+            new_rows = 0
+            last_id = meta['last_id']
+            for chunk in pd.read_sql_query(
+                f"SELECT {', '.join(USAGE_COLUMNS)} FROM {USAGE_SOURCE} WHERE id > ? ORDER BY id",
+                conn, params=(meta['last_id'],), chunksize=EXPORT_CHUNK_SIZE
+            ):
+                if chunk.empty:
+                    continue
+                _write_part(_normalize_usage(chunk), _usage_dir(), f"usage_{int(chunk['id'].iloc[0]):012d}")
+                new_rows += len(chunk)
+                last_id = int(chunk['id'].iloc[-1])
+
+            # 이미 내보낸 행 중 지난 갱신 이후 취소된 것
+            canceled = pd.read_sql_query(
+                f'SELECT id, canceled_at FROM {USAGE_SOURCE} '
+                'WHERE is_canceled = 1 AND id <= ? AND canceled_at > ?',
+                conn, params=(meta['last_id'], meta['last_canceled_at'])
+            )
+            if len(canceled):
+                _write_part(canceled[['id']].astype('int64'), _cancel_dir(), 'canceled')
+
+            employees = pd.read_sql_query('SELECT emp_id, name FROM employees', conn)
+        finally:
+            conn.close()
+
+        employees.to_parquet(os.path.join(SNAPSHOT_DIR, 'employees.parquet'), compression=COMPRESSION, index=False)
+        meta = {
+            'generation': generation,
+            'last_id': last_id,
+            'last_canceled_at': last_canceled or meta['last_canceled_at'],
+            'refreshed_at': datetime.now(database.KST).isoformat(),
+        }
+        if len(os.listdir(_usage_dir())) + len(os.listdir(_cancel_dir())) > MAX_PARTS:
+            _compact()
+        _write_meta(meta)
+        return {'new_rows': new_rows, 'new_cancels': len(canceled), 'last_id': last_id}
+
+
+def _read_parts():
+    usage = pd.read_parquet(_usage_dir()) if os.listdir(_usage_dir()) else pd.DataFrame(columns=USAGE_COLUMNS)
+    if os.listdir(_cancel_dir()):
+        canceled_ids = pd.read_parquet(_cancel_dir())['id']
+        usage.loc[usage['id'].isin(canceled_ids), 'is_canceled'] = 1
+    # 동시 갱신으로 같은 행이 두 번 기록된 경우 대비
+    return usage.drop_duplicates('id', keep='last')
+
+
+def _compact():
+    """part 파일을 하나로 합치고 취소 내역을 반영"""
+    usage = _read_parts()
+    old_files = [os.path.join(_usage_dir(), f) for f in os.listdir(_usage_dir())]
+    old_files += [os.path.join(_cancel_dir(), f) for f in os.listdir(_cancel_dir())]
+    _write_part(usage, _usage_dir(), 'usage_compacted')
+    for path in old_files:
+        os.remove(path)
+
+
+def load_snapshot():
+    """스냅샷을 (usage, employees) DataFrame으로 반환. 갱신되지 않았으면 메모리 캐시 사용"""
+    global _cache
+    meta = read_meta()
+    if meta['refreshed_at'] is None:
+        raise FileNotFoundError('분석 스냅샷이 없습니다. 먼저 갱신해주세요.')
+    with _lock:
+        if _cache is None or _cache[0] != meta['refreshed_at']:
+            usage = _read_parts()
+            employees = pd.read_parquet(os.path.join(SNAPSHOT_DIR, 'employees.parquet'))
+            _cache = (meta['refreshed_at'], usage, employees)
+        return _cache[1], _cache[2]
+
+
+# --- 집계 ---
+
+def _active(usage, date_from=None, date_to=None):
+    mask = usage['is_canceled'] == 0
+    if date_from:
+        mask &= usage['usage_date'] >= date_from
+    if date_to:
+        mask &= usage['usage_date'] <= date_to
+    return usage[mask]
+
+
+def _summarize(df, key):
+    grouped = df.groupby(key, dropna=False).agg(
+        records=('id', 'size'), quantity=('quantity', 'sum'), amount=('amount', 'sum')
+    )
+    return [
+        {'key': None if pd.isna(k) else k, 'records': int(records), 'quantity': int(quantity), 'amount': int(amount)}
+        for k, records, quantity, amount in zip(
+            grouped.index.tolist(), grouped['records'], grouped['quantity'], grouped['amount']
+        )
+    ]
+
+
+def usage_by_room(usage, date_from=None, date_to=None):
+    return _summarize(_active(usage, date_from, date_to), 'room_number')
+
+
+def usage_by_item(usage, date_from=None, date_to=None):
+    return _summarize(_active(usage, date_from, date_to), 'item_name')
+
+
+def usage_by_weekday(usage, date_from=None, date_to=None):
+    df = _active(usage, date_from, date_to)
+    weekday = pd.to_datetime(df['usage_date'], format='%Y-%m-%d', errors='coerce').dt.dayofweek
+    result = _summarize(df.assign(weekday=weekday), 'weekday')
+    for row in result:
+        row['key'] = WEEKDAYS[int(row['key'])] if row['key'] is not None else None
+    return result
+
+
+def usage_by_month(usage, date_from=None, date_to=None):
+    df = _active(usage, date_from, date_to)
+    return _summarize(df.assign(month=df['usage_date'].str[:7]), 'month')
+
+
+def utilization_report(date_from=None, date_to=None):
+    """표준 이용 현황 집계 (방/상품/요일/월별)"""
+    usage, _ = load_snapshot()
+    return {
+        'by_room': usage_by_room(usage, date_from, date_to),
+        'by_item': usage_by_item(usage, date_from, date_to),
+        'by_weekday': usage_by_weekday(usage, date_from, date_to),
+        'by_month': usage_by_month(usage, date_from, date_to),
+        'snapshot': read_meta(),
+    }
+
+
+if __name__ == '__main__':
+    import sys
+    database.init_db()
+    result = refresh_snapshot(full=len(sys.argv) > 1 and sys.argv[1] == 'rebuild')
+    print(f"Analytics snapshot refreshed: {result}")
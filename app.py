@@ -1,18 +1,145 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash, jsonify, Response
 import os
+import csv
+import tempfile
+import threading
+import time
+import hashlib
+import json
+from functools import wraps
+from flask_limiter import Limiter
 import database
+import settings_cache
+import totals_cache
+import metrics
+import write_queue
+import name_search
+import archive
+import snapshots
+import idempotency
+import assets
+import jobs
 from datetime import datetime, timedelta
-import pandas as pd
-from io import BytesIO
+from io import BytesIO, StringIO
 
 app = Flask(__name__)
 # 보안: 환경 변수에서 SECRET_KEY를 가져오거나 기본값 사용 (배포 시 필수 변경)
 app.secret_key = os.environ.get('SECRET_KEY', 'screengolf_secret_key')
 app.permanent_session_lifetime = timedelta(minutes=60)
 
-# DB 초기화
+# DB 커넥션 풀 연결 (요청 종료 시 커넥션 반환) 및 초기화
+database.init_app(app)
 database.init_db()
 
+# 요청 계측 (경로별 응답 시간, SQL 횟수/시간/잠금 대기, 느린 요청 로그) - 요청 제한 훅보다 먼저 등록
+metrics.init_app(app)
+
+# 정적 파일 빌드(최소화·해시 파일명·사전 압축) 및 /assets/ 라우트 등록
+assets.init_app(app)
+
+# --- 요청 제한 (Rate Limit / Load Shedding) ---
+# 월말 집중 시간에 요청이 SQLite 잠금 대기(30초)로 쌓이지 않도록, 한도를 넘으면 바로 429를 반환합니다.
+# 저장소는 기본 메모리(워커별), 여러 워커가 한도를 공유하려면 RATELIMIT_STORAGE_URI=redis://... 등으로 지정
+# 한도는 system_settings의 아래 키로 변경할 수 있습니다. (예: '10 per minute', '100 per hour')
+RATE_LIMIT_DEFAULTS = {
+    'rate_limit_login_ip': '30 per minute',
+    'rate_limit_login_emp': '10 per minute',
+    'rate_limit_record_emp': '30 per minute',
+    'rate_limit_record_ip': '120 per minute',
+    'rate_limit_history_emp': '60 per minute',
+    'rate_limit_history_ip': '300 per minute',
+}
+# 프로세스당 동시에 처리할 수 있는 DB 집중 요청 수 (초과분은 잠금 대기 없이 바로 429)
+MAX_INFLIGHT_REQUESTS = int(os.environ.get('MAX_INFLIGHT_REQUESTS', 16))
+_inflight = threading.BoundedSemaphore(MAX_INFLIGHT_REQUESTS)
+
+# PythonAnywhere 프록시 뒤에서는 실제 클라이언트 IP가 X-Real-IP로 전달됨.
+# 프록시 없이 직접 받는 환경에서는 클라이언트가 헤더를 꾸며 IP별 한도를 피할 수 있으므로
+# 프록시가 헤더를 덮어쓰는 배포에서만 TRUST_PROXY_HEADERS=1로 켭니다. (기본: 접속 주소 사용)
+TRUST_PROXY_HEADERS = os.environ.get('TRUST_PROXY_HEADERS', '0') == '1'
+
+def _client_ip():
+    if TRUST_PROXY_HEADERS and request.headers.get('X-Real-IP'):
+        return request.headers['X-Real-IP']
+    return request.remote_addr or '127.0.0.1'
+
+def _employee_key():
+    return f"emp:{session.get('user_id') or _client_ip()}"
+
+def _login_emp_key():
+    return f"login:{request.form.get('emp_id') or _client_ip()}"
+
+def _limit(name):
+    """system_settings 값(없으면 기본값)을 요청 시점에 읽는 한도 제공 함수"""
+    return lambda: settings_cache.get_setting(name, RATE_LIMIT_DEFAULTS[name])
+
+limiter = Limiter(
+    key_func=_client_ip,
+    app=app,
+    storage_uri=os.environ.get('RATELIMIT_STORAGE_URI', 'memory://'),
+    strategy='fixed-window',
+)
+
+def shed_load(view):
+    """동시 처리 중인 요청이 MAX_INFLIGHT_REQUESTS를 넘으면 대기하지 않고 429 반환"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _inflight.acquire(blocking=False):
+            return _too_many_requests_response(retry_after=1)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _inflight.release()
+    return wrapper
+
+def _too_many_requests_response(retry_after=None):
+    message = '요청이 많아 잠시 후 다시 시도해주세요.'
+    if request.path.startswith('/api/'):
+        response = jsonify({'success': False, 'message': message})
+    else:
+        flash(message, 'error')
+        response = app.make_response(render_template('login.html'))
+    response.status_code = 429
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.errorhandler(429)
+def handle_rate_limit(e):
+    current = limiter.current_limit
+    retry_after = max(1, int(current.reset_at - time.time())) if current else 60
+    return _too_many_requests_response(retry_after=retry_after)
+
+# --- 조건부 GET (ETag / 304) ---
+# 템플릿이나 정적 파일이 바뀌면(배포) 대시보드 ETag도 달라지도록 시작 시점의 버전을 포함
+def _template_version():
+    digest = hashlib.sha1()
+    for name in ('base.html', 'dashboard.html'):
+        with open(os.path.join(app.root_path, 'templates', name), 'rb') as f:
+            digest.update(f.read())
+    digest.update(assets.manifest_version().encode())
+    return digest.hexdigest()[:12]
+
+_TEMPLATE_VERSION = _template_version()
+
+def _make_etag(*parts):
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest()
+
+def _not_modified(etag):
+    """If-None-Match가 현재 ETag와 같으면 304 응답 반환 (아니면 None)"""
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+def _with_etag(response, etag):
+    response = app.make_response(response)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/')
 def index():
     if 'user_id' in session:
@@ -20,6 +147,9 @@ def index():
     return render_template('login.html')
 
 @app.route('/login', methods=['POST'])
+@limiter.limit(_limit('rate_limit_login_ip'))
+@limiter.limit(_limit('rate_limit_login_emp'), key_func=_login_emp_key)
+@shed_load
 def login():
     emp_id = request.form.get('emp_id')
     password = request.form.get('password') # 사용자가 입력한 주민번호 뒷자리
@@ -61,19 +191,36 @@ def dashboard():
     emp_id = session['user_id']
     user_name = session['user_name']
     
-    # 최근 내역 조회 (최신 10건만)
-    records = database.get_usage_records(emp_id, limit=10)
+    # 이용 내역이 바뀌지 않았으면 내역 조회 없이 304 (표시할 flash 메시지가 있으면 제외)
+    # version에는 데이터 세대가 포함되어 초기화/복원 전의 ETag와 겹치지 않음
+    version = database.get_employee_data_version(emp_id)
+    etag = _make_etag('dashboard', emp_id, user_name, version, _TEMPLATE_VERSION)
+    if '_flashes' not in session:
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
     
-    # 초기 비밀번호(사번) 사용 여부 확인
-    is_default_pw = False
-    if database.verify_user(emp_id, emp_id):
-        is_default_pw = True
+    # 최근 내역(최신 10건)과 초기 비밀번호(사번) 사용 여부를 한 번에 조회
+    records, is_default_pw = database.get_dashboard_data(emp_id, limit=10)
     
-    return render_template('dashboard.html', name=user_name, records=records, show_pw_warning=is_default_pw)
+    return _with_etag(
+        render_template('dashboard.html', name=user_name, records=records, show_pw_warning=is_default_pw),
+        etag
+    )
 
 
         
+def _idempotent_response(body, replayed):
+    """멱등 키 재전송이면 Idempotent-Replayed 헤더 추가 (본문은 처음 응답과 동일)"""
+    response = jsonify(body)
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
 @app.route('/api/record', methods=['POST'])
+@limiter.limit(_limit('rate_limit_record_ip'))
+@limiter.limit(_limit('rate_limit_record_emp'), key_func=_employee_key)
+@shed_load
 def add_record():
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': '로그인이 필요합니다.'}), 401
@@ -93,7 +240,7 @@ def add_record():
         if not usage_date or not cart:
             return jsonify({'success': False, 'message': '날짜 또는 상품이 선택되지 않았습니다.'}), 400
             
-        count = 0
+        records = []
         for item in cart:
             item_name = item.get('item_name')
             quantity = int(item.get('quantity', 0))
@@ -101,13 +248,31 @@ def add_record():
             amount = price * quantity
             
             if item_name and quantity > 0:
-                database.add_usage_record(emp_id, usage_date, item_name, quantity, amount, room_number)
-                count += 1
+                records.append({
+                    'emp_id': emp_id, 'usage_date': usage_date, 'item_name': item_name,
+                    'quantity': quantity, 'amount': amount, 'room_number': room_number,
+                })
         
-        if count > 0:
-            return jsonify({'success': True, 'message': f'{count}건의 이용 내역이 등록되었습니다.'})
-        else:
+        if not records:
             return jsonify({'success': False, 'message': '등록할 유효한 상품이 없습니다.'})
+        
+        # 장바구니 전체를 한 트랜잭션으로 등록 (중간 실패 시 전체 롤백)
+        # 멱등 키가 있으면 같은 키의 재전송은 다시 등록하지 않고 처음 결과로 응답
+        try:
+            key = idempotency.get_key(request)
+            if key:
+                ids, replayed = idempotency.add_usage_records(f'record:{emp_id}', key, records)
+            else:
+                ids, replayed = write_queue.add_usage_records_batch(records), False
+        except idempotency.KeyReused as e:
+            return jsonify({'success': False, 'message': str(e)}), 422
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        if ids is None:
+            return jsonify({'success': False, 'message': '데이터베이스 오류로 등록되지 않았습니다.'}), 500
+        return _idempotent_response(
+            {'success': True, 'message': f'{len(ids)}건의 이용 내역이 등록되었습니다.', 'ids': ids}, replayed
+        )
             
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -119,20 +284,35 @@ def delete_record(record_id):
     
     emp_id = session['user_id']
     
-    if database.delete_usage_record(record_id, emp_id):
+    if write_queue.delete_usage_record(record_id, emp_id):
         return jsonify({'success': True, 'message': '이용 내역이 삭제되었습니다.'})
         return jsonify({'success': False, 'message': '삭제 실패: 존재하지 않거나 권한이 없습니다.'})
 
 @app.route('/api/history')
+@limiter.limit(_limit('rate_limit_history_ip'))
+@limiter.limit(_limit('rate_limit_history_emp'), key_func=_employee_key)
+@shed_load
 def get_user_history():
-    """사용자의 전체 이용 내역 조회 API"""
+    """사용자의 이용 내역 조회 API (키셋 페이지네이션: ?cursor=...&limit=50)"""
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': '로그인이 필요합니다.'}), 401
     
     emp_id = session['user_id']
-    # 전체 내역 조회 (충분히 큰 수로 limit 설정)
-    records = database.get_usage_records(emp_id, limit=10000)
-    return jsonify({'success': True, 'data': records})
+    cursor = request.args.get('cursor')
+    page_size = request.args.get('limit', database.HISTORY_PAGE_SIZE, type=int)
+    
+    # 이용 내역 버전(데이터 세대 포함)이 같으면 내역 조회 없이 304
+    version = database.get_employee_data_version(emp_id)
+    etag = _make_etag('history', emp_id, version, cursor, page_size)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    
+    try:
+        records, next_cursor = database.get_usage_records_page(emp_id, page_size, cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return _with_etag(jsonify({'success': True, 'data': records, 'next_cursor': next_cursor}), etag)
 
 @app.route('/change_password', methods=['GET', 'POST'])
 def change_password():
@@ -168,7 +348,7 @@ def change_password():
 def admin_login():
     if request.method == 'POST':
         password = request.form.get('password')
-        real_pw = database.get_setting('admin_password', 'admin1234')
+        real_pw = settings_cache.get_setting('admin_password', 'admin1234')
         
         if password == real_pw:
             session['is_admin'] = True
@@ -183,12 +363,36 @@ def admin_dashboard():
     if not session.get('is_admin'):
         return redirect(url_for('admin_login'))
     
-    # 검색용 파라미터 획득
+    # 검색용 파라미터 획득 (내역 목록은 페이지에서 /api/admin/records로 조회)
     search_emp_id = request.args.get('search_emp_id')
+    return render_template('admin.html', search_emp_id=search_emp_id)
+
+@app.route('/api/admin/records')
+def admin_search_records():
+    """
+    관리자 이용 내역 검색 API (보관 내역 포함, 최신순 키셋 페이지네이션).
+    ?date_from=&date_to=&item_name=&room_number=&emp_id=&name=(이름 앞부분)&status=active|canceled|all
+    &cursor=&limit=100 - 첫 페이지(cursor 없음)에는 조건 전체의 건수/수량/금액 합계를 함께 반환
+    """
+    if not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
     
-    # 최근 100건 조회 (검색 파라미터 전달)
-    records = database.get_usage_records(limit=100, search_emp_id=search_emp_id)
-    return render_template('admin.html', records=records, search_emp_id=search_emp_id)
+    cursor = request.args.get('cursor')
+    page_size = request.args.get('limit', database.ADMIN_SEARCH_PAGE_SIZE, type=int)
+    try:
+        filters = database.normalize_usage_filters(
+            request.args.get('date_from'), request.args.get('date_to'), request.args.get('item_name'),
+            request.args.get('room_number'), request.args.get('emp_id'), request.args.get('name'),
+            request.args.get('status'),
+        )
+        records, next_cursor = database.search_usage_records(filters, page_size, cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    result = {'success': True, 'data': records, 'next_cursor': next_cursor}
+    if not cursor:
+        result['totals'] = totals_cache.get_totals(filters)
+    return jsonify(result)
 
 @app.route('/admin/upload_employees', methods=['POST'])
 def admin_upload_employees():
@@ -204,18 +408,20 @@ def admin_upload_employees():
         flash('선택된 파일이 없습니다.', 'error')
         return redirect(url_for('admin_dashboard'))
         
-    if file:
-        filename = "temp_employees.xlsx"
-        file.save(filename)
-        
-        count, msg = database.upsert_employees_from_excel_file(filename)
-        if count > 0:
-            flash(f'{count}명의 사원 정보가 업데이트되었습니다.', 'success')
-        else:
-            flash(f'업데이트 실패: {msg}', 'error')
-            
+    # 파일 내용은 메모리에 두고 백그라운드 작업으로 등록 (요청은 바로 반환)
+    job_id = jobs.submit('import', _import_employees_job, file.read(), params={'filename': file.filename})
+    if job_id:
+        flash('사원 명부 가져오기 작업을 시작했습니다. 진행 상황은 작업 현황에서 확인하세요.', 'success')
+    else:
+        flash('처리 중인 작업이 많습니다. 잠시 후 다시 시도해주세요.', 'error')
     return redirect(url_for('admin_dashboard'))
 
+def _import_employees_job(ctx, data):
+    """백그라운드 작업: 업로드된 엑셀 사원 명부 등록"""
+    report = database.import_employees_from_excel(BytesIO(data), progress=ctx.report)
+    name_search.invalidate()
+    return {'message': database.format_import_report(report), **report}
+
 @app.route('/api/admin/bulk_add', methods=['POST'])
 def admin_bulk_add():
     """엑셀 붙여넣기 데이터 처리 (JSON)"""
@@ -224,15 +430,16 @@ def admin_bulk_add():
     
     try:
         data = request.json.get('data', []) # [{'emp_id': '...', 'name': '...', 'password': '...'}, ...]
-        count = 0
-        for item in data:
-            if item.get('emp_id') and item.get('name'):
-                # password가 없으면 None 전달 -> database에서 처리
-                password = item.get('password')
-                if database.upsert_employee(item['emp_id'], item['name'], password):
-                    count += 1
-        
-        return jsonify({'success': True, 'count': count, 'message': f'{count}명 등록 완료'})
+        # password가 비어 있으면 사번을 초기 비밀번호로 사용 (database에서 처리)
+        report = database.bulk_import_employees(
+            [item.get('emp_id') for item in data],
+            [item.get('name') for item in data],
+            [item.get('password') for item in data],
+        )
+        name_search.invalidate()
+        count = report['inserted']
+        message = f"{count}명 등록 완료 (중복 제외 {report['skipped']}명, 누락 {report['invalid']}건)"
+        return jsonify({'success': True, 'count': count, **report, 'message': message})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
@@ -242,20 +449,96 @@ def admin_reset_data():
     if not session.get('is_admin'):
         return jsonify({'success': False, 'message': 'Unauthorized'}), 401
     
-    success, msg = database.reset_all_data()
+    # 현재 상태를 스냅샷으로 남긴 뒤 빈 DB로 교체
+    success, msg = snapshots.reset_all_data()
+    name_search.invalidate()
     return jsonify({'success': success, 'message': msg})
 
+@app.route('/api/admin/snapshots', methods=['GET', 'POST'])
+def admin_snapshots():
+    """DB 스냅샷 목록(GET) / 생성(POST). 복원은 서버에서 python snapshots.py restore <이름>"""
+    if not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    if request.method == 'POST':
+        snapshot = snapshots.create_snapshot('manual')
+        return jsonify({'success': True, 'snapshot': snapshot})
+    return jsonify({'success': True, 'snapshots': snapshots.list_snapshots()})
+
 @app.route('/api/admin/cancel_record/<int:record_id>', methods=['POST'])
 def admin_cancel_record(record_id):
     """관리자 권한 내역 취소 API"""
     if not session.get('is_admin'):
         return jsonify({'success': False, 'message': 'Unauthorized'}), 401
     
-    if database.admin_cancel_usage_record(record_id):
+    if write_queue.admin_cancel_usage_record(record_id):
         return jsonify({'success': True, 'message': '이용 내역이 관리자 권한으로 삭제(취소)되었습니다.'})
     else:
         return jsonify({'success': False, 'message': '삭제 실패: 존재하지 않는 내역이거나 권한이 없습니다.'})
 
+@app.route('/api/admin/monthly_summary')
+def admin_monthly_summary():
+    """월별 사원 공제 합계 조회 API (?month=YYYY-MM, 기본값: 이번 달)"""
+    if not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    month = request.args.get('month') or datetime.now(database.KST).strftime('%Y-%m')
+    try:
+        datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        return jsonify({'success': False, 'message': '월 형식이 올바르지 않습니다. (YYYY-MM)'}), 400
+    
+    billing = database.get_monthly_billing(month)
+    return jsonify({
+        'success': True,
+        'month': month,
+        'data': billing,
+        'total_amount': sum(entry['amount'] for entry in billing),
+    })
+
+@app.route('/api/admin/analytics')
+def admin_analytics():
+    """이용 현황 분석 API (?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD, 스냅샷 기준)"""
+    if not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    import analytics  # pandas/pyarrow를 쓰므로 분석 화면에서만 로드
+    date_from = request.args.get('date_from') or None
+    date_to = request.args.get('date_to') or None
+    try:
+        with metrics.section('pandas'):
+            report = analytics.utilization_report(date_from, date_to)
+    except FileNotFoundError as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+    return jsonify({'success': True, **report})
+
+@app.route('/api/admin/analytics/refresh', methods=['POST'])
+def admin_analytics_refresh():
+    """분석 스냅샷 갱신 (마지막으로 내보낸 id 이후만 추가)"""
+    if not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    import analytics
+    with metrics.section('pandas'):
+        result = analytics.refresh_snapshot()
+    return jsonify({'success': True, **result})
+
+@app.route('/api/admin/archive', methods=['GET', 'POST'])
+def admin_archive():
+    """보관 현황 조회(GET) / 지난 연도·오래된 취소 내역 보관 처리(POST)"""
+    if not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    result = archive.archive_records() if request.method == 'POST' else {}
+    return jsonify({'success': True, **result, **archive.archive_stats()})
+
+@app.route('/admin/metrics')
+def admin_metrics():
+    """Prometheus 형식 메트릭 (관리자 세션 또는 METRICS_TOKEN 필요)"""
+    if not session.get('is_admin') and not metrics.authorized_by_token():
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/admin/search_user', methods=['POST'])
 def admin_search_user():
     """관리자 대리 등록용 사용자 검색 (이름)"""
@@ -269,7 +552,8 @@ def admin_search_user():
         if not name:
              return jsonify({'success': False, 'message': '이름을 입력해주세요.'})
 
-        users = database.find_employees_by_name(name)
+        # 이름 부분 일치 또는 초성(예: ㅎㄱㄷ) 검색, 순위순 상위 결과만 반환
+        users = name_search.search(name)
         if users:
             return jsonify({'success': True, 'users': users}) # results: [{'emp_id':..., 'name':...}, ...]
         else:
@@ -277,6 +561,9 @@ def admin_search_user():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+# 관리자 대리 등록 상품 가격
+ADMIN_ITEM_PRICES = {'9홀': 2000, '18홀': 4000}
+
 @app.route('/api/admin/add_usage', methods=['POST'])
 def admin_add_usage():
     """관리자 대리 실적 등록"""
@@ -292,41 +579,371 @@ def admin_add_usage():
         room_number = data.get('room_number')
         
         # 상품 가격 결정
-        amount = 0
-        if item_name == '9홀':
-            amount = 2000 * quantity
-        elif item_name == '18홀':
-            amount = 4000 * quantity
+        amount = ADMIN_ITEM_PRICES.get(item_name, 0) * quantity
             
-        if database.add_usage_record(emp_id, usage_date, item_name, quantity, amount, room_number):
-            return jsonify({'success': True, 'message': '등록되었습니다.'})
+        records = [{
+            'emp_id': emp_id, 'usage_date': usage_date, 'item_name': item_name,
+            'quantity': quantity, 'amount': amount, 'room_number': room_number,
+        }]
+        try:
+            key = idempotency.get_key(request)
+            if key:
+                ids, replayed = idempotency.add_usage_records('admin_add_usage', key, records)
+            else:
+                ids, replayed = write_queue.add_usage_records_batch(records), False
+        except idempotency.KeyReused as e:
+            return jsonify({'success': False, 'message': str(e)}), 422
+        if ids:
+            return _idempotent_response({'success': True, 'message': '등록되었습니다.', 'ids': ids}, replayed)
         else:
             return jsonify({'success': False, 'message': '데이터베이스 오류'})
             
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+def _parse_batch_registration(item):
+    """일괄 대리 등록 항목 검사 -> add_usage_records_batch 형식 dict. 잘못되면 ValueError"""
+    if not isinstance(item, dict):
+        raise ValueError('잘못된 항목입니다.')
+    emp_id = str(item.get('emp_id') or '').strip()
+    usage_date = item.get('usage_date')
+    item_name = item.get('item_name')
+    if not emp_id:
+        raise ValueError('사번이 없습니다.')
+    try:
+        datetime.strptime(usage_date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError('날짜 형식이 올바르지 않습니다. (YYYY-MM-DD)')
+    if item_name not in ADMIN_ITEM_PRICES:
+        raise ValueError(f'알 수 없는 상품입니다: {item_name}')
+    try:
+        quantity = int(item.get('quantity', 1))
+    except (TypeError, ValueError):
+        quantity = 0
+    if quantity < 1:
+        raise ValueError('수량은 1 이상이어야 합니다.')
+    # 방 번호는 선택 항목 (화면에서는 '1'/'2' 문자열로 옴). 목록/객체 등은 항목 오류로 보고
+    room_number = item.get('room_number')
+    if room_number is None or room_number == '':
+        room_number = None
+    else:
+        try:
+            if isinstance(room_number, bool) or not isinstance(room_number, (int, str)):
+                raise ValueError
+            room_number = int(room_number)
+        except ValueError:
+            room_number = 0
+        if room_number < 1:
+            raise ValueError('방 번호가 올바르지 않습니다.')
+    return {
+        'emp_id': emp_id, 'usage_date': usage_date, 'item_name': item_name, 'quantity': quantity,
+        'amount': ADMIN_ITEM_PRICES[item_name] * quantity, 'room_number': room_number,
+    }
+
+@app.route('/api/admin/batch', methods=['POST'])
+def admin_batch():
+    """
+    관리자 일괄 취소/대리 등록 (하나의 트랜잭션: 모두 성공하면 반영, 하나라도 실패하면 모두 취소)
+    JSON: {'cancels': [내역 id, ...],
+           'registrations': [{'emp_id', 'usage_date', 'item_name', 'quantity', 'room_number'}, ...],
+           'dry_run': true이면 실행해 본 뒤 되돌림}
+    항목별 결과: results = [{'type': 'cancel'|'register', 'index', 'success', 'message', 'id'}, ...]
+    """
+    if not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    cancels = data.get('cancels') or []
+    registrations = data.get('registrations') or []
+    dry_run = bool(data.get('dry_run'))
+    if not isinstance(cancels, list) or not isinstance(registrations, list):
+        return jsonify({'success': False, 'message': '잘못된 요청입니다.'}), 400
+    if not cancels and not registrations:
+        return jsonify({'success': False, 'message': '처리할 항목이 없습니다.'}), 400
+    if len(cancels) + len(registrations) > database.ADMIN_BATCH_MAX_ITEMS:
+        return jsonify({
+            'success': False, 'message': f'한 번에 {database.ADMIN_BATCH_MAX_ITEMS}건까지 처리할 수 있습니다.'
+        }), 400
+    
+    # 형식 오류가 있는 항목은 결과에만 남기고, 나머지는 DB에서 실행해 본 결과를 함께 알려줌 (이 경우 커밋하지 않음)
+    results = []
+    cancel_ids, cancel_results = [], []
+    for index, value in enumerate(cancels):
+        result = {'type': 'cancel', 'index': index}
+        if isinstance(value, int) and not isinstance(value, bool):
+            result['id'] = value
+            cancel_ids.append(value)
+            cancel_results.append(result)
+        else:
+            result.update(success=False, message='내역 번호가 올바르지 않습니다.')
+        results.append(result)
+    records, record_results = [], []
+    for index, item in enumerate(registrations):
+        result = {'type': 'register', 'index': index}
+        try:
+            records.append(_parse_batch_registration(item))
+            record_results.append(result)
+        except ValueError as e:
+            result.update(success=False, message=str(e))
+        results.append(result)
+    
+    commit = not dry_run and len(cancel_ids) == len(cancels) and len(records) == len(registrations)
+    try:
+        committed, canceled, new_ids = database.admin_apply_batch(cancel_ids, records, commit)
+    except Exception as e:
+        print(f"Error applying admin batch: {e}")
+        return jsonify({'success': False, 'message': '데이터베이스 오류로 처리되지 않았습니다.'}), 500
+    
+    for result, ok in zip(cancel_results, canceled):
+        result.update(success=ok, message='취소' if ok else '존재하지 않거나 이미 취소된 내역입니다.')
+    for result, record_id in zip(record_results, new_ids):
+        result.update(success=record_id is not None, message='등록' if record_id is not None else '사원 명부에 없는 사번입니다.')
+        if committed:
+            result['id'] = record_id
+    
+    failed = sum(1 for result in results if not result['success'])
+    if failed:
+        message = f'{failed}건에 오류가 있어 전체를 처리하지 않았습니다.'
+    elif dry_run:
+        message = f'확인 완료: {len(results)}건 모두 처리할 수 있습니다. (아직 반영되지 않음)'
+    else:
+        message = f'취소 {len(cancels)}건, 등록 {len(registrations)}건이 처리되었습니다.'
+    return jsonify({
+        'success': failed == 0, 'dry_run': dry_run, 'committed': committed, 'message': message, 'results': results,
+    })
+
+def _write_usage_xlsx(chunks, output=None, columns=database.EXPORT_COLUMNS):
+    """
+    openpyxl write-only 모드로 행을 바로 기록한 파일 반환 (워크북 전체를 메모리에 두지 않음)
+    output을 주지 않으면 임시 파일에 씁니다.
+    """
+    from openpyxl import Workbook  # 워커 시작을 늦추지 않도록 내보낼 때만 로드
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('이용내역')
+    ws.append(columns)
+    for chunk in chunks:
+        for row in chunk:
+            ws.append(row)
+    if output is None:
+        output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+    return output
+
+def _generate_usage_csv(chunks, columns=database.EXPORT_COLUMNS):
+    """chunk 단위로 CSV 텍스트를 만들어 바로 내보내는 제너레이터"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    # 엑셀에서 한글이 깨지지 않도록 BOM 추가
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def _parse_export_args(args):
+    """내보내기 조건 (date_from, date_to, status, format) 검사. 잘못되면 ValueError"""
+    export_format = args.get('format') or 'xlsx'
+    date_from = args.get('date_from') or None
+    date_to = args.get('date_to') or None
+    status = args.get('status') or None
+    try:
+        for value in (date_from, date_to):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError('날짜 형식이 올바르지 않습니다. (YYYY-MM-DD)')
+    if status not in (None, 'active', 'canceled') or export_format not in ('xlsx', 'csv'):
+        raise ValueError('잘못된 다운로드 조건입니다.')
+    return date_from, date_to, status, export_format
+
+def _export_filename(date_from, date_to, export_format):
+    period = ''
+    if date_from or date_to:
+        period = f"_{(date_from or '').replace('-', '')}-{(date_to or '').replace('-', '')}"
+    return f"ScreenGolf_Usage{period}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+
+EXPORT_MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+}
+
+def _export_usage_job(ctx, date_from, date_to, status, export_format):
+    """백그라운드 작업: 이용 내역 파일 생성 (진행률은 조건의 전체 건수 기준)"""
+    total = database.get_usage_totals(
+        database.normalize_usage_filters(date_from, date_to, status=status or 'all')
+    )['records']
+    done = 0
+    
+    def chunks():
+        nonlocal done
+        for chunk in database.iter_usage_export_rows(date_from, date_to, status):
+            yield chunk
+            done += len(chunk)
+            ctx.report(done, total)
+    
+    path = ctx.output_path(_export_filename(date_from, date_to, export_format), EXPORT_MIMETYPES[export_format])
+    with open(path, 'wb') as output:
+        if export_format == 'csv':
+            for data in _generate_usage_csv(chunks()):
+                output.write(data)
+        else:
+            _write_usage_xlsx(chunks(), output)
+    ctx.report(done, done)
+    return {'message': f'{done:,}건을 내보냈습니다.', 'rows': done}
+
+@app.route('/api/admin/jobs', methods=['GET', 'POST'])
+def admin_jobs():
+    """백그라운드 작업 목록(GET) / 내보내기 작업 등록(POST: date_from, date_to, status, format)"""
+    if not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    if request.method == 'GET':
+        return jsonify({'success': True, 'jobs': jobs.list_jobs()})
+    
+    args = request.get_json(silent=True) or request.form
+    try:
+        date_from, date_to, status, export_format = _parse_export_args(args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    params = {'date_from': date_from, 'date_to': date_to, 'status': status, 'format': export_format}
+    job_id = jobs.submit('export', _export_usage_job, date_from, date_to, status, export_format, params=params)
+    if not job_id:
+        return jsonify({'success': False, 'message': '처리 중인 작업이 많습니다. 잠시 후 다시 시도해주세요.'}), 503
+    return jsonify({'success': True, 'job': jobs.get_job(job_id)})
+
+@app.route('/api/admin/jobs/<job_id>')
+def admin_job_status(job_id):
+    """작업 상태/진행률 조회 (폴링용)"""
+    if not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': '작업을 찾을 수 없습니다.'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/admin/jobs/<job_id>/download')
+def admin_job_download(job_id):
+    """완료된 작업의 결과 파일 다운로드"""
+    if not session.get('is_admin'):
+        return redirect(url_for('admin_login'))
+    
+    result = jobs.result_file(job_id)
+    if result is None:
+        flash('결과 파일이 없거나 보관 기간이 지났습니다.', 'error')
+        return redirect(url_for('admin_dashboard'))
+    path, filename, mimetype = result
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=filename, mimetype=mimetype)
+
 @app.route('/admin/download')
 def admin_download():
+    """
+    이용 내역 다운로드.
+    ?format=xlsx|csv, ?date_from=YYYY-MM-DD, ?date_to=YYYY-MM-DD, ?status=active|canceled
+    """
     if not session.get('is_admin'):
         return redirect(url_for('admin_login'))
-        
-    df = database.get_all_usage_records_df()
     
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='이용내역')
-    output.seek(0)
+    try:
+        date_from, date_to, status, export_format = _parse_export_args(request.args)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin_dashboard'))
     
-    filename = f"ScreenGolf_Usage_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    chunks = database.iter_usage_export_rows(date_from, date_to, status)
+    filename = _export_filename(date_from, date_to, export_format)
     
+    if export_format == 'csv':
+        return Response(
+            _generate_usage_csv(chunks),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    
+    with metrics.section('openpyxl'):
+        output = _write_usage_xlsx(chunks)
     return send_file(
         output,
         as_attachment=True,
         download_name=filename,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        mimetype=EXPORT_MIMETYPES['xlsx']
     )
 
+@app.route('/admin/delta_download')
+def admin_delta_download():
+    """
+    급여 연동용 변경분 다운로드: 사용처의 지난 다운로드 이후 등록/취소된 내역만 내려받습니다.
+    ?consumer=payroll, ?format=xlsx|csv, ?advance=0 이면 워터마크를 옮기지 않음 (미리보기)
+    파일을 끝까지 만든 뒤 워터마크를 옮기므로, 만드는 도중 실패하면 다음에 같은 변경분을 다시 받습니다.
+    """
+    if not session.get('is_admin'):
+        return redirect(url_for('admin_login'))
+    
+    export_format = request.args.get('format') or 'xlsx'
+    try:
+        consumer = database.normalize_delta_consumer(request.args.get('consumer'))
+        if export_format not in EXPORT_MIMETYPES:
+            raise ValueError('잘못된 다운로드 조건입니다.')
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    since, until, chunks = database.open_delta_export(consumer)
+    rows = 0
+    
+    def counted():
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+    
+    # 워터마크를 옮기기 전에 파일을 다 만들어야 하므로 CSV도 스트리밍하지 않고 임시 파일에 씀
+    if export_format == 'csv':
+        output = tempfile.TemporaryFile()
+        for data in _generate_usage_csv(counted(), database.DELTA_EXPORT_COLUMNS):
+            output.write(data)
+        output.seek(0)
+    else:
+        with metrics.section('openpyxl'):
+            output = _write_usage_xlsx(counted(), columns=database.DELTA_EXPORT_COLUMNS)
+    
+    if request.args.get('advance') != '0' and not database.advance_delta_watermark(consumer, since, until):
+        output.close()
+        flash('같은 사용처의 변경분을 다른 곳에서 먼저 내려받았습니다. 다시 시도해주세요.', 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    filename = f"ScreenGolf_Delta_{consumer}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    response = send_file(output, as_attachment=True, download_name=filename, mimetype=EXPORT_MIMETYPES[export_format])
+    # 자동 연동 스크립트용: 내보낸 건수와 새 워터마크
+    response.headers['X-Delta-Rows'] = str(rows)
+    response.headers['X-Delta-Watermark'] = json.dumps(until)
+    return response
+
+@app.route('/api/admin/delta_watermarks', methods=['GET', 'POST'])
+def admin_delta_watermarks():
+    """
+    사용처별 변경분 다운로드 워터마크 조회(GET) / 초기화(POST: consumer, mode)
+    mode: 'full'(다음 다운로드는 전체 내역) / 'now'(지금 이후 변경분부터)
+    """
+    if not session.get('is_admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or request.form
+        try:
+            consumer = database.normalize_delta_consumer(data.get('consumer'))
+            if data.get('mode') not in ('full', 'now'):
+                raise ValueError('초기화 방식(full/now)을 지정해주세요.')
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        database.reset_delta_watermark(consumer, from_now=data.get('mode') == 'now')
+    return jsonify({'success': True, 'watermarks': database.get_delta_watermarks()})
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
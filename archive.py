@@ -0,0 +1,161 @@
+"""
+이용 내역 보관(archive) 처리.
+마감된 지난 연도 내역과 취소된 지 오래된 내역을 hot 테이블(usage_records)에서
+보관 DB(<DB 이름>_archive.db, 커넥션마다 'archive'로 ATTACH)로 ARCHIVE_BATCH_SIZE건씩 옮깁니다.
+
+한 배치는 두 단계로 처리합니다.
+1) 보관 DB에 복사 후 커밋 (hot 테이블은 읽기만 하므로 등록/취소 요청을 막지 않음)
+2) BEGIN IMMEDIATE로 복사본과 같은 상태인 행만 hot 테이블에서 삭제하고 보관 경계(최대 이용일자)를 갱신
+WAL 모드에서 여러 DB 파일에 걸친 트랜잭션은 파일 단위로만 원자적이므로, 중간에 중단되어도
+행이 양쪽에 모두 남을 뿐(조회 시 hot 쪽 사용) 사라지지는 않습니다. 다시 실행하면 이어서 처리합니다.
+
+    python archive.py            # 보관 처리
+    python archive.py --dry-run  # 옮길 건수만 확인
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import database
+
+# 올해를 포함해 hot 테이블에 남길 연도 수 (1이면 작년까지의 내역을 보관)
+KEEP_YEARS = int(os.environ.get('ARCHIVE_KEEP_YEARS', 1))
+# 취소된 지 이 일수가 지난 내역은 연도와 관계없이 보관
+CANCELED_AFTER_DAYS = int(os.environ.get('ARCHIVE_CANCELED_AFTER_DAYS', 30))
+BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 2000))
+# 배치 사이 쉬는 시간 (다른 요청이 쓰기 잠금을 얻을 틈)
+BATCH_PAUSE = float(os.environ.get('ARCHIVE_BATCH_PAUSE', 0.05))
+
+
+def archive_cutoffs(now=None, keep_years=KEEP_YEARS, canceled_after_days=CANCELED_AFTER_DAYS):
+    """(이용일자 기준일, 취소일시 기준) - 이용일자가 기준일 이전이거나 취소일시가 기준 이전이면 보관 대상"""
+    now = now or datetime.now(database.KST)
+    closed_before = f"{now.year - keep_years + 1:04d}-01-01"
+    canceled_before = str(now - timedelta(days=canceled_after_days))
+    return closed_before, canceled_before
+
+
+def _select_batch(conn, closed_before, canceled_before, batch_size):
+    ids = [row[0] for row in conn.execute(
+        'SELECT id FROM usage_records WHERE usage_date < ? ORDER BY usage_date LIMIT ?',
+        (closed_before, batch_size)
+    ).fetchall()]
+    if len(ids) < batch_size:
+        ids += [row[0] for row in conn.execute(
+            'SELECT id FROM usage_records WHERE is_canceled = 1 AND usage_date >= ? AND canceled_at < ? LIMIT ?',
+            (closed_before, canceled_before, batch_size - len(ids))
+        ).fetchall()]
+    return ids
+
+
+def count_candidates(closed_before, canceled_before):
+    """보관 대상 건수 (dry-run용)"""
+    conn = database.get_pool().acquire()
+    try:
+        return conn.execute(
+            'SELECT COUNT(*) FROM usage_records WHERE usage_date < ? '
+            'OR (is_canceled = 1 AND canceled_at < ?)',
+            (closed_before, canceled_before)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _move_batch(conn, ids):
+    """ids를 보관 DB로 옮기고 hot 테이블에서 삭제된 건수를 반환"""
+    marks = ','.join('?' * len(ids))
+    columns = database.USAGE_RECORD_COLUMNS
+
+    # 1) 복사: 보관 DB에만 쓰기 잠금 (이전 실행에서 남은 복사본은 최신 상태로 덮어씀)
+    conn.execute('BEGIN')
+    conn.execute(
+        f'INSERT OR REPLACE INTO archive.usage_records ({columns}) '
+        f'SELECT {columns} FROM main.usage_records WHERE id IN ({marks})',
+        ids
+    )
+    conn.commit()
+
+    # 2) 삭제: 복사 이후 취소된 행은 상태가 달라졌으므로 남겨 두고 다음 실행에서 다시 복사
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        before = conn.total_changes
+        conn.execute(f'''
+            DELETE FROM main.usage_records
+            WHERE id IN ({marks}) AND EXISTS (
+                SELECT 1 FROM archive.usage_records a
+                WHERE a.id = usage_records.id AND a.is_canceled IS usage_records.is_canceled
+            )
+        ''', ids)
+        deleted = conn.total_changes - before
+        row = conn.execute(
+            f'SELECT MAX(usage_date), MAX(CASE WHEN is_canceled = 0 THEN usage_date END) '
+            f'FROM archive.usage_records WHERE id IN ({marks})',
+            ids
+        ).fetchone()
+        # 조회 함수가 보관 DB를 읽을지 판단하는 경계 (기존 값보다 클 때만 갱신)
+        for key, value in ((database.ARCHIVE_MAX_DATE_KEY, row[0]), (database.ARCHIVE_MAX_ACTIVE_DATE_KEY, row[1])):
+            if value is not None:
+                conn.execute('''
+                    INSERT INTO system_settings (key, value) VALUES (?, ?)
+                    ON CONFLICT (key) DO UPDATE SET value = MAX(value, excluded.value)
+                ''', (key, value))
+        conn.commit()
+        return deleted
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def archive_records(keep_years=KEEP_YEARS, canceled_after_days=CANCELED_AFTER_DAYS,
+                    batch_size=BATCH_SIZE, pause=BATCH_PAUSE, max_batches=None):
+    """
+    보관 대상 내역을 배치 단위로 옮깁니다.
+    반환: {'moved', 'batches', 'closed_before', 'canceled_before'}
+    """
+    closed_before, canceled_before = archive_cutoffs(None, keep_years, canceled_after_days)
+    moved = 0
+    batches = 0
+    conn = database.get_pool().acquire()
+    try:
+        while max_batches is None or batches < max_batches:
+            ids = _select_batch(conn, closed_before, canceled_before, batch_size)
+            if not ids:
+                break
+            deleted = _move_batch(conn, ids)
+            moved += deleted
+            batches += 1
+            if deleted == 0:
+                # 모두 복사 도중 변경된 행: 다음 실행에서 다시 시도
+                break
+            time.sleep(pause)
+    finally:
+        conn.close()
+    return {'moved': moved, 'batches': batches, 'closed_before': closed_before, 'canceled_before': canceled_before}
+
+
+def archive_stats():
+    """hot/보관 DB 건수와 보관 경계"""
+    conn = database.get_pool().acquire()
+    try:
+        hot = conn.execute('SELECT COUNT(*) FROM main.usage_records').fetchone()[0]
+        archived = conn.execute('SELECT COUNT(*) FROM archive.usage_records').fetchone()[0]
+        return {
+            'hot_records': hot,
+            'archived_records': archived,
+            'archive_max_date': database._archive_boundary(conn, active_only=False),
+            'archive_max_active_date': database._archive_boundary(conn, active_only=True),
+        }
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import sys
+    database.init_db()
+    if '--dry-run' in sys.argv[1:]:
+        closed_before, canceled_before = archive_cutoffs()
+        print(f"Archive candidates (usage_date < {closed_before} or canceled before {canceled_before}): "
+              f"{count_candidates(closed_before, canceled_before)}")
+    else:
+        print(f"Archive finished: {archive_records()}")
+        print(f"Archive stats: {archive_stats()}")
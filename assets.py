@@ -0,0 +1,157 @@
+"""
+정적 파일(CSS/JS) 빌드 및 서빙.
+원본(static/css, static/js)을 최소화하고 내용 해시를 붙인 파일명으로 static/dist에 저장한 뒤
+gzip(및 brotli 모듈이 있으면 br)으로 미리 압축해 둡니다.
+해시가 붙은 파일은 내용이 바뀌면 이름도 바뀌므로 1년 immutable 캐시로 내려보냅니다.
+빌드 후 manifest가 가리키지 않는 이전 해시 파일은 지웁니다.
+
+    python assets.py   # 수동 빌드 (앱 시작 시에도 변경된 파일만 자동 빌드)
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import uuid
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성: 없으면 gzip만 생성
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(SOURCE_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+ASSETS = [
+    'css/style.css',
+    'css/dashboard.css',
+    'js/idempotency.js',
+    'js/dashboard.js',
+    'js/admin.js',
+]
+CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+_manifest = {}
+
+
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    """
+    보수적인 JS 최소화: 줄 단위 주석·들여쓰기·빈 줄만 제거합니다.
+    (줄바꿈은 유지하므로 세미콜론 자동 삽입 동작이 바뀌지 않음)
+    """
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path, data):
+    tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets():
+    """변경된 원본만 다시 빌드하고 manifest({원본 경로: 해시 파일 경로})를 반환"""
+    global _manifest
+    manifest = {}
+    for path in ASSETS:
+        with open(os.path.join(SOURCE_DIR, path), encoding='utf-8') as f:
+            source = f.read()
+        minified = minify_css(source) if path.endswith('.css') else minify_js(source)
+        data = minified.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, ext = os.path.splitext(path)
+        built = f'{stem}.{digest}{ext}'
+        target = os.path.join(DIST_DIR, built)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write_atomic(target + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write_atomic(target + '.br', brotli.compress(data, quality=11))
+            _write_atomic(target, data)
+        manifest[path] = built
+
+    current = None
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH, encoding='utf-8') as f:
+            current = json.load(f)
+    if current != manifest:
+        _write_atomic(MANIFEST_PATH, json.dumps(manifest, indent=2).encode('utf-8'))
+    _remove_stale(manifest)
+    _manifest = manifest
+    return manifest
+
+
+def _remove_stale(manifest):
+    """manifest가 가리키지 않는 이전 빌드의 해시 파일(.gz/.br 포함) 삭제"""
+    for path, built in manifest.items():
+        stem, ext = os.path.splitext(os.path.basename(path))
+        pattern = re.compile(rf'{re.escape(stem)}\.[0-9a-f]{{12}}{re.escape(ext)}(\.gz|\.br)?$')
+        directory = os.path.join(DIST_DIR, os.path.dirname(path))
+        keep = {os.path.basename(built) + suffix for suffix in ('', '.gz', '.br')}
+        for name in os.listdir(directory):
+            if pattern.match(name) and name not in keep:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:  # 다른 워커가 먼저 지움
+                    pass
+
+
+def manifest_version():
+    """빌드 결과 전체를 대표하는 짧은 해시 (페이지 ETag 등에 사용)"""
+    return hashlib.sha1(json.dumps(_manifest, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def asset_url(path):
+    """템플릿용: 빌드된 해시 파일 URL (빌드 전이면 원본 static URL)"""
+    built = _manifest.get(path)
+    if built is None:
+        return url_for('static', filename=path)
+    return url_for('serve_asset', filename=built)
+
+
+def serve_asset(filename):
+    """해시 파일 서빙: Accept-Encoding에 따라 미리 압축한 br/gz 파일을 그대로 전송"""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    name, encoding = filename, None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in request.accept_encodings and os.path.exists(os.path.join(DIST_DIR, filename + suffix)):
+            name, encoding = filename + suffix, candidate
+            break
+
+    response = send_from_directory(DIST_DIR, name, mimetype=mimetype, max_age=CACHE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    build_assets()
+    app.add_url_rule('/assets/<path:filename>', 'serve_asset', serve_asset)
+    app.context_processor(lambda: {'asset_url': asset_url})
+
+
+if __name__ == '__main__':
+    for source, built in build_assets().items():
+        print(f'{source} -> dist/{built}')
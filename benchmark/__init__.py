@@ -0,0 +1,14 @@
+"""
+부하/지연 시간 벤치마크.
+
+    python -m benchmark generate --db bench.db --employees 10000 --records 2000000
+    python -m benchmark run --db bench.db --mode client --concurrency 8 --duration 60
+    python -m benchmark run --db bench.db --mode server --concurrency 16 --out before.json
+    python -m benchmark startup --db bench.db --runs 10
+    python -m benchmark compare before.json after.json
+
+- datagen: 시드 고정 합성 데이터 생성 (database.py의 등록 함수 사용)
+- workload: 로그인/대시보드/장바구니 등록/내역/관리자 목록/내보내기/가져오기 혼합 부하
+- startup: 새 프로세스에서 app import와 첫 요청까지의 시간 측정
+- 결과는 경로별 p50/p95/p99 지연 시간(ms)과 처리량(req/s)을 담은 JSON
+"""
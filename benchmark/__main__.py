@@ -0,0 +1,153 @@
+"""
+벤치마크 CLI.
+
+    python -m benchmark generate [--db bench.db] [--employees 10000] [--records 2000000] [--seed 42]
+    python -m benchmark run [--db bench.db] [--mode client|server] [--concurrency 8] [--duration 30]
+                            [--requests N] [--mix dashboard=30,history=25,...] [--rate-limits] [--out FILE]
+    python -m benchmark startup [--db bench.db] [--runs 10] [--out FILE]
+    python -m benchmark compare BEFORE.json AFTER.json
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import database
+from benchmark import datagen, startup, workload
+
+DEFAULT_DB = 'bench.db'
+RESULTS_DIR = 'benchmark_results'
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in workload.MIX:
+            raise argparse.ArgumentTypeError(f"알 수 없는 작업: {name} (가능: {', '.join(workload.MIX)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def _print_summary(result):
+    print(f"{'작업':<12} {'경로':<26} {'건수':>7} {'오류':>5} {'429':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8}")
+    rows = list(result['routes'].items()) + [('total', {'route': '', **result['total']})]
+    for name, r in rows:
+        print(
+            f"{name:<12} {r['route']:<26} {r['count']:>7} {r['errors']:>5} {r['shed']:>5} "
+            f"{r['p50_ms'] or 0:>9.2f} {r['p95_ms'] or 0:>9.2f} {r['p99_ms'] or 0:>9.2f} {r['throughput_rps']:>8.1f}"
+        )
+
+
+def cmd_generate(args):
+    if os.path.exists(args.db) and not args.append:
+        print(f"{args.db} 파일이 이미 있습니다. 덮어쓰려면 먼저 삭제하거나 --append를 지정하세요.")
+        return 1
+    database.DB_NAME = args.db
+    print(f"Generating synthetic data into {args.db} ...")
+    report = datagen.generate(args.employees, args.records, args.seed, args.months, args.cancel_ratio)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_run(args):
+    if not os.path.exists(args.db):
+        print(f"{args.db} 파일이 없습니다. 먼저 python -m benchmark generate 를 실행하세요.")
+        return 1
+    # app import 전에 DB 경로를 바꿔야 init_db/커넥션 풀이 벤치마크 DB를 사용
+    database.DB_NAME = args.db
+    result = workload.run_benchmark(
+        mode=args.mode, concurrency=args.concurrency, duration=args.duration, requests=args.requests,
+        seed=args.seed, mix=args.mix, rate_limits=args.rate_limits, warmup=args.warmup,
+    )
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{args.mode}_c{args.concurrency}.json"
+    )
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    _print_summary(result)
+    print(f"Result saved: {out}")
+    return 0
+
+
+def cmd_startup(args):
+    if not os.path.exists(args.db):
+        print(f"{args.db} 파일이 없습니다. 먼저 python -m benchmark generate 를 실행하세요.")
+        return 1
+    database.DB_NAME = args.db
+    result = startup.run_startup_benchmark(args.runs)
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_startup.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"{'구간':<16} {'측정':<28} {'min':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+    for name, r in result['routes'].items():
+        print(f"{name:<16} {r['route']:<28} {r['min_ms']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['max_ms']:>9.1f}")
+    print(f"시작 시 로드된 무거운 모듈: {', '.join(result['heavy_modules_loaded']) or '없음'}")
+    print(f"Result saved: {out}")
+    return 0
+
+
+def cmd_compare(args):
+    with open(args.before, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(args.after, encoding='utf-8') as f:
+        after = json.load(f)
+    print(f"before: {before['meta'].get('git_commit')} {before['meta']['started_at']} ({before['meta']['mode']})")
+    print(f"after:  {after['meta'].get('git_commit')} {after['meta']['started_at']} ({after['meta']['mode']})")
+    for name, metrics in workload.compare(before, after).items():
+        cells = []
+        for metric, (a, b, change) in metrics.items():
+            change_text = f"{change:+.1f}%" if change is not None else 'n/a'
+            cells.append(f"{metric}: {a} -> {b} ({change_text})")
+        print(f"{name:<12} " + ' | '.join(cells))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='스크린골프 이용 관리 벤치마크')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help='합성 데이터 생성')
+    gen.add_argument('--db', default=DEFAULT_DB)
+    gen.add_argument('--employees', type=int, default=10000)
+    gen.add_argument('--records', type=int, default=2000000)
+    gen.add_argument('--seed', type=int, default=42)
+    gen.add_argument('--months', type=int, default=12)
+    gen.add_argument('--cancel-ratio', type=float, default=0.02)
+    gen.add_argument('--append', action='store_true', help='기존 DB에 추가')
+    gen.set_defaults(func=cmd_generate)
+
+    run = sub.add_parser('run', help='혼합 부하 실행')
+    run.add_argument('--db', default=DEFAULT_DB)
+    run.add_argument('--mode', choices=['client', 'server'], default='client')
+    run.add_argument('--concurrency', type=int, default=8)
+    run.add_argument('--duration', type=float, default=30.0, help='측정 시간(초)')
+    run.add_argument('--warmup', type=float, default=2.0, help='집계에서 제외할 시작 구간(초)')
+    run.add_argument('--requests', type=int, default=None, help='워커당 요청 수 (지정 시 --duration 무시)')
+    run.add_argument('--seed', type=int, default=42)
+    run.add_argument('--mix', type=_parse_mix, default=None, help='예: dashboard=30,history=25,export=0')
+    run.add_argument('--rate-limits', action='store_true', help='Flask-Limiter 한도를 켠 채로 측정')
+    run.add_argument('--out', default=None, help=f'결과 JSON 경로 (기본: {RESULTS_DIR}/...)')
+    run.set_defaults(func=cmd_run)
+
+    st = sub.add_parser('startup', help='워커 시작 시간(import + 첫 요청) 측정')
+    st.add_argument('--db', default=DEFAULT_DB)
+    st.add_argument('--runs', type=int, default=10)
+    st.add_argument('--out', default=None, help=f'결과 JSON 경로 (기본: {RESULTS_DIR}/...)')
+    st.set_defaults(func=cmd_startup)
+
+    cmp_ = sub.add_parser('compare', help='두 결과 JSON 비교')
+    cmp_.add_argument('before')
+    cmp_.add_argument('after')
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+시드 고정 합성 데이터 생성기.
+사원은 database.bulk_import_employees, 이용 내역은 database.add_usage_records_batch로 넣으므로
+월별 요약·데이터 버전 등 운영 경로와 같은 부가 데이터가 함께 만들어집니다.
+같은 seed와 인자로 만들면 항상 같은 사번/이름/이용 내역이 생성됩니다.
+"""
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+import database
+
+SURNAMES = '김이박최정강조윤장임한오서신권황안송류홍'
+GIVEN_SYLLABLES = '민서지현준우예도하윤수진영호성은재연경태'
+ITEMS = [('9홀', 2000), ('18홀', 4000)]
+# 장바구니 한 번에 담기는 상품 수 분포 (1개가 대부분)
+CART_SIZES = [1, 1, 1, 1, 2]
+EMP_ID_START = 100000
+RECORD_BATCH_SIZE = 5000
+
+
+def emp_id_for(index):
+    """index번째(0부터) 합성 사원의 사번"""
+    return str(EMP_ID_START + index)
+
+
+def _random_name(rng):
+    return rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_SYLLABLES) for _ in range(2))
+
+
+def generate_employees(count, seed=42):
+    """사원 count명 등록 (초기 비밀번호 = 사번). 반환: bulk_import_employees 결과"""
+    rng = random.Random(seed)
+    emp_ids = [emp_id_for(i) for i in range(count)]
+    names = [_random_name(rng) for _ in range(count)]
+    return database.bulk_import_employees(emp_ids, names)
+
+
+def _iter_usage_records(employees, count, months, rng):
+    """이용 내역 dict를 장바구니 단위로 생성 (최근 months개월에 고르게 분포)"""
+    today = datetime.now(database.KST).date()
+    days = max(months * 30, 1)
+    # 이용이 잦은 사원이 있도록 파레토 분포 가중치 사용
+    cum_weights = list(itertools.accumulate(rng.paretovariate(1.5) for _ in range(employees)))
+    population = range(employees)
+    produced = 0
+    while produced < count:
+        emp_id = emp_id_for(rng.choices(population, cum_weights=cum_weights)[0])
+        usage_date = (today - timedelta(days=rng.randrange(days))).strftime('%Y-%m-%d')
+        room_number = rng.choice(['1', '2'])
+        for _ in range(min(rng.choice(CART_SIZES), count - produced)):
+            item_name, price = rng.choice(ITEMS)
+            quantity = rng.choice([1, 1, 1, 2])
+            yield {
+                'emp_id': emp_id, 'usage_date': usage_date, 'item_name': item_name,
+                'quantity': quantity, 'amount': price * quantity, 'room_number': room_number,
+            }
+            produced += 1
+
+
+def generate_usage_records(employees, count, seed=42, months=12, cancel_ratio=0.02, progress=print):
+    """
+    이용 내역 count건 등록 후 cancel_ratio 비율만큼 취소 처리.
+    반환: {'inserted', 'canceled'}
+    """
+    rng = random.Random(seed + 1)
+    inserted_ids = []
+    batch = []
+    started = time.perf_counter()
+    for record in _iter_usage_records(employees, count, months, rng):
+        batch.append(record)
+        if len(batch) >= RECORD_BATCH_SIZE:
+            inserted_ids.extend(_insert_batch(batch))
+            batch = []
+            if progress and len(inserted_ids) % (RECORD_BATCH_SIZE * 40) == 0:
+                progress(f"  usage_records: {len(inserted_ids):,}/{count:,} ({time.perf_counter() - started:.0f}s)")
+    if batch:
+        inserted_ids.extend(_insert_batch(batch))
+
+    canceled = 0
+    for record_id in rng.sample(inserted_ids, int(len(inserted_ids) * cancel_ratio)):
+        if database.admin_cancel_usage_record(record_id):
+            canceled += 1
+    return {'inserted': len(inserted_ids), 'canceled': canceled}
+
+
+def _insert_batch(batch):
+    ids = database.add_usage_records_batch(batch)
+    if ids is None:
+        raise RuntimeError('이용 내역 등록 실패 (로그 확인)')
+    return ids
+
+
+def generate(employees=10000, records=2000000, seed=42, months=12, cancel_ratio=0.02, progress=print):
+    """
+    현재 database.DB_NAME에 합성 데이터 생성.
+    반환: 생성 조건과 결과 건수 (벤치마크 결과 JSON의 dataset 항목에 기록)
+    """
+    database.init_db()
+    started = time.perf_counter()
+    employee_report = generate_employees(employees, seed)
+    if progress:
+        progress(f"  employees: {employee_report}")
+    usage_report = generate_usage_records(employees, records, seed, months, cancel_ratio, progress)
+    return {
+        'employees': employees,
+        'records': records,
+        'seed': seed,
+        'months': months,
+        'cancel_ratio': cancel_ratio,
+        'inserted_employees': employee_report['inserted'],
+        'inserted_records': usage_report['inserted'],
+        'canceled_records': usage_report['canceled'],
+        'elapsed_sec': round(time.perf_counter() - started, 2),
+    }
@@ -0,0 +1,127 @@
+"""
+워커 시작 시간 측정.
+매 회 새 파이썬 프로세스에서 app을 import하고 첫 요청(로그인)과 두 번째 요청(대시보드)을 보내
+각 구간 시간과 무거운 모듈(pandas, openpyxl 등)이 시작 시점에 로드되었는지를 기록합니다.
+PythonAnywhere 재시작/새 워커가 첫 로그인을 받기까지 걸리는 시간에 해당합니다.
+"""
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import database
+from benchmark.workload import _git_commit, percentile
+
+# 시작 시점에 로드되지 않아야 하는 모듈
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'pyarrow')
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 자식 프로세스에서 실행할 코드 (측정값을 JSON 한 줄로 출력)
+_CHILD = '''
+import json, os, sys, time
+started = time.perf_counter()
+import database
+database.DB_NAME = os.environ['BENCH_DB']
+import app
+imported = time.perf_counter()
+app.limiter.enabled = False
+client = app.app.test_client()
+emp_id = os.environ['BENCH_EMP_ID']
+status = client.post('/login', data={'emp_id': emp_id, 'password': emp_id}).status_code
+first = time.perf_counter()
+client.get('/dashboard')
+second = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (first - imported) * 1000,
+    'second_request_ms': (second - first) * 1000,
+    'login_status': status,
+    'heavy_modules': [m for m in os.environ['BENCH_HEAVY'].split(',') if m in sys.modules],
+}))
+'''
+
+# 결과의 구간 이름: (자식 출력 키, 라벨)
+PHASES = {
+    'process': (None, 'python start ~ 2nd request'),
+    'import': ('import_ms', 'import app'),
+    'first_request': ('first_request_ms', 'POST /login (first)'),
+    'second_request': ('second_request_ms', 'GET /dashboard'),
+}
+
+
+def _first_emp_id():
+    conn = sqlite3.connect(database.DB_NAME)
+    try:
+        row = conn.execute('SELECT emp_id FROM employees ORDER BY id LIMIT 1').fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        raise RuntimeError(f'{database.DB_NAME}에 사원이 없습니다. 먼저 python -m benchmark generate 를 실행하세요.')
+    return row[0]
+
+
+def _run_once(env):
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', _CHILD], cwd=REPO_DIR, env=env,
+        capture_output=True, text=True, timeout=120,
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f'시작 측정 실패:\n{proc.stderr}')
+    # app import 중 출력(초기화 로그 등) 뒤의 마지막 줄이 측정값
+    sample = json.loads(proc.stdout.strip().splitlines()[-1])
+    sample['process_ms'] = elapsed
+    return sample
+
+
+def _summarize(values):
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'min_ms': round(values[0], 2),
+        'p50_ms': round(percentile(values, 50), 2),
+        'p95_ms': round(percentile(values, 95), 2),
+        'p99_ms': round(percentile(values, 99), 2),
+        'max_ms': round(values[-1], 2),
+    }
+
+
+def run_startup_benchmark(runs=10):
+    """
+    새 프로세스에서 runs회 시작 시간을 측정해 결과 dict 반환.
+    결과 형식은 run_benchmark와 같아서(routes/p50_ms...) python -m benchmark compare로 비교할 수 있습니다.
+    """
+    env = dict(
+        os.environ,
+        BENCH_DB=os.path.abspath(database.DB_NAME),
+        BENCH_EMP_ID=_first_emp_id(),
+        BENCH_HEAVY=','.join(HEAVY_MODULES),
+        PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])),
+    )
+    # 첫 실행은 마이그레이션/정적 파일 빌드 등 1회성 작업을 포함할 수 있으므로 제외
+    _run_once(env)
+    samples = [_run_once(env) for _ in range(runs)]
+
+    routes = {}
+    for name, (key, label) in PHASES.items():
+        routes[name] = {'route': label, **_summarize([s[key or 'process_ms'] for s in samples])}
+    return {
+        'meta': {
+            'started_at': datetime.now(database.KST).isoformat(timespec='seconds'),
+            'mode': 'startup',
+            'runs': runs,
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'db': database.DB_NAME,
+        },
+        'heavy_modules_loaded': sorted({m for s in samples for m in s['heavy_modules']}),
+        'login_status': sorted({s['login_status'] for s in samples}),
+        'routes': routes,
+    }
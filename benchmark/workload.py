@@ -0,0 +1,337 @@
+"""
+혼합 부하 실행기.
+워커 스레드마다 세션(쿠키)을 하나씩 갖고 MIX 비율대로 작업을 골라 실행하며
+작업별 지연 시간과 상태 코드를 모은 뒤 p50/p95/p99와 처리량을 계산합니다.
+
+- mode='client': Flask test client (네트워크 없이 앱 + DB 비용만 측정)
+- mode='server': 로컬 스레드 WSGI 서버에 실제 HTTP 요청 (직렬화/소켓 비용 포함)
+"""
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+
+import database
+
+# 작업 이름: (비중, 경로 라벨)
+MIX = {
+    'login': (10, 'POST /login'),
+    'dashboard': (30, 'GET /dashboard'),
+    'cart_submit': (15, 'POST /api/record'),
+    'history': (25, 'GET /api/history'),
+    'admin_list': (12, 'GET /api/admin/records'),
+    'export': (4, 'GET /admin/download'),
+    'import': (4, 'POST /api/admin/bulk_add'),
+}
+IMPORT_BATCH_SIZE = 20
+EXPORT_DAYS = 7
+PERCENTILES = (50, 95, 99)
+
+
+# --- HTTP 클라이언트 ---
+
+class TestClientSession:
+    """Flask test client 래퍼 (쿠키는 test client가 유지)"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None, json_body=None):
+        response = self.client.open(path, method=method, data=form, json=json_body)
+        size = len(response.get_data())  # 스트리밍 응답(CSV)도 끝까지 소비
+        response.close()
+        return response.status_code, size
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """로컬 WSGI 서버용 urllib 세션 (리다이렉트는 따라가지 않고 상태 코드만 기록)"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect
+        )
+
+    def request(self, method, path, form=None, json_body=None):
+        headers = {}
+        data = None
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, len(e.read())
+
+
+# --- 작업 정의 ---
+
+class Worker:
+    def __init__(self, session, emp_ids, admin_password, rng, run_id, index):
+        self.session = session
+        self.emp_ids = emp_ids
+        self.admin_password = admin_password
+        self.rng = rng
+        self.run_id = run_id
+        self.index = index
+        self.import_seq = 0
+        self.today = datetime.now(database.KST).date()
+
+    def setup(self):
+        """측정 전 준비: 관리자 로그인 + 임의 사원 로그인 (같은 세션에 둘 다 유지)"""
+        self.session.request('POST', '/admin/login', form={'password': self.admin_password})
+        self.login()
+
+    def login(self):
+        emp_id = self.rng.choice(self.emp_ids)
+        return self.session.request('POST', '/login', form={'emp_id': emp_id, 'password': emp_id})
+
+    def dashboard(self):
+        return self.session.request('GET', '/dashboard')
+
+    def cart_submit(self):
+        usage_date = (self.today - timedelta(days=self.rng.randrange(30))).strftime('%Y-%m-%d')
+        cart = [{'item_name': '9홀', 'quantity': 1, 'price': 2000}]
+        if self.rng.random() < 0.3:
+            cart.append({'item_name': '18홀', 'quantity': 1, 'price': 4000})
+        return self.session.request('POST', '/api/record', json_body={
+            'usage_date': usage_date, 'cart': cart, 'room_number': self.rng.choice(['1', '2']),
+        })
+
+    def history(self):
+        return self.session.request('GET', '/api/history?limit=50')
+
+    def admin_list(self):
+        # 관리자 페이지가 처음 여는 목록 / 사번 검색 / 기간 검색
+        roll = self.rng.random()
+        if roll < 0.4:
+            return self.session.request('GET', '/api/admin/records?emp_id=' + self.rng.choice(self.emp_ids))
+        if roll < 0.7:
+            date_to = self.today - timedelta(days=self.rng.randrange(300))
+            date_from = date_to - timedelta(days=EXPORT_DAYS - 1)
+            return self.session.request(
+                'GET', f"/api/admin/records?status=all&date_from={date_from:%Y-%m-%d}&date_to={date_to:%Y-%m-%d}"
+            )
+        return self.session.request('GET', '/api/admin/records')
+
+    def export(self):
+        date_to = self.today - timedelta(days=self.rng.randrange(300))
+        date_from = date_to - timedelta(days=EXPORT_DAYS - 1)
+        return self.session.request(
+            'GET', f"/admin/download?format=csv&date_from={date_from:%Y-%m-%d}&date_to={date_to:%Y-%m-%d}"
+        )
+
+    def import_(self):
+        self.import_seq += 1
+        prefix = f"B{self.run_id}{self.index:02d}{self.import_seq:05d}"
+        data = [
+            {'emp_id': f"{prefix}{i:02d}", 'name': f"벤치{i}", 'password': ''}
+            for i in range(IMPORT_BATCH_SIZE)
+        ]
+        return self.session.request('POST', '/api/admin/bulk_add', json_body={'data': data})
+
+    def run(self, op):
+        return getattr(self, 'import_' if op == 'import' else op)()
+
+
+# --- 통계 ---
+
+def percentile(sorted_values, p):
+    """최근접 순위(nearest-rank) 백분위수"""
+    if not sorted_values:
+        return None
+    rank = max(int(-(-p * len(sorted_values) // 100)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """samples: [(지연 ms, 상태 코드)] -> 통계 dict"""
+    latencies = sorted(ms for ms, _ in samples)
+    status = {}
+    for _, code in samples:
+        status[str(code)] = status.get(str(code), 0) + 1
+    errors = sum(count for code, count in status.items() if code == 'error' or int(code) >= 500)
+    shed = status.get('429', 0)
+    result = {
+        'count': len(samples),
+        'errors': errors,
+        'shed': shed,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        'max_ms': round(latencies[-1], 3) if latencies else None,
+        'status': status,
+    }
+    for p in PERCENTILES:
+        value = percentile(latencies, p)
+        result[f'p{p}_ms'] = round(value, 3) if value is not None else None
+    return result
+
+
+# --- 실행 ---
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _dataset_info():
+    conn = database.get_pool().acquire()
+    try:
+        emp_ids = [row[0] for row in conn.execute('SELECT emp_id FROM employees ORDER BY id').fetchall()]
+        records = conn.execute('SELECT COUNT(*) FROM usage_records').fetchone()[0]
+    finally:
+        conn.close()
+    return emp_ids, {'employees': len(emp_ids), 'usage_records': records}
+
+
+def _load_app(rate_limits):
+    """database.DB_NAME을 정한 뒤 import해야 벤치마크 DB로 초기화됨"""
+    import app as app_module
+    app_module.limiter.enabled = rate_limits
+    return app_module
+
+
+def run_benchmark(mode='client', concurrency=8, duration=30.0, requests=None, seed=42,
+                  mix=None, rate_limits=False, warmup=2.0):
+    """
+    혼합 부하 실행 후 결과 dict 반환.
+    requests를 지정하면 duration 대신 워커당 요청 수로 종료합니다.
+    rate_limits=False이면 Flask-Limiter를 끄고 측정 (shed_load 429는 그대로 집계)
+    """
+    mix = mix or {name: weight for name, (weight, _) in MIX.items()}
+    ops = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in ops]
+
+    app_module = _load_app(rate_limits)
+    emp_ids, dataset = _dataset_info()
+    if not emp_ids:
+        raise RuntimeError('사원 데이터가 없습니다. 먼저 python -m benchmark generate 를 실행하세요.')
+    admin_password = app_module.settings_cache.get_setting('admin_password', 'admin1234')
+
+    server = None
+    if mode == 'server':
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        new_session = lambda: HttpSession(base_url)
+    elif mode == 'client':
+        new_session = lambda: TestClientSession(app_module.app)
+    else:
+        raise ValueError(f"알 수 없는 mode: {mode}")
+
+    run_id = uuid.uuid4().hex[:6]
+    workers = [
+        Worker(new_session(), emp_ids, admin_password, random.Random(seed * 1000 + i), run_id, i)
+        for i in range(concurrency)
+    ]
+    samples = {name: [] for name in ops}
+    samples_lock = threading.Lock()
+    ready = threading.Barrier(concurrency + 1)
+    go = threading.Event()
+    state = {'measure_from': None, 'stop_at': None}
+
+    def loop(worker):
+        worker.setup()
+        ready.wait()
+        go.wait()
+        local = {name: [] for name in ops}
+        done = 0
+        while True:
+            now = time.perf_counter()
+            if requests is None and now >= state['stop_at']:
+                break
+            if requests is not None and done >= requests:
+                break
+            op = worker.rng.choices(ops, weights)[0]
+            started = time.perf_counter()
+            try:
+                code, _ = worker.run(op)
+            except Exception:
+                code = 'error'
+            finished = time.perf_counter()
+            # 워밍업 구간은 집계하지 않음 (요청 수 모드는 전부 집계)
+            if requests is not None or started >= state['measure_from']:
+                local[op].append(((finished - started) * 1000, code))
+                done += 1
+        with samples_lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    threads = [threading.Thread(target=loop, args=(w,), daemon=True) for w in workers]
+    for t in threads:
+        t.start()
+    ready.wait()
+    start = time.perf_counter()
+    state['measure_from'] = start + (warmup if requests is None else 0)
+    state['stop_at'] = state['measure_from'] + duration
+    go.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - (state['measure_from'] if requests is None else start)
+    if server is not None:
+        server.shutdown()
+
+    all_samples = [s for values in samples.values() for s in values]
+    return {
+        'meta': {
+            'started_at': datetime.now(database.KST).isoformat(timespec='seconds'),
+            'mode': mode,
+            'concurrency': concurrency,
+            'duration_sec': round(elapsed, 3),
+            'requests_per_worker': requests,
+            'warmup_sec': warmup if requests is None else 0,
+            'seed': seed,
+            'rate_limits': rate_limits,
+            'mix': {name: mix[name] for name in ops},
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'db': database.DB_NAME,
+        },
+        'dataset': dataset,
+        'routes': {
+            name: {'route': MIX[name][1], **summarize(samples[name], elapsed)} for name in ops
+        },
+        'total': summarize(all_samples, elapsed),
+    }
+
+
+def compare(before, after, metrics=('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')):
+    """두 결과의 작업별 지표 변화율(%) 반환: {작업: {지표: (이전, 이후, 변화율)}}"""
+    result = {}
+    for name in list(before['routes']) + [n for n in after['routes'] if n not in before['routes']]:
+        old = before['routes'].get(name, {})
+        new = after['routes'].get(name, {})
+        row = {}
+        for metric in metrics:
+            a, b = old.get(metric), new.get(metric)
+            change = round((b - a) / a * 100, 1) if a and b is not None else None
+            row[metric] = (a, b, change)
+        result[name] = row
+    return result
@@ -1,27 +1,381 @@
 import sqlite3
-import pandas as pd
 from datetime import datetime, timezone, timedelta
 import hashlib
+import base64
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from flask import g, has_app_context
+
+# pandas는 import에 수백 ms가 걸려 워커 시작을 늦추므로 엑셀 가져오기/내보내기 함수 안에서만 import합니다.
 
 # 한국 표준시 (KST) 설정
 KST = timezone(timedelta(hours=9))
 
 DB_NAME = 'screengolf.db'
 
+# --- 커넥션 풀 설정 ---
+# 요청마다 sqlite3.connect()를 새로 여는 비용을 없애기 위해 프로세스별 풀을 사용합니다.
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+# PythonAnywhere 등 네트워크 파일시스템에서 WAL이 문제되면 DB_JOURNAL_MODE=DELETE 로 변경
+JOURNAL_MODE = os.environ.get('DB_JOURNAL_MODE', 'WAL')
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",   # WAL 모드에서는 NORMAL로도 커밋 내구성 보장 (체크포인트 시에만 fsync)
+    "PRAGMA cache_size = -16000",    # 페이지 캐시 약 16MB
+    "PRAGMA mmap_size = 67108864",   # 64MB 메모리 매핑 읽기
+    "PRAGMA temp_store = MEMORY",
+)
+CACHED_STATEMENTS = 256
+
+# --- 보관(archive) DB ---
+# 지난 연도 내역과 오래된 취소 내역은 archive.py가 별도 파일(<DB 이름>_archive.db)로 옮깁니다.
+# 모든 커넥션에 'archive'로 ATTACH되며, 조회 함수는 필요할 때만 usage_records_all 뷰(hot + 보관)를 읽습니다.
+USAGE_RECORD_COLUMNS = (
+    'id, emp_id, usage_date, item_name, quantity, amount, room_number, created_at, is_canceled, canceled_at'
+)
+HOT_USAGE_SOURCE = 'usage_records'
+ALL_USAGE_SOURCE = 'usage_records_all'
+
+def archive_db_name(db_name=None):
+    stem, ext = os.path.splitext(db_name or DB_NAME)
+    return f"{stem}_archive{ext or '.db'}"
+
+# 보관 DB 스키마 버전 (archive.user_version에 저장, 같으면 생성 문장을 건너뜀)
+ARCHIVE_SCHEMA_VERSION = 3
+
+def _ensure_archive_schema(conn):
+    """보관 DB 테이블/인덱스 생성 (hot 테이블과 같은 컬럼, id는 원래 값을 그대로 보존)"""
+    version = conn.execute('PRAGMA archive.user_version').fetchone()[0]
+    if version >= ARCHIVE_SCHEMA_VERSION:
+        return
+    if version < 1:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS archive.usage_records (
+                id INTEGER PRIMARY KEY,
+                emp_id TEXT NOT NULL,
+                usage_date TEXT NOT NULL,
+                item_name TEXT NOT NULL,
+                quantity INTEGER DEFAULT 1,
+                amount INTEGER DEFAULT 0,
+                room_number INTEGER,
+                created_at TIMESTAMP,
+                is_canceled INTEGER DEFAULT 0,
+                canceled_at TIMESTAMP
+            )
+        ''')
+        # hot 테이블의 사용자 키셋 인덱스와 같은 구성
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS archive.idx_archive_emp_active_keyset
+            ON usage_records (emp_id, is_canceled, usage_date, created_at)
+        ''')
+    if version < 2:
+        # 관리자 목록/검색/내보내기: hot 테이블 v7과 같은 오름차순 키셋 인덱스 (역방향 스캔으로 id까지 정렬)
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS archive.idx_archive_active_keyset
+            ON usage_records (is_canceled, usage_date, created_at)
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS archive.idx_archive_date_keyset
+            ON usage_records (usage_date, created_at)
+        ''')
+        conn.execute('DROP INDEX IF EXISTS archive.idx_archive_active_date')
+        conn.execute('DROP INDEX IF EXISTS archive.idx_archive_date')
+    if version < 3:
+        # 증분 내보내기: 워터마크 이후 취소된 내역 (hot 테이블 v8과 같은 구성)
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS archive.idx_archive_canceled_at
+            ON usage_records (canceled_at)
+        ''')
+    conn.execute(f'PRAGMA archive.user_version = {ARCHIVE_SCHEMA_VERSION}')
+    conn.commit()
+
+# hot + 보관 내역 (옮기는 도중 양쪽에 같은 id가 있으면 hot 쪽을 사용)
+# 각 쪽의 인덱스 순서대로 MERGE (UNION ALL) 되므로 정렬용 임시 B-tree가 생기지 않음
+_CREATE_ALL_USAGE_VIEW = f'''
+    CREATE TEMP VIEW IF NOT EXISTS {ALL_USAGE_SOURCE} AS
+    SELECT {USAGE_RECORD_COLUMNS} FROM main.usage_records
+    UNION ALL
+    SELECT {USAGE_RECORD_COLUMNS} FROM archive.usage_records a
+    WHERE NOT EXISTS (SELECT 1 FROM main.usage_records h WHERE h.id = a.id)
+'''
+
+
+# --- 쿼리 계측 ---
+# metrics.py가 요청마다 수집 객체를 지정하면, 그 컨텍스트에서 실행되는 쿼리의 시간을 잽니다.
+# 지정되지 않은 경우(계측 끔/샘플링 제외)에는 기본 커서를 그대로 사용합니다.
+_query_stats = contextvars.ContextVar('query_stats', default=None)
+# 쓰기 잠금을 잡는 문장: 실행 시간을 잠금 대기 시간으로 집계
+_LOCKING_STATEMENTS = ('BEGIN IMMEDIATE', 'BEGIN EXCLUSIVE')
+# 트랜잭션 밖에서 실행되는 쓰기 문장은 sqlite3 모듈이 암묵적 BEGIN을 붙이고 실행 중에 잠금을 잡으므로
+# 그 문장의 실행 시간도 잠금 대기로 집계 (문장 자체의 실행 시간이 포함된 근사값)
+_WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+def observe_queries(stats):
+    """
+    현재 컨텍스트의 쿼리를 stats.record_query(sql, seconds, is_lock_wait)로 보고하도록 설정.
+    반환된 토큰을 stop_observing_queries()에 넘기면 해제됩니다.
+    """
+    return _query_stats.set(stats)
+
+def stop_observing_queries(token):
+    _query_stats.reset(token)
+
+def _record_query(sql, started, opens_transaction=False):
+    stats = _query_stats.get()
+    if stats is not None:
+        head = sql.lstrip()[:15].upper()
+        is_lock_wait = (head.startswith(_LOCKING_STATEMENTS)
+                        or (opens_transaction and head.startswith(_WRITE_STATEMENTS)))
+        stats.record_query(sql, time.perf_counter() - started, is_lock_wait)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """실행 시간을 _query_stats에 보고하는 커서 (fetch 시간은 제외)"""
+
+    def execute(self, sql, parameters=()):
+        opens_transaction = not self.connection.in_transaction
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_query(sql, started, opens_transaction)
+
+    def executemany(self, sql, seq_of_parameters):
+        opens_transaction = not self.connection.in_transaction
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_query(sql, started, opens_transaction)
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _record_query(sql_script, started)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    풀에서 빌려주는 커넥션.
+    close()를 호출하면 실제로 닫지 않고 풀에 반환합니다.
+    Flask 요청에 묶인 커넥션은 teardown 시점에 반환되므로 close()는 미커밋 트랜잭션만 정리합니다.
+    (기존 함수들의 'commit 없이 close = 롤백' 동작을 그대로 유지)
+    """
+    pool = None
+    request_bound = False
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+        if self.request_bound:
+            return
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def close_physical(self):
+        super().close()
+
+    # 계측 중일 때만 TimedCursor로 실행 (pandas.read_sql_query 등은 cursor()를 거침)
+    def cursor(self, factory=sqlite3.Cursor):
+        if factory is sqlite3.Cursor and _query_stats.get() is not None:
+            factory = TimedCursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        if _query_stats.get() is None:
+            return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if _query_stats.get() is None:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        if _query_stats.get() is None:
+            return super().executescript(sql_script)
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        if _query_stats.get() is None:
+            return super().commit()
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _record_query('COMMIT', started)
+
+
+class ConnectionPool:
+    """스레드 안전한 SQLite 커넥션 풀 (LIFO: 최근에 쓴 커넥션의 캐시를 재사용)"""
+
+    def __init__(self, db_name, size=POOL_SIZE):
+        self.db_name = db_name
+        self.size = size
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._journal_checked = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=30,
+            factory=PooledConnection,
+            check_same_thread=False,  # 스레드 간 반환/재사용 허용 (동시에 두 스레드가 쓰지는 않음)
+            cached_statements=CACHED_STATEMENTS,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('ATTACH DATABASE ? AS archive', (archive_db_name(self.db_name),))
+        with self._lock:
+            if not self._journal_checked:
+                # journal_mode는 DB 파일에 영구 저장되므로 프로세스당 한 번만 설정
+                conn.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}")
+                conn.execute(f"PRAGMA archive.journal_mode = {JOURNAL_MODE}")
+                _ensure_archive_schema(conn)
+                self._journal_checked = True
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.execute(_CREATE_ALL_USAGE_VIEW)
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        conn.request_bound = False
+        if conn.in_transaction:
+            conn.rollback()
+        if _pool is not self:
+            # 이미 교체된(폐기된) 풀의 커넥션은 반환하지 않고 닫음
+            conn.close_physical()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close_physical()
+
+    def idle_count(self):
+        return self._idle.qsize()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close_physical()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """현재 DB_NAME/프로세스에 맞는 풀 반환 (fork 또는 DB 파일 변경 시 새로 생성)"""
+    global _pool
+    pool = _pool
+    if pool is None or pool.db_name != DB_NAME or pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.db_name != DB_NAME or _pool.pid != os.getpid():
+                if _pool is not None and _pool.pid == os.getpid():
+                    _pool.close_all()
+                _pool = ConnectionPool(DB_NAME)
+            pool = _pool
+    return pool
+
+def close_pool():
+    """풀의 유휴 커넥션을 모두 닫습니다. (DB 파일 교체 전 등)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+
 def get_db_connection():
-    conn = sqlite3.connect(DB_NAME, timeout=30)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """
+    DB 커넥션 반환.
+    Flask 요청 안에서는 요청당 하나의 커넥션을 공유하고(teardown 시 풀로 반환),
+    요청 밖(스크립트, init_db 등)에서는 풀에서 빌려준 뒤 close() 시 반환합니다.
+    """
+    if has_app_context():
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = get_pool().acquire()
+            conn.request_bound = True
+            g._db_conn = conn
+        return conn
+    return get_pool().acquire()
+
+def release_request_connection(exc=None):
+    """요청 종료(teardown) 시 요청에 묶인 커넥션을 풀로 반환"""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.pool.release(conn)
+
+def init_app(app):
+    """Flask 앱에 요청 단위 커넥션 반환 훅 등록"""
+    app.teardown_appcontext(release_request_connection)
+
+class DataVersionWatcher:
+    """
+    다른 커넥션·워커의 커밋을 감지하는 전용 커넥션 (settings_cache, totals_cache 등 프로세스 내 캐시용).
+    PRAGMA data_version은 커넥션마다 따로 증가하므로 항상 같은 커넥션으로 비교합니다.
+    DB 파일(DB_NAME)이나 프로세스가 바뀌면 새로 연결하고, 그때마다 version()의 첫 값(연결 번호)도 바뀝니다.
+    스레드 안전하지 않으므로 호출 측 잠금 안에서 사용합니다.
+    """
+
+    def __init__(self, schemas=('main',)):
+        self.schemas = schemas
+        self._conn = None
+        self._owner = None  # (DB_NAME, pid)
+        self._connects = 0
+
+    def connection(self):
+        owner = (DB_NAME, os.getpid())
+        if self._conn is None or self._owner != owner:
+            self.close()
+            self._conn = get_pool().acquire()
+            self._conn.pool = None  # 풀에 반환하지 않고 계속 보유
+            self._owner = owner
+            self._connects += 1
+        return self._conn
+
+    def version(self):
+        """(연결 번호, 스키마별 data_version). 이전 값과 다르면 그 사이 커밋이 있었거나 DB가 바뀐 것"""
+        conn = self.connection()
+        return (self._connects,) + tuple(
+            conn.execute(f'PRAGMA {schema}.data_version').fetchone()[0] for schema in self.schemas
+        )
+
+    def close(self):
+        """전용 커넥션 닫기 (fork 전 부모 프로세스의 커넥션은 닫지 않고 버림)"""
+        if self._conn is not None and self._owner[1] == os.getpid():
+            self._conn.close_physical()
+        self._conn = None
+        self._owner = None
 
 def hash_val(val):
     """SHA-256 해시 값을 반환합니다. (주민번호 뒷자리 등에 사용)"""
     return hashlib.sha256(str(val).encode()).hexdigest()
 
-def init_db():
-    """데이터베이스 초기화 및 테이블 생성"""
-    conn = get_db_connection()
-    c = conn.cursor()
-    
+# --- 스키마 마이그레이션 ---
+# 스키마 버전은 PRAGMA user_version에 저장합니다.
+# 새 스키마 변경은 아래 MIGRATIONS 목록 끝에 (버전, 함수) 형태로 추가합니다.
+# (기존 단계는 수정하지 않음. 뒤 단계에서 되돌리는 작업만 비울 수 있음 - v2 참고)
+
+def _migrate_base_schema(c):
+    """v1: 기본 테이블 생성 + 버전 관리 도입 이전 DB의 컬럼 보정"""
     # 사원 명부 (로그인용)
     c.execute('''
         CREATE TABLE IF NOT EXISTS employees (
@@ -34,22 +388,16 @@ def init_db():
         )
     ''')
     
-    # 이용 내역 (누적용)
     # 이용 내역 (누적용)
     # 스키마 변경: 시간 삭제 -> 상품명/수량 추가
-    try:
-        # 기존 테이블에 start_time 컬럼이 있는지 확인하고 있다면 DROP (마이그레이션)
-        cursor = c.execute("PRAGMA table_info(usage_records)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'start_time' in columns:
-            print("Migrating: Dropping old usage_records table...")
-            c.execute("DROP TABLE usage_records")
-        # item_name이 없다면(구버전) DROP (안전장치)
-        elif columns and 'item_name' not in columns:
-             print("Migrating: Dropping mismatch schema usage_records table...")
-             c.execute("DROP TABLE usage_records")
-    except Exception as e:
-        print(f"Migration check failed: {e}")
+    # 기존 테이블에 start_time 컬럼이 있거나 item_name이 없다면(구버전) DROP
+    columns = [row[1] for row in c.execute("PRAGMA table_info(usage_records)").fetchall()]
+    if 'start_time' in columns:
+        print("Migrating: Dropping old usage_records table...")
+        c.execute("DROP TABLE usage_records")
+    elif columns and 'item_name' not in columns:
+        print("Migrating: Dropping mismatch schema usage_records table...")
+        c.execute("DROP TABLE usage_records")
 
     c.execute('''
         CREATE TABLE IF NOT EXISTS usage_records (
@@ -67,26 +415,15 @@ def init_db():
         )
     ''')
     
-    # 마이그레이션: room_number 컬럼 추가
-    try:
-        cursor = c.execute("PRAGMA table_info(usage_records)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'room_number' not in columns:
-            print("Migrating: Adding room_number column...")
-            c.execute("ALTER TABLE usage_records ADD COLUMN room_number INTEGER")
-    except Exception as e:
-        print(f"Migration failed (room_number): {e}")
-
-    # 마이그레이션: is_canceled 컬럼 추가
-    try:
-        cursor = c.execute("PRAGMA table_info(usage_records)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'is_canceled' not in columns:
-            print("Migrating: Adding is_canceled column...")
-            c.execute("ALTER TABLE usage_records ADD COLUMN is_canceled INTEGER DEFAULT 0")
-            c.execute("ALTER TABLE usage_records ADD COLUMN canceled_at TIMESTAMP")
-    except Exception as e:
-        print(f"Migration failed: {e}")
+    # room_number / is_canceled 컬럼이 없던 시절의 DB 보정
+    columns = [row[1] for row in c.execute("PRAGMA table_info(usage_records)").fetchall()]
+    if 'room_number' not in columns:
+        print("Migrating: Adding room_number column...")
+        c.execute("ALTER TABLE usage_records ADD COLUMN room_number INTEGER")
+    if 'is_canceled' not in columns:
+        print("Migrating: Adding is_canceled column...")
+        c.execute("ALTER TABLE usage_records ADD COLUMN is_canceled INTEGER DEFAULT 0")
+        c.execute("ALTER TABLE usage_records ADD COLUMN canceled_at TIMESTAMP")
     
     # 시스템 설정 (관리자 비밀번호 등)
     c.execute('''
@@ -100,9 +437,157 @@ def init_db():
     # 이미 설정이 있으면 건너뜀
     c.execute("INSERT OR IGNORE INTO system_settings (key, value) VALUES ('admin_password', 'admin1234')")
 
-    conn.commit()
-    conn.close()
-    print(f"Database {DB_NAME} initialized successfully.")
+def _migrate_usage_indexes(c):
+    """
+    v2: (대체됨) usage_records DESC 복합 인덱스 단계.
+    여기서 만들던 idx_usage_emp_active_date / idx_usage_active_date / idx_usage_date는
+    v3·v7의 키셋 인덱스로 대체되어 곧바로 삭제되므로, 업그레이드 중 버릴 인덱스를 만들지 않도록 비워 둠.
+    (이미 v2를 거친 DB에 남은 인덱스는 v3·v7의 DROP INDEX IF EXISTS가 정리)
+    """
+
+def _migrate_history_keyset_index(c):
+    """v3: 사용자 내역 키셋 페이지네이션용 인덱스 (usage_date, created_at, id 역순 스캔)"""
+    # 오름차순 인덱스를 역방향으로 스캔하면 rowid(id)까지 DESC로 정렬되어 임시 B-tree 없이
+    # ORDER BY usage_date DESC, created_at DESC, id DESC 와 (usage_date, created_at, id) < (?, ?, ?) 조건을 처리
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_usage_emp_active_keyset
+        ON usage_records (emp_id, is_canceled, usage_date, created_at)
+    ''')
+    c.execute('DROP INDEX IF EXISTS idx_usage_emp_active_date')
+
+def _migrate_default_password_flag(c):
+    """v4: 초기 비밀번호(사번) 사용 여부 플래그 (대시보드에서 매번 해시 비교하지 않도록)"""
+    c.execute("ALTER TABLE employees ADD COLUMN is_default_password INTEGER DEFAULT 1")
+    rows = c.execute("SELECT emp_id, password_hash FROM employees").fetchall()
+    c.executemany(
+        "UPDATE employees SET is_default_password = ? WHERE emp_id = ?",
+        [(int(row[1] == hash_val(row[0])), row[0]) for row in rows]
+    )
+
+# 월별 요약 재계산 SQL (마이그레이션 백필과 rebuild_monthly_summary에서 공용)
+REBUILD_MONTHLY_SUMMARY_SQL = '''
+    INSERT INTO usage_monthly_summary (month, emp_id, item_name, quantity, amount, record_count)
+    SELECT substr(usage_date, 1, 7), emp_id, item_name,
+           SUM(quantity), SUM(amount), COUNT(*)
+    FROM usage_records
+    WHERE is_canceled = 0
+    GROUP BY substr(usage_date, 1, 7), emp_id, item_name
+'''
+
+def _migrate_monthly_summary(c):
+    """v5: 급여 공제용 월별 요약 테이블 (사원/월/상품별 수량·금액 합계, 취소 제외)"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS usage_monthly_summary (
+            month TEXT NOT NULL,              -- 이용 월 (YYYY-MM)
+            emp_id TEXT NOT NULL,
+            item_name TEXT NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            amount INTEGER NOT NULL DEFAULT 0,
+            record_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, emp_id, item_name)
+        ) WITHOUT ROWID
+    ''')
+    c.execute(REBUILD_MONTHLY_SUMMARY_SQL)
+
+def _migrate_employee_data_version(c):
+    """v6: 사원별 이용 내역 버전 (등록/취소 시 증가, ETag 생성용)"""
+    c.execute("ALTER TABLE employees ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0")
+
+def _migrate_admin_search_indexes(c):
+    """v7: 관리자 검색(필터 + 키셋 페이지)용 인덱스"""
+    # 관리자 목록/기간 검색: 오름차순 인덱스를 역방향으로 스캔해 id까지 DESC 정렬 (v3과 같은 방식)
+    # 상품(9홀/18홀)·방(1/2)은 값 종류가 적어 별도 인덱스 없이 이 인덱스를 따라가며 거름
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_usage_active_keyset
+        ON usage_records (is_canceled, usage_date, created_at)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_usage_date_keyset
+        ON usage_records (usage_date, created_at)
+    ''')
+    c.execute('DROP INDEX IF EXISTS idx_usage_active_date')
+    c.execute('DROP INDEX IF EXISTS idx_usage_date')
+    # 이름 앞부분 검색: name >= ? AND name < ? 범위 조회
+    c.execute('CREATE INDEX IF NOT EXISTS idx_employees_name ON employees (name)')
+
+def _migrate_canceled_at_index(c):
+    """v8: 증분 내보내기용 취소일시 인덱스 (워터마크 이후 취소된 내역만 범위 조회)"""
+    # (canceled_at, id) > (?, ?) 조건을 인덱스 범위 + rowid로 처리 (취소되지 않은 행은 NULL이라 범위 밖)
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_usage_canceled_at
+        ON usage_records (canceled_at)
+    ''')
+
+def _migrate_idempotency_keys(c):
+    """v9: 등록 요청 멱등 키 (재전송 시 중복 등록 방지, 이용 내역 INSERT와 같은 트랜잭션에서 기록)"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            scope TEXT NOT NULL,              -- 키 범위 (record:<사번> / admin_add_usage)
+            key TEXT NOT NULL,                -- 클라이언트가 만든 키
+            fingerprint TEXT NOT NULL,        -- 요청 내용 해시 (같은 키로 다른 내용이면 거부)
+            result TEXT NOT NULL,             -- 처리 결과 (등록된 id 목록, JSON)
+            created_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+    ''')
+    # 만료된 키 정리용
+    c.execute('CREATE INDEX IF NOT EXISTS idx_idempotency_created ON idempotency_keys (created_at)')
+
+MIGRATIONS = [
+    (1, _migrate_base_schema),
+    (2, _migrate_usage_indexes),
+    (3, _migrate_history_keyset_index),
+    (4, _migrate_default_password_flag),
+    (5, _migrate_monthly_summary),
+    (6, _migrate_employee_data_version),
+    (7, _migrate_admin_search_indexes),
+    (8, _migrate_canceled_at_index),
+    (9, _migrate_idempotency_keys),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        if own_conn:
+            conn.close()
+
+def init_db():
+    """
+    데이터베이스 초기화: 저장된 스키마 버전 이후의 마이그레이션만 순서대로 적용.
+    이미 최신 버전이면 PRAGMA user_version 한 번만 읽고 끝냅니다. (워커 시작/재시작 시 기본 경로)
+    """
+    conn = get_db_connection()
+    try:
+        if get_schema_version(conn) >= SCHEMA_VERSION:
+            return
+        apply_migrations(conn)
+    finally:
+        conn.close()
+    print(f"Database {DB_NAME} initialized successfully. (schema v{SCHEMA_VERSION})")
+
+def apply_migrations(conn):
+    """주어진 커넥션의 DB에 밀린 마이그레이션 적용 (새 DB 파일 생성 시에도 사용)"""
+    current = get_schema_version(conn)
+    for version, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        print(f"Migrating: schema v{current} -> v{version} ({migrate.__name__})")
+        c = conn.cursor()
+        c.execute('BEGIN IMMEDIATE')  # 여러 워커가 동시에 시작해도 한 번만 적용
+        # 잠금을 얻는 사이 다른 프로세스가 이미 적용했을 수 있으므로 재확인
+        if get_schema_version(conn) >= version:
+            conn.rollback()
+            current = version
+            continue
+        migrate(c)
+        c.execute(f'PRAGMA user_version = {version}')
+        conn.commit()
+        current = version
 
 # --- 사원 관리 ---
 
@@ -118,13 +603,14 @@ def upsert_employee(emp_id, name, password_raw=None):
         password_raw = str(emp_id)
 
     pw_hash = hash_val(password_raw)
+    is_default = int(str(password_raw) == str(emp_id))
     now = datetime.now(KST)
     
     try:
         c.execute('''
-            INSERT OR IGNORE INTO employees (emp_id, name, password_hash, created_at)
-            VALUES (?, ?, ?, ?)
-        ''', (emp_id, name, pw_hash, now))
+            INSERT OR IGNORE INTO employees (emp_id, name, password_hash, created_at, is_default_password)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (emp_id, name, pw_hash, now, is_default))
         conn.commit()
         # rowcount가 1이면 추가됨, 0이면 무시됨
         return c.rowcount > 0
@@ -134,71 +620,116 @@ def upsert_employee(emp_id, name, password_raw=None):
     finally:
         conn.close()
 
+IMPORT_CHUNK_SIZE = 1000
+
+def _clean_str_series(series, length):
+    """값 없음(None/NaN)은 빈 문자열로, 나머지는 앞뒤 공백만 제거한 문자열 Series 반환"""
+    import pandas as pd
+    if series is None:
+        return pd.Series([''] * length, dtype=object)
+    return pd.Series(series, dtype=object).reset_index(drop=True).fillna('').astype(str).str.strip()
+
+def _clean_excel_id_series(series):
+    """엑셀에서 읽은 사번 열의 숫자 변환 흔적(nan, 1234.0 등)을 벡터 연산으로 정리 (비밀번호/붙여넣기에는 적용하지 않음)"""
+    s = _clean_str_series(series, len(series))
+    s = s.mask(s.str.lower().isin(['nan', 'none', 'nat']), '')
+    return s.str.replace(r'\.0$', '', regex=True)
+
+def bulk_import_employees(emp_ids, names, passwords=None, progress=None):
+    """
+    사원 일괄 등록 엔진 (엑셀 업로드 / 붙여넣기 공용).
+    - 문자열 정리(앞뒤 공백 제거)는 pandas 벡터 연산으로 처리. 엑셀 사번 열 정리는 호출하는 쪽에서
+    - 비밀번호는 앞뒤 공백만 제거하고, 비어 있으면 사번을 초기 비밀번호로 사용
+    - 전체를 하나의 트랜잭션에서 IMPORT_CHUNK_SIZE 단위 executemany로 INSERT OR IGNORE
+    - progress(done, total)를 주면 chunk마다 호출 (백그라운드 작업 진행률)
+    반환: {'inserted': 신규 등록 수, 'skipped': 중복(기존 사원/파일 내 중복) 수, 'invalid': 사번·이름 누락 수}
+    """
+    import pandas as pd
+    # 없는 열(None)은 빈 값으로 채워 해당 행을 누락으로 집계
+    length = next((len(col) for col in (emp_ids, names, passwords) if col is not None), 0)
+    df = pd.DataFrame({
+        'emp_id': _clean_str_series(emp_ids, length),
+        'name': _clean_str_series(names, length),
+        'password': _clean_str_series(passwords, length),
+    })
+    
+    valid_mask = (df['emp_id'] != '') & (df['name'] != '')
+    invalid = int((~valid_mask).sum())
+    df = df[valid_mask]
+    # 파일 안에서 같은 사번이 반복되면 첫 행만 사용 (INSERT OR IGNORE와 동일한 결과)
+    df = df.drop_duplicates(subset='emp_id', keep='first')
+    duplicated_in_file = int(valid_mask.sum()) - len(df)
+    
+    df['password'] = df['password'].where(df['password'] != '', df['emp_id'])
+    # 같은 비밀번호는 한 번만 해시
+    hashes = {pw: hash_val(pw) for pw in df['password'].unique()}
+    df['password_hash'] = df['password'].map(hashes)
+    df['is_default_password'] = (df['password'] == df['emp_id']).astype(int)
+    
+    now = datetime.now(KST)
+    rows = list(zip(
+        df['emp_id'], df['name'], df['password_hash'], [now] * len(df), df['is_default_password'].tolist()
+    ))
+    
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        before = conn.total_changes
+        for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+            conn.executemany('''
+                INSERT OR IGNORE INTO employees (emp_id, name, password_hash, created_at, is_default_password)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows[start:start + IMPORT_CHUNK_SIZE])
+            if progress:
+                progress(min(start + IMPORT_CHUNK_SIZE, len(rows)), len(rows))
+        inserted = conn.total_changes - before
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    return {
+        'inserted': inserted,
+        'skipped': len(rows) - inserted + duplicated_in_file,
+        'invalid': invalid,
+    }
+
+def import_employees_from_excel(filepath, progress=None):
+    """
+    엑셀 파일을 읽어 사원을 일괄 등록하고 bulk_import_employees의 결과를 반환합니다. (오류는 예외로 전달)
+    gift_project의 로직(인덱스 기반, 데이터 정제)을 그대로 이식하여 호환성을 확보합니다.
+    filepath에는 경로 또는 파일 객체를 전달할 수 있습니다.
+    """
+    import pandas as pd
+    # V11: dtype=str to preserve leading zeros
+    df = pd.read_excel(filepath, dtype=str)
+    
+    # Helper to safe access by iloc (열이 모자란 시트는 빈 열로 취급 -> 모든 행이 누락으로 집계)
+    def get_col_data(col_idx):
+        if col_idx < len(df.columns):
+            return df.iloc[:, col_idx]
+        return pd.Series([None] * len(df), dtype=object)
+
+    # gift_project와 동일한 컬럼 인덱스 매핑 - 주민번호 로직 제거
+    # 사번: 11, 이름: 12 (초기 비밀번호는 사번과 동일)
+    emp_ids = _clean_excel_id_series(get_col_data(11))
+    return bulk_import_employees(emp_ids, get_col_data(12), progress=progress)
+
+def format_import_report(report):
+    """bulk_import_employees 결과 요약 메시지"""
+    return f"성공 (신규 {report['inserted']}명, 중복 제외 {report['skipped']}명, 누락 {report['invalid']}건)"
+
 def upsert_employees_from_excel_file(filepath):
     """
     엑셀 파일을 읽어 사원을 일괄 등록합니다.
-    gift_project의 로직(인덱스 기반, 데이터 정제)을 그대로 이식하여 호환성을 확보합니다.
     중복된 사원은 제외하고(SKIP) 신규 사원만 등록합니다.
+    반환: (신규 등록 수, 메시지)
     """
     try:
-        # V11: dtype=str to preserve leading zeros
-        df = pd.read_excel(filepath, dtype=str)
-        
-        # Helper to safe access by iloc
-        def get_col_data(col_idx):
-            if col_idx < len(df.columns):
-                return df.iloc[:, col_idx]
-            return None
-
-        # Function to clean typical Excel numeric artifacts
-        def clean_str(series):
-            if series is None:
-                return pd.Series([''] * len(df))
-                
-            def convert_val(x):
-                s = str(x).strip()
-                if s.lower() in ['nan', 'none', '', 'nat']:
-                    return ''
-                if s.endswith('.0'):
-                    return s[:-2]
-                return s
-                    
-            return series.apply(convert_val)
-
-            # gift_project와 동일한 컬럼 인덱스 매핑 - 주민번호 로직 제거
-        # 사번: 11, 이름: 12
-        emp_ids = clean_str(get_col_data(11))
-        names = clean_str(get_col_data(12))
-        
-        conn = get_db_connection()
-        c = conn.cursor()
-        now = datetime.now(KST)
-        count = 0
-        
-        for i in range(len(df)):
-            emp_id = emp_ids[i]
-            name = names[i]
-            
-            if not emp_id or not name:
-                continue
-            
-            # 초기 비밀번호는 사번과 동일하게 설정
-            password = emp_id
-
-            pw_hash = hash_val(password)
-            
-            c.execute('''
-                INSERT OR IGNORE INTO employees (emp_id, name, password_hash, created_at)
-                VALUES (?, ?, ?, ?)
-            ''', (emp_id, name, pw_hash, now))
-            
-            if c.rowcount > 0:
-                count += 1
-            
-        conn.commit()
-        conn.close()
-        return count, "성공"
-        
+        report = import_employees_from_excel(filepath)
+        return report['inserted'], format_import_report(report)
     except Exception as e:
         return 0, f"오류 발생: {str(e)}"
 
@@ -217,11 +748,11 @@ def verify_user(emp_id, password_raw):
             return user
     return None
 
-def find_employees_by_name(name):
-    """이름으로 사원 검색 (부분 일치)"""
+def find_employees_by_name(name, limit=50):
+    """이름으로 사원 검색 (부분 일치, 최대 limit건). 관리자 화면은 name_search 인덱스를 사용"""
     conn = get_db_connection()
-    # 이름이 포함된 모든 사원 검색
-    rows = conn.execute('SELECT emp_id, name FROM employees WHERE name LIKE ?', (f'%{name}%',)).fetchall()
+    # 이름이 포함된 사원 검색
+    rows = conn.execute('SELECT emp_id, name FROM employees WHERE name LIKE ? LIMIT ?', (f'%{name}%', limit)).fetchall()
     conn.close()
     return [dict(row) for row in rows]
 
@@ -237,7 +768,11 @@ def update_password(emp_id, new_password):
     conn = get_db_connection()
     try:
         pw_hash = hash_val(new_password)
-        conn.execute('UPDATE employees SET password_hash = ? WHERE emp_id = ?', (pw_hash, emp_id))
+        is_default = int(str(new_password) == str(emp_id))
+        conn.execute(
+            'UPDATE employees SET password_hash = ?, is_default_password = ? WHERE emp_id = ?',
+            (pw_hash, is_default, emp_id)
+        )
         conn.commit()
         return True
     except Exception as e:
@@ -257,7 +792,10 @@ def reset_password_to_default(emp_id):
 
         # 비밀번호를 사번으로 해시하여 업데이트
         default_pw_hash = hash_val(emp_id)
-        conn.execute('UPDATE employees SET password_hash = ? WHERE emp_id = ?', (default_pw_hash, emp_id))
+        conn.execute(
+            'UPDATE employees SET password_hash = ?, is_default_password = 1 WHERE emp_id = ?',
+            (default_pw_hash, emp_id)
+        )
         conn.commit()
         return True
     except Exception as e:
@@ -266,52 +804,186 @@ def reset_password_to_default(emp_id):
     finally:
         conn.close()
 
-def reset_all_data():
-    """모든 데이터 초기화 (시스템 설정 제외)"""
+# --- 이용 내역 관리 ---
+
+# 보관 DB에 옮겨진 내역의 최대 이용일자 (archive.py가 옮기는 트랜잭션에서 갱신)
+ARCHIVE_MAX_DATE_KEY = 'archive_max_date'
+ARCHIVE_MAX_ACTIVE_DATE_KEY = 'archive_max_active_date'
+
+def _archive_boundary(conn, active_only=True):
+    """보관 DB 내역(active_only이면 취소 제외)의 최대 이용일자. 보관된 내역이 없으면 None"""
+    key = ARCHIVE_MAX_ACTIVE_DATE_KEY if active_only else ARCHIVE_MAX_DATE_KEY
+    row = conn.execute('SELECT value FROM system_settings WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+
+def _fetch_usage_rows(conn, build_query, limit, active_only=True):
+    """
+    최신순 LIMIT 조회를 hot 테이블에서 먼저 실행하고, limit건을 채우면서 마지막 행이
+    보관 경계보다 최신이면 그대로 반환합니다. (평소 조회는 보관 DB를 읽지 않음)
+    보관된 내역이 결과에 들어갈 수 있으면 hot + 보관 뷰로 다시 조회합니다.
+    build_query(source) -> (query, params)
+    """
+    rows = conn.execute(*build_query(HOT_USAGE_SOURCE)).fetchall()
+    boundary = _archive_boundary(conn, active_only)
+    if boundary is None:
+        return rows
+    if len(rows) >= limit and rows[-1]['usage_date'] is not None and rows[-1]['usage_date'] > boundary:
+        return rows
+    return conn.execute(*build_query(ALL_USAGE_SOURCE)).fetchall()
+
+def _bump_data_versions(conn, emp_ids):
+    """사원별 데이터 버전 증가 (현재 트랜잭션 안에서 호출)"""
+    conn.executemany(
+        'UPDATE employees SET data_version = data_version + 1 WHERE emp_id = ?',
+        [(emp_id,) for emp_id in emp_ids]
+    )
+
+def get_employee_data_version(emp_id):
+    """
+    사원의 (data_version, is_default_password, 데이터 세대) 반환. 사원이 없으면 None.
+    이용 내역을 조회하지 않고 ETag를 만들기 위한 가벼운 조회입니다.
+    초기화/스냅샷 복원은 data_version을 되돌리므로, 복원 전에 받은 ETag와 겹치지 않도록
+    같은 조회에서 데이터 세대도 함께 읽습니다.
+    """
+    conn = get_db_connection()
+    row = conn.execute(
+        'SELECT data_version, is_default_password, '
+        '(SELECT value FROM system_settings WHERE key = ?) AS generation '
+        'FROM employees WHERE emp_id = ?', (DATA_GENERATION_KEY, emp_id)
+    ).fetchone()
+    conn.close()
+    return (row['data_version'], row['is_default_password'], row['generation']) if row else None
+
+def _insert_usage_records(conn, records, now=None):
+    """
+    주어진 커넥션의 현재 트랜잭션 안에서 이용 내역을 일괄 INSERT하고 새 id 목록을 반환합니다.
+    호출 측이 BEGIN IMMEDIATE로 쓰기 잠금을 잡고 있어야 id 구간이 다른 쓰기와 섞이지 않습니다.
+    """
+    now = now or datetime.now(KST)
+    prev_max = conn.execute('SELECT COALESCE(MAX(id), 0) FROM usage_records').fetchone()[0]
+    conn.executemany('''
+        INSERT INTO usage_records (emp_id, usage_date, item_name, quantity, amount, room_number, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (r['emp_id'], r['usage_date'], r['item_name'], r['quantity'], r['amount'], r.get('room_number'), now)
+        for r in records
+    ])
+    rows = conn.execute('SELECT id FROM usage_records WHERE id > ? ORDER BY id', (prev_max,)).fetchall()
+    # 월별 요약도 같은 트랜잭션에서 갱신
+    conn.executemany('''
+        INSERT INTO usage_monthly_summary (month, emp_id, item_name, quantity, amount, record_count)
+        VALUES (substr(?, 1, 7), ?, ?, ?, ?, 1)
+        ON CONFLICT (month, emp_id, item_name) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            amount = amount + excluded.amount,
+            record_count = record_count + 1
+    ''', [(r['usage_date'], r['emp_id'], r['item_name'], r['quantity'], r['amount']) for r in records])
+    _bump_data_versions(conn, {r['emp_id'] for r in records})
+    return [row[0] for row in rows]
+
+def add_usage_records_batch(records):
+    """
+    이용 내역 여러 건을 하나의 트랜잭션으로 등록합니다. (장바구니 단위)
+    records: [{'emp_id', 'usage_date', 'item_name', 'quantity', 'amount', 'room_number'}, ...]
+    성공 시 새 id 목록, 실패 시 None을 반환하며 실패하면 한 건도 저장되지 않습니다.
+    """
+    if not records:
+        return []
     conn = get_db_connection()
     try:
-        # 사원 정보와 이용 내역 삭제 (순서 중요: FK 때문에 usage_records 먼저)
-        conn.execute('DELETE FROM usage_records')
-        conn.execute('DELETE FROM employees')
-        
-        # 시퀀스 초기화 (선택 사항)
-        conn.execute("DELETE FROM sqlite_sequence WHERE name IN ('usage_records', 'employees')")
-        
+        conn.execute('BEGIN IMMEDIATE')
+        ids = _insert_usage_records(conn, records)
         conn.commit()
-        return True, "모든 데이터가 초기화되었습니다."
+        return ids
     except Exception as e:
-        print(f"Error resetting data: {e}")
-        return False, str(e)
+        conn.rollback()
+        print(f"Error adding usage records: {e}")
+        return None
     finally:
         conn.close()
 
-# --- 이용 내역 관리 ---
+# --- 멱등 키 (재전송 중복 등록 방지, idempotency.py에서 사용) ---
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 3600))
 
-def add_usage_record(emp_id, usage_date, item_name, quantity, amount, room_number=None):
+def _insert_usage_records_once(conn, records, now, idempotency):
+    """
+    _insert_usage_records + 멱등 키. idempotency: (scope, key, fingerprint)
+    같은 키가 IDEMPOTENCY_TTL_SECONDS 안에 이미 처리되었으면 INSERT 없이 (저장된 id 목록, 저장된 fingerprint),
+    처음이면 INSERT 후 같은 트랜잭션에 키를 기록하고 (새 id 목록, None)을 반환합니다.
+    (BEGIN IMMEDIATE 안에서 조회하므로 다른 워커로 동시에 재전송되어도 한 번만 등록)
+    """
+    scope, key, fingerprint = idempotency
+    row = conn.execute(
+        'SELECT fingerprint, result FROM idempotency_keys WHERE scope = ? AND key = ? AND created_at >= ?',
+        (scope, key, now - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS))
+    ).fetchone()
+    if row is not None:
+        return json.loads(row['result']), row['fingerprint']
+    ids = _insert_usage_records(conn, records, now)
+    # 만료되었지만 아직 정리되지 않은 같은 키는 덮어씀
+    conn.execute('''
+        INSERT OR REPLACE INTO idempotency_keys (scope, key, fingerprint, result, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (scope, key, fingerprint, json.dumps(ids), now))
+    return ids, None
+
+def add_usage_records_once(records, idempotency):
+    """
+    멱등 키를 붙인 add_usage_records_batch.
+    반환: _insert_usage_records_once와 같은 (id 목록, 저장된 fingerprint 또는 None), 실패 시 None
+    """
     conn = get_db_connection()
     try:
-        conn.execute('''
-            INSERT INTO usage_records (emp_id, usage_date, item_name, quantity, amount, room_number, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (emp_id, usage_date, item_name, quantity, amount, room_number, datetime.now(KST)))
+        conn.execute('BEGIN IMMEDIATE')
+        result = _insert_usage_records_once(conn, records, datetime.now(KST), idempotency)
         conn.commit()
-        return True
+        return result
     except Exception as e:
-        print(f"Error adding usage record: {e}")
-        return False
+        conn.rollback()
+        print(f"Error adding usage records: {e}")
+        return None
     finally:
         conn.close()
 
-def get_usage_records(emp_id=None, limit=100, search_emp_id=None):
-    """
-    이용 내역 조회. 
-    emp_id가 있으면 해당 사원만(사용자용), 없으면 전체(관리자용, 최신순).
-    search_emp_id가 있으면 관리자 모드에서 특정 사원의 내역만 필터링.
-    """
+def find_idempotency_key(scope, key):
+    """처리된 키의 (id 목록, fingerprint, 처리 시각). 없거나 만료되었으면 None (쓰기 전 빠른 확인용)"""
     conn = get_db_connection()
-    query = '''
+    row = conn.execute(
+        'SELECT fingerprint, result, created_at FROM idempotency_keys WHERE scope = ? AND key = ? AND created_at >= ?',
+        (scope, key, datetime.now(KST) - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS))
+    ).fetchone()
+    conn.close()
+    return (json.loads(row['result']), row['fingerprint'], row['created_at']) if row else None
+
+def delete_expired_idempotency_keys():
+    """만료된 멱등 키 삭제. 반환: 삭제 건수"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            'DELETE FROM idempotency_keys WHERE created_at < ?',
+            (datetime.now(KST) - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),)
+        )
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        conn.rollback()
+        print(f"Error deleting expired idempotency keys: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def add_usage_record(emp_id, usage_date, item_name, quantity, amount, room_number=None):
+    ids = add_usage_records_batch([{
+        'emp_id': emp_id, 'usage_date': usage_date, 'item_name': item_name,
+        'quantity': quantity, 'amount': amount, 'room_number': room_number,
+    }])
+    return ids is not None
+
+def _build_usage_records_query(emp_id=None, limit=100, search_emp_id=None, source=HOT_USAGE_SOURCE):
+    """get_usage_records의 SQL과 파라미터 생성 (실행 계획 점검에서도 사용)"""
+    query = f'''
         SELECT r.*, e.name 
-        FROM usage_records r
+        FROM {source} r
         LEFT JOIN employees e ON r.emp_id = e.emp_id
     '''
     params = []
@@ -330,22 +1002,295 @@ def get_usage_records(emp_id=None, limit=100, search_emp_id=None):
         
     query += ' ORDER BY r.usage_date DESC, r.created_at DESC LIMIT ?'
     params.append(limit)
-    
-    rows = conn.execute(query, tuple(params)).fetchall()
+    return query, tuple(params)
+
+def get_usage_records(emp_id=None, limit=100, search_emp_id=None):
+    """
+    이용 내역 조회. 
+    emp_id가 있으면 해당 사원만(사용자용), 없으면 전체(관리자용, 최신순).
+    search_emp_id가 있으면 관리자 모드에서 특정 사원의 내역만 필터링.
+    """
+    conn = get_db_connection()
+    rows = _fetch_usage_rows(
+        conn, lambda source: _build_usage_records_query(emp_id, limit, search_emp_id, source), limit
+    )
     conn.close()
     return [dict(row) for row in rows]
 
+def get_dashboard_data(emp_id, limit=10):
+    """
+    대시보드용 데이터를 한 번의 쿼리로 조회합니다.
+    반환: (최근 이용 내역 목록, 초기 비밀번호 사용 여부)
+    """
+    conn = get_db_connection()
+    rows = _fetch_usage_rows(conn, lambda source: (f'''
+        SELECT e.is_default_password, e.name, r.*
+        FROM employees e
+        LEFT JOIN (
+            SELECT * FROM {source}
+            WHERE emp_id = ? AND is_canceled = 0
+            ORDER BY usage_date DESC, created_at DESC
+            LIMIT ?
+        ) r ON 1
+        WHERE e.emp_id = ?
+        ORDER BY r.usage_date DESC, r.created_at DESC
+    ''', (emp_id, limit, emp_id)), limit)
+    conn.close()
+    
+    if not rows:
+        return [], False
+    is_default_pw = bool(rows[0]['is_default_password'])
+    records = []
+    for row in rows:
+        if row['id'] is None:
+            continue
+        record = dict(row)
+        del record['is_default_password']
+        records.append(record)
+    return records, is_default_pw
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+def _encode_cursor(row):
+    """마지막 행의 정렬 키 (usage_date, created_at, id)를 불투명 커서 문자열로 변환"""
+    key = [row['usage_date'], row['created_at'], row['id']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor):
+    """커서 문자열을 (usage_date, created_at, id)로 변환. 형식이 잘못되면 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        usage_date, created_at, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(usage_date), str(created_at), int(record_id)
+    except Exception:
+        raise ValueError('잘못된 커서입니다.')
+
+def _build_history_page_query(emp_id, limit, after=None, source=HOT_USAGE_SOURCE):
+    """키셋 페이지 SQL 생성. after는 이전 페이지 마지막 행의 (usage_date, created_at, id)"""
+    query = f'''
+        SELECT r.*, e.name
+        FROM {source} r
+        LEFT JOIN employees e ON r.emp_id = e.emp_id
+        WHERE r.emp_id = ? AND r.is_canceled = 0
+    '''
+    params = [emp_id]
+    if after:
+        query += ' AND (r.usage_date, r.created_at, r.id) < (?, ?, ?)'
+        params.extend(after)
+    query += ' ORDER BY r.usage_date DESC, r.created_at DESC, r.id DESC LIMIT ?'
+    params.append(limit)
+    return query, tuple(params)
+
+def get_usage_records_page(emp_id, page_size=HISTORY_PAGE_SIZE, cursor=None):
+    """
+    사용자 이용 내역 키셋 페이지 조회 (최신순).
+    cursor는 이전 페이지 응답의 next_cursor이며, 반환값은 (records, next_cursor)입니다.
+    마지막 페이지이면 next_cursor는 None입니다.
+    """
+    page_size = max(1, min(int(page_size), HISTORY_MAX_PAGE_SIZE))
+    after = _decode_cursor(cursor) if cursor else None
+    # 다음 페이지 존재 여부 확인을 위해 1건 더 조회
+    conn = get_db_connection()
+    rows = _fetch_usage_rows(
+        conn, lambda source: _build_history_page_query(emp_id, page_size + 1, after, source), page_size + 1
+    )
+    conn.close()
+    
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = _encode_cursor(rows[-1]) if has_more else None
+    return [dict(row) for row in rows], next_cursor
+
+# --- 관리자 이용 내역 검색 ---
+
+ADMIN_SEARCH_PAGE_SIZE = 100
+ADMIN_SEARCH_MAX_PAGE_SIZE = 500
+ADMIN_SEARCH_STATUSES = ('active', 'canceled', 'all')
+# 이름 앞부분 검색의 범위 상한 (name >= '홍' AND name < '홍' + 이 문자)
+_NAME_PREFIX_END = '\U0010ffff'
+
+def normalize_usage_filters(date_from=None, date_to=None, item_name=None, room_number=None,
+                            emp_id=None, name=None, status=None):
+    """
+    관리자 검색 조건 정리: 빈 값은 None, status 기본값은 'active'(정상만).
+    형식이 잘못되면 ValueError. 반환 dict는 건수/합계 캐시 키로도 사용합니다.
+    """
+    def clean(value):
+        value = str(value).strip() if value is not None else ''
+        return value or None
+
+    filters = {
+        'date_from': clean(date_from),
+        'date_to': clean(date_to),
+        'item_name': clean(item_name),
+        'room_number': clean(room_number),
+        'emp_id': clean(emp_id),
+        'name': clean(name),
+        'status': clean(status) or 'active',
+    }
+    for key in ('date_from', 'date_to'):
+        if filters[key]:
+            try:
+                datetime.strptime(filters[key], '%Y-%m-%d')
+            except ValueError:
+                raise ValueError('날짜 형식이 올바르지 않습니다. (YYYY-MM-DD)')
+    if filters['room_number'] is not None:
+        try:
+            filters['room_number'] = int(filters['room_number'])
+        except ValueError:
+            raise ValueError('방 번호는 숫자여야 합니다.')
+    if filters['status'] not in ADMIN_SEARCH_STATUSES:
+        raise ValueError('잘못된 상태 조건입니다.')
+    return filters
+
+def _usage_filter_conditions(filters):
+    """검색 조건 -> (WHERE 조건 목록, 파라미터 목록)"""
+    conditions = []
+    params = []
+    if filters['status'] == 'active':
+        conditions.append('r.is_canceled = 0')
+    elif filters['status'] == 'canceled':
+        conditions.append('r.is_canceled = 1')
+    if filters['emp_id']:
+        conditions.append('r.emp_id = ?')
+        params.append(filters['emp_id'])
+    if filters['name']:
+        conditions.append('r.emp_id IN (SELECT emp_id FROM employees WHERE name >= ? AND name < ?)')
+        params.extend([filters['name'], filters['name'] + _NAME_PREFIX_END])
+    if filters['date_from']:
+        conditions.append('r.usage_date >= ?')
+        params.append(filters['date_from'])
+    if filters['date_to']:
+        conditions.append('r.usage_date <= ?')
+        params.append(filters['date_to'])
+    if filters['item_name']:
+        conditions.append('r.item_name = ?')
+        params.append(filters['item_name'])
+    if filters['room_number'] is not None:
+        conditions.append('r.room_number = ?')
+        params.append(filters['room_number'])
+    return conditions, params
+
+def _build_admin_search_query(filters, limit, after=None, source=HOT_USAGE_SOURCE):
+    """관리자 검색 키셋 페이지 SQL 생성. after는 이전 페이지 마지막 행의 (usage_date, created_at, id)"""
+    conditions, params = _usage_filter_conditions(filters)
+    if after:
+        conditions.append('(r.usage_date, r.created_at, r.id) < (?, ?, ?)')
+        params.extend(after)
+    query = f'''
+        SELECT r.*, e.name
+        FROM {source} r
+        LEFT JOIN employees e ON r.emp_id = e.emp_id
+    '''
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY r.usage_date DESC, r.created_at DESC, r.id DESC LIMIT ?'
+    params.append(limit)
+    return query, tuple(params)
+
+def _build_admin_totals_query(filters, source=ALL_USAGE_SOURCE):
+    """검색 조건의 건수/수량/금액 합계 SQL 생성"""
+    conditions, params = _usage_filter_conditions(filters)
+    query = f'''
+        SELECT COUNT(*) AS records, COALESCE(SUM(r.quantity), 0) AS quantity, COALESCE(SUM(r.amount), 0) AS amount
+        FROM {source} r
+    '''
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    return query, tuple(params)
+
+def search_usage_records(filters, page_size=ADMIN_SEARCH_PAGE_SIZE, cursor=None):
+    """
+    관리자 이용 내역 검색 (최신순 키셋 페이지, 보관 내역 포함).
+    filters는 normalize_usage_filters()의 반환값, cursor는 이전 페이지의 next_cursor입니다.
+    반환: (records, next_cursor) - 마지막 페이지이면 next_cursor는 None
+    """
+    page_size = max(1, min(int(page_size), ADMIN_SEARCH_MAX_PAGE_SIZE))
+    after = _decode_cursor(cursor) if cursor else None
+    conn = get_db_connection()
+    rows = _fetch_usage_rows(
+        conn, lambda source: _build_admin_search_query(filters, page_size + 1, after, source), page_size + 1,
+        active_only=filters['status'] == 'active'
+    )
+    conn.close()
+    
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = _encode_cursor(rows[-1]) if has_more else None
+    return [dict(row) for row in rows], next_cursor
+
+def get_usage_totals(filters):
+    """
+    검색 조건에 맞는 내역의 건수/수량/금액 합계 (보관 내역 포함).
+    관리자 화면은 조건별로 캐시하는 totals_cache.get_totals()를 사용합니다.
+    """
+    conn = get_db_connection()
+    try:
+        boundary = _archive_boundary(conn, active_only=filters['status'] == 'active')
+        # 보관된 내역이 조건 기간에 들 수 없으면 hot 테이블만 집계
+        if boundary is None or (filters['date_from'] and filters['date_from'] > boundary):
+            source = HOT_USAGE_SOURCE
+        else:
+            source = ALL_USAGE_SOURCE
+        row = conn.execute(*_build_admin_totals_query(filters, source)).fetchone()
+    finally:
+        conn.close()
+    return {'records': row['records'], 'quantity': row['quantity'], 'amount': row['amount']}
+
+def _cancel_usage_record(conn, record_id, emp_id=None, now=None):
+    """
+    현재 트랜잭션 안에서 이용 내역 1건을 취소 처리하고 월별 요약에서 차감합니다.
+    emp_id가 있으면 본인 내역만 취소합니다. 이미 취소된 내역이면 False를 반환합니다.
+    """
+    query = '''
+        SELECT id, emp_id, usage_date, item_name, quantity, amount
+        FROM {table} WHERE id = ? AND is_canceled = 0
+    '''
+    params = [record_id]
+    if emp_id is not None:
+        query += ' AND emp_id = ?'
+        params.append(emp_id)
+    table = 'main.usage_records'
+    record = conn.execute(query.format(table=table), tuple(params)).fetchone()
+    if record is None:
+        # 보관 DB로 옮겨진 내역 (옮기는 도중이라 hot 테이블에도 있으면 hot 쪽이 기준)
+        exists_in_hot = conn.execute('SELECT 1 FROM main.usage_records WHERE id = ?', (record_id,)).fetchone()
+        if exists_in_hot:
+            return False
+        table = 'archive.usage_records'
+        record = conn.execute(query.format(table=table), tuple(params)).fetchone()
+        if record is None:
+            return False
+    
+    conn.execute(
+        f"UPDATE {table} SET is_canceled = 1, canceled_at = ? WHERE id = ?",
+        (now or datetime.now(KST), record_id)
+    )
+    month = record['usage_date'][:7]
+    conn.execute('''
+        UPDATE usage_monthly_summary
+        SET quantity = quantity - ?, amount = amount - ?, record_count = record_count - 1
+        WHERE month = ? AND emp_id = ? AND item_name = ?
+    ''', (record['quantity'], record['amount'], month, record['emp_id'], record['item_name']))
+    conn.execute('''
+        DELETE FROM usage_monthly_summary
+        WHERE month = ? AND emp_id = ? AND item_name = ? AND record_count <= 0
+    ''', (month, record['emp_id'], record['item_name']))
+    _bump_data_versions(conn, [record['emp_id']])
+    return True
+
 def delete_usage_record(record_id, emp_id):
     """특정 이용 내역 삭제 (Soft Delete: 취소 처리)"""
     conn = get_db_connection()
-    c = conn.cursor()
     try:
         # 본인의 글인지 확인하고 Soft Delete 수행
-        now_kst = datetime.now(KST)
-        c.execute("UPDATE usage_records SET is_canceled = 1, canceled_at = ? WHERE id = ? AND emp_id = ?", (now_kst, record_id, emp_id))
+        conn.execute('BEGIN IMMEDIATE')
+        canceled = _cancel_usage_record(conn, record_id, emp_id)
         conn.commit()
-        return c.rowcount > 0 # 업데이트된 행이 있으면 True
+        return canceled # 취소된 행이 있으면 True
     except Exception as e:
+        conn.rollback()
         print(f"Error deleting record: {e}")
         return False
     finally:
@@ -354,23 +1299,107 @@ def delete_usage_record(record_id, emp_id):
 def admin_cancel_usage_record(record_id):
     """관리자용 특정 이용 내역 삭제 (Soft Delete: 취소 처리). 사번 검증 없음."""
     conn = get_db_connection()
-    c = conn.cursor()
     try:
-        now_kst = datetime.now(KST)
-        c.execute("UPDATE usage_records SET is_canceled = 1, canceled_at = ? WHERE id = ?", (now_kst, record_id))
+        conn.execute('BEGIN IMMEDIATE')
+        canceled = _cancel_usage_record(conn, record_id)
         conn.commit()
-        return c.rowcount > 0 # 업데이트된 행이 있으면 True
+        return canceled # 취소된 행이 있으면 True
     except Exception as e:
+        conn.rollback()
         print(f"Error admin canceling record: {e}")
         return False
     finally:
         conn.close()
 
-def get_all_usage_records_df():
-    """전체 이용 내역을 DataFrame으로 반환 (엑셀 다운로드용)"""
+# 관리자 일괄 처리 한 번에 받을 최대 항목 수 (취소 + 대리 등록)
+ADMIN_BATCH_MAX_ITEMS = 500
+
+def admin_apply_batch(cancel_ids, records, commit=True):
+    """
+    관리자 일괄 취소/대리 등록을 하나의 트랜잭션으로 실행합니다. (취소 -> 등록 순)
+    cancel_ids: 취소할 내역 id 목록, records: add_usage_records_batch와 같은 형식
+    반환: (committed, cancel_results, record_ids)
+      cancel_results[i]: 취소되었으면 True (없는 내역/이미 취소/같은 요청 안의 중복이면 False)
+      record_ids[i]: 새 id, 사번이 명부에 없으면 None
+    모두 성공하고 commit이면 커밋하고, 하나라도 실패하거나 commit=False(dry-run)이면 전체를 되돌립니다.
+    """
     conn = get_db_connection()
-    query = '''
-        SELECT 
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        # 쓰기 잠금을 얻은 뒤의 시각 (취소일시 순서 = 커밋 순서, 증분 내보내기 워터마크 기준)
+        now = datetime.now(KST)
+        cancel_results = [_cancel_usage_record(conn, record_id, now=now) for record_id in cancel_ids]
+
+        emp_ids = list({r['emp_id'] for r in records})
+        known = {row[0] for row in conn.execute(
+            f"SELECT emp_id FROM employees WHERE emp_id IN ({','.join('?' * len(emp_ids))})", emp_ids
+        )} if emp_ids else set()
+        valid = [r for r in records if r['emp_id'] in known]
+        new_ids = iter(_insert_usage_records(conn, valid, now) if valid else [])
+        record_ids = [next(new_ids) if r['emp_id'] in known else None for r in records]
+
+        committed = commit and all(cancel_results) and None not in record_ids
+        if committed:
+            conn.commit()
+        else:
+            conn.rollback()
+        return committed, cancel_results, record_ids
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# --- 월별 요약 (급여 공제) ---
+
+def rebuild_monthly_summary():
+    """월별 요약 테이블을 이용 내역(보관 DB 포함)에서 다시 계산합니다. (백필/정합성 복구용)"""
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM usage_monthly_summary')
+        # 보관 DB로 옮긴 내역도 합계에 포함
+        conn.execute(REBUILD_MONTHLY_SUMMARY_SQL.replace('FROM usage_records', f'FROM {ALL_USAGE_SOURCE}'))
+        count = conn.execute('SELECT COUNT(*) FROM usage_monthly_summary').fetchone()[0]
+        conn.commit()
+        return count
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_monthly_billing(month):
+    """
+    월별 사원 공제 내역 (취소 제외).
+    month: 'YYYY-MM'
+    반환: [{'emp_id', 'name', 'quantity', 'amount', 'items': {상품명: {'quantity', 'amount'}}}, ...] (사번순)
+    """
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT s.emp_id, e.name, s.item_name, s.quantity, s.amount
+        FROM usage_monthly_summary s
+        LEFT JOIN employees e ON s.emp_id = e.emp_id
+        WHERE s.month = ?
+        ORDER BY s.emp_id, s.item_name
+    ''', (month,)).fetchall()
+    conn.close()
+    
+    billing = []
+    for row in rows:
+        if not billing or billing[-1]['emp_id'] != row['emp_id']:
+            billing.append({'emp_id': row['emp_id'], 'name': row['name'], 'quantity': 0, 'amount': 0, 'items': {}})
+        entry = billing[-1]
+        entry['quantity'] += row['quantity']
+        entry['amount'] += row['amount']
+        entry['items'][row['item_name']] = {'quantity': row['quantity'], 'amount': row['amount']}
+    return billing
+
+EXPORT_COLUMNS = ["이용일자", "사번", "이름", "상품명", "수량", "금액", "상태", "등록일시", "취소일시"]
+EXPORT_CHUNK_SIZE = 2000
+
+# EXPORT_COLUMNS 순서의 SELECT 목록 (r: 이용 내역, e: 사원)
+_EXPORT_SELECT_COLUMNS = '''
             r.usage_date as "이용일자", 
             e.emp_id as "사번", 
             e.name as "이름",
@@ -383,16 +1412,296 @@ def get_all_usage_records_df():
             END as "상태",
             r.created_at as "등록일시",
             r.canceled_at as "취소일시"
-        FROM usage_records r
+'''
+
+def _build_export_query(date_from=None, date_to=None, status=None, source=HOT_USAGE_SOURCE):
+    """
+    엑셀/CSV 내보내기 SQL 생성.
+    date_from/date_to: 이용일자 범위 (YYYY-MM-DD, 양 끝 포함)
+    status: 'active'(정상만), 'canceled'(취소만), None(전체)
+    source: HOT_USAGE_SOURCE 또는 보관 DB까지 포함하는 ALL_USAGE_SOURCE
+    """
+    query = f'''
+        SELECT {_EXPORT_SELECT_COLUMNS}
+        FROM {source} r
         LEFT JOIN employees e ON r.emp_id = e.emp_id
-        ORDER BY r.usage_date DESC, r.created_at DESC
     '''
-    df = pd.read_sql_query(query, conn)
+    conditions = []
+    params = []
+    if date_from:
+        conditions.append('r.usage_date >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append('r.usage_date <= ?')
+        params.append(date_to)
+    if status == 'active':
+        conditions.append('r.is_canceled = 0')
+    elif status == 'canceled':
+        conditions.append('r.is_canceled = 1')
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY r.usage_date DESC, r.created_at DESC'
+    return query, tuple(params)
+
+def get_all_usage_records_df():
+    """전체 이용 내역을 DataFrame으로 반환 (엑셀 다운로드용)"""
+    import pandas as pd
+    conn = get_db_connection()
+    query, params = _build_export_query(source=ALL_USAGE_SOURCE)
+    df = pd.read_sql_query(query, conn, params=params)
     conn.close()
     return df
 
+def iter_usage_export_rows(date_from=None, date_to=None, status=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    내보내기용 행을 chunk_size 단위 리스트로 생성합니다. (전체를 메모리에 올리지 않음)
+    스트리밍 응답은 요청 teardown 이후에도 계속 읽으므로 요청 커넥션 대신 풀에서 따로 빌려 씁니다.
+    """
+    conn = get_pool().acquire()
+    try:
+        # 시작일이 보관 경계 이후이면 hot 테이블만 읽음
+        boundary = _archive_boundary(conn, active_only=(status == 'active'))
+        if boundary is not None and (date_from is None or date_from <= boundary):
+            source = ALL_USAGE_SOURCE
+        else:
+            source = HOT_USAGE_SOURCE
+        query, params = _build_export_query(date_from, date_to, status, source)
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [tuple(row) for row in rows]
+    finally:
+        conn.close()
+
+# --- 증분 내보내기 (급여 연동) ---
+# 사용처(consumer)마다 마지막으로 내보낸 위치(워터마크)를 system_settings에 저장하고
+# 그 이후 등록된 내역(id > last_id)과 취소된 기존 내역((canceled_at, id) > 마지막 취소)만 내보냅니다.
+# 신규는 PRIMARY KEY 범위, 취소는 취소일시 인덱스 범위로 읽으므로 읽는 양은 변경 건수에 비례합니다.
+# (id와 취소일시는 모두 쓰기 잠금(BEGIN IMMEDIATE)을 얻은 뒤에 정해지므로 늦게 커밋된 변경이 워터마크 앞에 끼어들지 않음.
+#  취소 경로 - 개별 취소, 관리자 일괄 처리, write_queue 묶음 커밋 - 는 모두 잠금 후 시각을 사용해야 함)
+DELTA_WATERMARK_PREFIX = 'delta_watermark:'
+DELTA_CONSUMER_MAX_LENGTH = 32
+DELTA_EXPORT_COLUMNS = ["구분", "내역번호"] + EXPORT_COLUMNS
+
+def normalize_delta_consumer(consumer):
+    """사용처 이름 검사 (영문/숫자/-/_). 잘못되면 ValueError"""
+    consumer = (consumer or '').strip()
+    if not consumer or len(consumer) > DELTA_CONSUMER_MAX_LENGTH or not all(
+        ch.isascii() and (ch.isalnum() or ch in '-_') for ch in consumer
+    ):
+        raise ValueError(f'사용처 이름은 영문/숫자/-/_ {DELTA_CONSUMER_MAX_LENGTH}자 이내로 입력해주세요.')
+    return consumer
+
+def _empty_watermark():
+    return {'last_id': 0, 'canceled_at': '', 'canceled_id': 0}
+
+def _watermark_position(watermark):
+    return watermark['last_id'], watermark['canceled_at'], watermark['canceled_id']
+
+def _read_delta_watermark(conn, consumer):
+    row = conn.execute(
+        'SELECT value FROM system_settings WHERE key = ?', (DELTA_WATERMARK_PREFIX + consumer,)
+    ).fetchone()
+    return json.loads(row[0]) if row else _empty_watermark()
+
+def _current_delta_watermark(conn, since):
+    """현재까지의 마지막 등록 id와 마지막 취소 (canceled_at, id). 변경이 없으면 since 값 유지"""
+    until = {**since}
+    for table in ('main.usage_records', 'archive.usage_records'):
+        last_id = conn.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0]
+        if last_id is not None and last_id > until['last_id']:
+            until['last_id'] = last_id
+        row = conn.execute(f'''
+            SELECT canceled_at, id FROM {table}
+            WHERE canceled_at IS NOT NULL
+            ORDER BY canceled_at DESC, id DESC LIMIT 1
+        ''').fetchone()
+        if row is not None and (row[0], row[1]) > (until['canceled_at'], until['canceled_id']):
+            until['canceled_at'], until['canceled_id'] = row[0], row[1]
+    return until
+
+def _build_delta_query(kind, since, until, source=ALL_USAGE_SOURCE):
+    """
+    증분 내보내기 SQL (DELTA_EXPORT_COLUMNS 순서).
+    kind: 'new'(since 이후 등록, 현재 상태 그대로) / 'canceled'(since 이전에 등록되어 그 이후 취소)
+    since 이후 등록되었다가 취소된 내역은 'new'에 취소 상태로 한 번만 나옵니다.
+    """
+    if kind == 'new':
+        label = '신규'
+        condition = 'r.id > ? AND r.id <= ?'
+        order = 'r.id'
+        params = (since['last_id'], until['last_id'])
+    else:
+        label = '취소'
+        condition = '(r.canceled_at, r.id) > (?, ?) AND (r.canceled_at, r.id) <= (?, ?) AND r.id <= ?'
+        order = 'r.canceled_at, r.id'
+        params = (since['canceled_at'], since['canceled_id'], until['canceled_at'], until['canceled_id'],
+                  since['last_id'])
+    query = f'''
+        SELECT '{label}' as "구분", r.id as "내역번호", {_EXPORT_SELECT_COLUMNS}
+        FROM {source} r
+        LEFT JOIN employees e ON r.emp_id = e.emp_id
+        WHERE {condition}
+        ORDER BY {order}
+    '''
+    return query, params
+
+def open_delta_export(consumer, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    사용처의 증분 내보내기 시작. 반환: (since, until, chunks)
+    since/until은 이전/새 워터마크, chunks는 신규 -> 취소 순으로 chunk_size 단위 행 리스트를 생성합니다.
+    워터마크 계산과 행 조회는 한 읽기 트랜잭션(같은 스냅샷)에서 실행하며, chunks를 끝까지 읽거나 close()하면
+    커넥션이 반환됩니다. 워터마크는 파일을 다 만든 뒤 advance_delta_watermark()로 옮깁니다.
+    """
+    conn = get_pool().acquire()
+    try:
+        conn.execute('BEGIN')
+        since = _read_delta_watermark(conn, consumer)
+        until = _current_delta_watermark(conn, since)
+    except Exception:
+        conn.close()
+        raise
+    return since, until, _iter_delta_rows(conn, since, until, chunk_size)
+
+def _iter_delta_rows(conn, since, until, chunk_size):
+    try:
+        for kind in ('new', 'canceled'):
+            cursor = conn.execute(*_build_delta_query(kind, since, until))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [tuple(row) for row in rows]
+    finally:
+        conn.close()
+
+def advance_delta_watermark(consumer, since, until):
+    """
+    사용처의 워터마크를 since -> until로 옮깁니다.
+    그 사이 다른 다운로드가 먼저 옮겼으면 False (같은 변경분이 두 번 나가거나 빠지지 않도록)
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        if _watermark_position(_read_delta_watermark(conn, consumer)) != _watermark_position(since):
+            conn.rollback()
+            return False
+        value = {**until, 'exported_at': datetime.now(KST).isoformat(timespec='seconds')}
+        conn.execute(
+            'INSERT OR REPLACE INTO system_settings (key, value) VALUES (?, ?)',
+            (DELTA_WATERMARK_PREFIX + consumer, json.dumps(value))
+        )
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def reset_delta_watermark(consumer, from_now=False):
+    """
+    워터마크 초기화. from_now이면 현재 시점으로 옮기고(이후 변경분만),
+    아니면 삭제합니다. (다음 다운로드는 전체 내역)
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        key = DELTA_WATERMARK_PREFIX + consumer
+        if from_now:
+            value = {**_current_delta_watermark(conn, _empty_watermark()),
+                     'exported_at': datetime.now(KST).isoformat(timespec='seconds')}
+            conn.execute('INSERT OR REPLACE INTO system_settings (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+        else:
+            conn.execute('DELETE FROM system_settings WHERE key = ?', (key,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_delta_watermarks():
+    """사용처별 워터마크 [{'consumer', 'last_id', 'canceled_at', 'canceled_id', 'exported_at'}, ...]"""
+    conn = get_db_connection()
+    rows = conn.execute(
+        'SELECT key, value FROM system_settings WHERE key >= ? AND key < ? ORDER BY key',
+        (DELTA_WATERMARK_PREFIX, DELTA_WATERMARK_PREFIX + _NAME_PREFIX_END)
+    ).fetchall()
+    conn.close()
+    return [{'consumer': row['key'][len(DELTA_WATERMARK_PREFIX):], **json.loads(row['value'])} for row in rows]
+
+def check_query_plans():
+    """
+    주요 조회 쿼리의 EXPLAIN QUERY PLAN을 확인합니다.
+    각 쿼리가 인덱스를 사용하고 정렬용 임시 B-tree가 없는지 여부를 반환합니다.
+    반환: {쿼리명: {'plan': [...], 'ok': bool}}
+    """
+    checks = {
+        '사용자 내역': _build_usage_records_query(emp_id='0000', limit=10),
+        '사용자 내역 (다음 페이지)': _build_history_page_query('0000', 51, ('2000-01-01', '', 0)),
+        '관리자 목록': _build_usage_records_query(limit=100),
+        '관리자 사번 검색': _build_usage_records_query(limit=100, search_emp_id='0000'),
+        '엑셀 다운로드': _build_export_query(),
+        '엑셀 다운로드 (기간)': _build_export_query('2000-01-01', '2000-01-31', 'active'),
+        '사용자 내역 (보관 포함)': _build_history_page_query('0000', 51, ('2000-01-01', '', 0), ALL_USAGE_SOURCE),
+        '관리자 목록 (보관 포함)': _build_usage_records_query(limit=100, source=ALL_USAGE_SOURCE),
+        '엑셀 다운로드 (보관 포함)': _build_export_query('2000-01-01', None, None, ALL_USAGE_SOURCE),
+        '관리자 검색 (기간)': _build_admin_search_query(
+            normalize_usage_filters('2000-01-01', '2000-01-31', status='all'), 101),
+        '관리자 검색 (다음 페이지)': _build_admin_search_query(
+            normalize_usage_filters(item_name='9홀', room_number=1), 101, ('2000-01-01', '', 0)),
+        '관리자 검색 (사번)': _build_admin_search_query(normalize_usage_filters(emp_id='0000'), 101),
+        '관리자 검색 (보관 포함)': _build_admin_search_query(
+            normalize_usage_filters(date_to='2000-01-31', status='canceled'), 101, ('2000-01-01', '', 0),
+            ALL_USAGE_SOURCE),
+        '증분 내보내기 (신규)': _build_delta_query('new', _empty_watermark(), _empty_watermark()),
+        '증분 내보내기 (취소)': _build_delta_query('canceled', _empty_watermark(), _empty_watermark()),
+    }
+    conn = get_db_connection()
+    results = {}
+    try:
+        for name, (query, params) in checks.items():
+            plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params).fetchall()]
+            # 보관 포함 뷰는 main.usage_records / a(보관) 로 펼쳐짐
+            scan_r = [d for d in plan if d.startswith(
+                ('SCAN r', 'SEARCH r', 'SCAN main.usage_records', 'SEARCH main.usage_records', 'SCAN a ', 'SEARCH a ')
+            )]
+            ok = (
+                all(any(u in d for u in ('USING INDEX', 'USING COVERING INDEX', 'USING INTEGER PRIMARY KEY'))
+                    for d in scan_r)
+                and not any('TEMP B-TREE' in d for d in plan)
+            )
+            results[name] = {'plan': plan, 'ok': ok}
+    finally:
+        conn.close()
+    return results
+
 # --- 설정 관리 ---
 
+# 데이터 세대: 초기화/스냅샷 복원으로 DB 내용이 통째로 바뀔 때마다 새 값으로 바뀜
+# (id가 다시 시작되거나 되돌아간 것을 analytics 스냅샷 등이 알아차리도록)
+DATA_GENERATION_KEY = 'data_generation'
+
+def get_data_generation(conn):
+    """주어진 커넥션에서 읽은 데이터 세대. 한 번도 바뀐 적 없으면 None"""
+    row = conn.execute('SELECT value FROM system_settings WHERE key = ?', (DATA_GENERATION_KEY,)).fetchone()
+    return row[0] if row else None
+
+def rotate_data_generation():
+    """데이터 세대를 새 값으로 바꾸고 반환 (snapshots에서 DB 파일 교체 직후 호출)"""
+    generation = uuid.uuid4().hex
+    conn = get_pool().acquire()
+    try:
+        conn.execute('INSERT OR REPLACE INTO system_settings (key, value) VALUES (?, ?)',
+                     (DATA_GENERATION_KEY, generation))
+        conn.commit()
+    finally:
+        conn.close()
+    return generation
+
 def get_setting(key, default=None):
     conn = get_db_connection()
     row = conn.execute('SELECT value FROM system_settings WHERE key = ?', (key,)).fetchone()
@@ -406,4 +1715,18 @@ def set_setting(key, value):
     conn.close()
 
 if __name__ == '__main__':
+    import sys
     init_db()
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    # python database.py explain : 인덱스 사용 여부 점검
+    if command == 'explain':
+        all_ok = True
+        for name, result in check_query_plans().items():
+            print(f"[{'OK' if result['ok'] else 'FAIL'}] {name}")
+            for detail in result['plan']:
+                print(f"    {detail}")
+            all_ok = all_ok and result['ok']
+        sys.exit(0 if all_ok else 1)
+    # python database.py rebuild-summary : 월별 요약 테이블 재계산
+    elif command == 'rebuild-summary':
+        print(f"Monthly summary rebuilt: {rebuild_monthly_summary()} rows")
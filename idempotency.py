@@ -0,0 +1,138 @@
+"""
+등록 요청 멱등 키 (모바일에서 응답을 못 받고 다시 누른 요청의 중복 등록 방지).
+클라이언트가 같은 등록 내용에 같은 키(Idempotency-Key 헤더)를 붙여 보내면
+IDEMPOTENCY_TTL_SECONDS 안의 재전송은 다시 쓰지 않고 처음 등록된 결과(id 목록)로 같은 응답을 돌려줍니다.
+
+- 저장소: 운영 DB의 idempotency_keys 테이블. 키는 이용 내역 INSERT와 같은 트랜잭션에 기록되므로
+  어느 워커로 재전송되든, 처음 요청이 아직 처리 중이든 한 번만 등록됩니다.
+- 앞단: 프로세스 내 LRU (같은 워커로 온 재전송은 DB를 읽지 않음).
+  데이터 세대(초기화·스냅샷 복원)가 바뀌면 비움 (다른 워커의 교체는 settings_cache 확인 주기 안에 반영)
+- 만료된 키는 CLEANUP_INTERVAL마다 등록 요청이 정리합니다.
+- 같은 키로 다른 내용을 보내면 KeyReused (클라이언트 버그이므로 등록하지 않음)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import database
+import settings_cache
+import write_queue
+
+HEADER = 'Idempotency-Key'
+KEY_MAX_LENGTH = 100
+CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', 1024))
+# 만료 키 정리 간격 (초, 프로세스별)
+CLEANUP_INTERVAL = 600
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # (scope, key) -> (만료 시각 time.time(), fingerprint, id 목록)
+_owner_pid = None
+_generation = None
+_last_cleanup = 0.0
+
+
+class KeyReused(ValueError):
+    """같은 멱등 키가 다른 요청 내용에 사용됨"""
+
+
+def get_key(req):
+    """요청의 멱등 키 (헤더 또는 JSON의 idempotency_key). 없으면 None, 형식이 잘못되면 ValueError"""
+    key = req.headers.get(HEADER)
+    if key is None:
+        data = req.get_json(silent=True)
+        key = data.get('idempotency_key') if isinstance(data, dict) else None
+    if key is None or key == '':
+        return None
+    if not isinstance(key, str) or len(key) > KEY_MAX_LENGTH or not key.isascii() or not key.isprintable():
+        raise ValueError('요청 키 형식이 올바르지 않습니다.')
+    return key
+
+
+def fingerprint(payload):
+    """요청 내용 해시 (키 재사용 검사용)"""
+    text = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _cached(scope, key):
+    global _owner_pid, _generation
+    generation = settings_cache.get_setting(database.DATA_GENERATION_KEY)
+    with _lock:
+        if _owner_pid != os.getpid() or _generation != generation:
+            # fork된 자식은 부모의 캐시를, 교체된 DB는 이전 데이터의 키를 쓰지 않음
+            _entries.clear()
+            _owner_pid = os.getpid()
+            _generation = generation
+        entry = _entries.get((scope, key))
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del _entries[(scope, key)]
+            return None
+        _entries.move_to_end((scope, key))
+        return entry[1], entry[2]
+
+
+def _remember(scope, key, stored_fingerprint, ids, created_at=None):
+    created = created_at.timestamp() if created_at is not None else time.time()
+    with _lock:
+        _entries[(scope, key)] = (created + database.IDEMPOTENCY_TTL_SECONDS, stored_fingerprint, ids)
+        _entries.move_to_end((scope, key))
+        while len(_entries) > CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def _maybe_cleanup():
+    global _last_cleanup
+    now = time.monotonic()
+    with _lock:
+        if now - _last_cleanup < CLEANUP_INTERVAL:
+            return
+        _last_cleanup = now
+    database.delete_expired_idempotency_keys()
+
+
+def _check(stored, requested):
+    if stored != requested:
+        raise KeyReused('이미 다른 내용으로 사용된 요청 키입니다. 새로고침 후 다시 시도해주세요.')
+
+
+def add_usage_records(scope, key, records):
+    """
+    멱등 키로 이용 내역 등록 (write_queue.add_usage_records_batch 대신 사용).
+    scope: 키 범위 (사용자별 'record:<사번>' 등), records: add_usage_records_batch와 같은 형식
+    반환: (id 목록, 재전송 여부). DB 오류면 (None, False), 같은 키로 다른 내용이면 KeyReused
+    """
+    requested = fingerprint(records)
+    hit = _cached(scope, key)
+    if hit is None:
+        found = database.find_idempotency_key(scope, key)
+        if found is not None:
+            ids, stored, created_at = found
+            _remember(scope, key, stored, ids, datetime.fromisoformat(created_at))
+            hit = stored, ids
+    if hit is not None:
+        _check(hit[0], requested)
+        return hit[1], True
+
+    _maybe_cleanup()
+    # 위 확인 이후 다른 워커가 먼저 처리했을 수 있으므로 쓰기 트랜잭션 안에서 다시 확인
+    result = write_queue.add_usage_records_once(records, (scope, key, requested))
+    if result is None:
+        return None, False
+    ids, stored = result
+    if stored is not None:
+        _check(stored, requested)
+        return ids, True
+    _remember(scope, key, requested, ids)
+    return ids, False
+
+
+def reset():
+    """프로세스 내 캐시 비우기 (DB 파일 교체 등)"""
+    with _lock:
+        _entries.clear()
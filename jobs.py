@@ -0,0 +1,242 @@
+"""
+관리자 백그라운드 작업 (엑셀 가져오기/내보내기).
+요청은 작업을 등록하고 바로 job id를 반환하며, 실제 처리는 프로세스당 JOB_WORKERS개 스레드에서 실행합니다.
+상태/진행률은 작업 DB(<DB 이름>_jobs.db)에 저장하므로 어느 워커로 폴링이 가더라도 조회할 수 있고,
+결과 파일은 JOBS_DIR/<job id>/ 아래에 저장되어 완료 후 내려받을 수 있습니다.
+(작업 DB를 따로 두는 이유: 가져오기는 운영 DB 쓰기 트랜잭션 안에서 진행률을 알리므로
+같은 파일에 진행률을 쓰면 자기 자신의 잠금을 기다리게 됨)
+
+작업 함수는 fn(ctx, *args) 형식이며 ctx.report(done, total)로 진행률을 알리고,
+결과 파일이 있으면 ctx.output_path(파일 이름, mimetype)이 돌려준 경로에 씁니다.
+반환한 dict의 'message'는 완료 메시지로, 나머지는 결과(result)로 저장됩니다.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import database
+
+JOBS_DIR = os.environ.get('JOBS_DIR', 'job_files')
+WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+# 이 프로세스에서 대기 + 실행 중인 작업 상한 (넘으면 등록 거부)
+MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', 8))
+# 완료된 작업과 결과 파일 보관 시간
+RETENTION_HOURS = int(os.environ.get('JOB_RETENTION_HOURS', 24))
+# 이 시간 동안 진행률 갱신이 없는 대기/실행 중 작업은 중단된 것으로 표시 (워커 재시작 등)
+STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 900))
+# 진행률 DB 갱신 최소 간격 (초)
+PROGRESS_INTERVAL = 0.5
+
+_lock = threading.Lock()
+_schema_ready = set()  # 스키마를 확인한 (작업 DB 경로, pid)
+_executor = None
+_executor_pid = None
+_pending = 0
+
+
+class JobContext:
+    """작업 함수에 전달되는 진행률/결과 파일 도우미"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.output = None  # (경로, 내려받을 파일 이름, mimetype)
+        self._reported_at = 0.0
+
+    def report(self, done, total=None):
+        """진행률 기록 (PROGRESS_INTERVAL보다 자주 호출되면 DB 갱신은 건너뜀)"""
+        now = time.monotonic()
+        if total is not None and done >= total or now - self._reported_at >= PROGRESS_INTERVAL:
+            self._reported_at = now
+            _update(self.job_id, progress_done=done, progress_total=total)
+
+    def output_path(self, download_name, mimetype):
+        """결과 파일을 쓸 경로 (작업별 디렉터리 안)"""
+        job_dir = os.path.join(JOBS_DIR, self.job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        self.output = (os.path.join(job_dir, 'result' + os.path.splitext(download_name)[1]), download_name, mimetype)
+        return self.output[0]
+
+
+def jobs_db_name(db_name=None):
+    stem, ext = os.path.splitext(db_name or database.DB_NAME)
+    return f"{stem}_jobs{ext or '.db'}"
+
+
+def _connect():
+    path = jobs_db_name()
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    key = (path, os.getpid())
+    if key not in _schema_ready:
+        conn.execute(f"PRAGMA journal_mode = {database.JOURNAL_MODE}")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,               -- import / export
+                status TEXT NOT NULL,             -- queued / running / done / failed
+                progress_done INTEGER NOT NULL DEFAULT 0,
+                progress_total INTEGER,
+                message TEXT,
+                params TEXT,                      -- 작업 조건 (JSON)
+                result TEXT,                      -- 결과 요약 (JSON)
+                file_path TEXT,                   -- 결과 파일 경로
+                file_name TEXT,                   -- 내려받을 파일 이름
+                file_mimetype TEXT,
+                created_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at)')
+        conn.commit()
+        _schema_ready.add(key)
+    return conn
+
+
+def _now():
+    return datetime.now(database.KST)
+
+
+def _update(job_id, **fields):
+    fields['updated_at'] = _now()
+    assignments = ', '.join(f'{name} = ?' for name in fields)
+    conn = _connect()
+    try:
+        conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        # fork된 자식은 부모의 스레드를 물려받지 않으므로 새로 생성
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='admin-job')
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _run(job_id, fn, args):
+    global _pending
+    ctx = JobContext(job_id)
+    try:
+        _update(job_id, status='running')
+        result = fn(ctx, *args) or {}
+        message = result.pop('message', '완료되었습니다.')
+        fields = {'status': 'done', 'message': message, 'result': json.dumps(result, ensure_ascii=False)}
+        if ctx.output is not None:
+            fields.update(file_path=ctx.output[0], file_name=ctx.output[1], file_mimetype=ctx.output[2])
+        _update(job_id, finished_at=_now(), **fields)
+    except Exception as e:
+        print(f"Error in job {job_id}: {e}")
+        _update(job_id, status='failed', message=str(e), finished_at=_now())
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def submit(kind, fn, *args, params=None):
+    """
+    작업 등록 후 job id 반환. 이 프로세스의 대기 작업이 MAX_PENDING개 이상이면 None.
+    params는 목록 화면에 보여줄 작업 조건 (JSON으로 저장)
+    """
+    global _pending
+    with _lock:
+        if _pending >= MAX_PENDING:
+            return None
+        _pending += 1
+    try:
+        cleanup()
+        job_id = uuid.uuid4().hex
+        now = _now()
+        conn = _connect()
+        try:
+            conn.execute('''
+                INSERT INTO jobs (id, kind, status, params, created_at, updated_at)
+                VALUES (?, ?, 'queued', ?, ?, ?)
+            ''', (job_id, kind, json.dumps(params or {}, ensure_ascii=False), now, now))
+            conn.commit()
+        finally:
+            conn.close()
+        _get_executor().submit(_run, job_id, fn, args)
+        return job_id
+    except Exception:
+        with _lock:
+            _pending -= 1
+        raise
+
+
+def _to_dict(row):
+    job = {
+        'id': row['id'],
+        'kind': row['kind'],
+        'status': row['status'],
+        'progress_done': row['progress_done'],
+        'progress_total': row['progress_total'],
+        'message': row['message'],
+        'params': json.loads(row['params'] or '{}'),
+        'result': json.loads(row['result'] or '{}'),
+        'file_name': row['file_name'],
+        'created_at': row['created_at'],
+        'finished_at': row['finished_at'],
+    }
+    if job['status'] in ('queued', 'running') and row['updated_at'] < str(_now() - timedelta(seconds=STALE_SECONDS)):
+        job['status'] = 'failed'
+        job['message'] = '작업이 중단되었습니다. (서버 재시작 등) 다시 실행해주세요.'
+    return job
+
+
+def get_job(job_id):
+    """작업 상태 dict. 없으면 None"""
+    conn = _connect()
+    try:
+        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _to_dict(row) if row else None
+
+
+def list_jobs(limit=20):
+    """최근 작업 목록 (최신순)"""
+    conn = _connect()
+    try:
+        rows = conn.execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [_to_dict(row) for row in rows]
+
+
+def result_file(job_id):
+    """완료된 작업의 (경로, 파일 이름, mimetype). 결과 파일이 없으면 None"""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT file_path, file_name, file_mimetype FROM jobs WHERE id = ? AND status = 'done'", (job_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None or not row['file_path'] or not os.path.exists(row['file_path']):
+        return None
+    return row['file_path'], row['file_name'], row['file_mimetype']
+
+
+def cleanup():
+    """보관 시간이 지난 작업 기록과 결과 파일 삭제"""
+    cutoff = _now() - timedelta(hours=RETENTION_HOURS)
+    conn = _connect()
+    try:
+        expired = [row['id'] for row in conn.execute('SELECT id FROM jobs WHERE created_at < ?', (cutoff,))]
+        if expired:
+            conn.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in expired])
+            conn.commit()
+    finally:
+        conn.close()
+    for job_id in expired:
+        shutil.rmtree(os.path.join(JOBS_DIR, job_id), ignore_errors=True)
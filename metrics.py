@@ -0,0 +1,282 @@
+"""
+요청 단위 계측과 Prometheus 텍스트 형식 메트릭.
+- 경로(endpoint)별 응답 시간 히스토그램과 상태 코드별 요청 수
+- 샘플링된 요청의 SQL 실행 횟수/시간/쓰기 잠금 대기 시간 (database.observe_queries)
+- 템플릿 렌더링, 엑셀 읽기/쓰기 등 구간 시간 (section())
+- SLOW_REQUEST_MS보다 느린 요청은 가장 오래 걸린 SQL과 함께 로그 출력
+
+환경 변수
+    METRICS_ENABLED=0           계측 전체 끄기 (훅을 등록하지 않음)
+    METRICS_SQL_SAMPLE_RATE=0.1 SQL 계측할 요청 비율 (0이면 SQL 계측 끔, 기본 1.0)
+    SLOW_REQUEST_MS=500         느린 요청 로그 기준 (ms)
+    METRICS_TOKEN=...           설정하면 Authorization: Bearer 토큰으로도 /admin/metrics 조회 가능
+
+값은 프로세스(워커)별로 집계되며, 스트리밍 응답(CSV 등)은 본문 전송 전까지의 시간만 포함합니다.
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, g, request, template_rendered
+
+import database
+import write_queue
+
+ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+SQL_SAMPLE_RATE = float(os.environ.get('METRICS_SQL_SAMPLE_RATE', 1.0))
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+TOKEN = os.environ.get('METRICS_TOKEN')
+
+# 응답 시간 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 느린 요청 로그에 남길 SQL 수
+SLOW_LOG_STATEMENTS = 5
+# 요청당 보관하는 SQL 수 상한 (일괄 처리 요청의 메모리 사용 제한)
+MAX_STATEMENTS_PER_REQUEST = 200
+
+_lock = threading.Lock()
+_requests = {}     # (endpoint, method, status) -> count
+_latency = {}      # endpoint -> [bucket counts..., +Inf count, sum]
+_sql = {}          # endpoint -> [sampled requests, queries, query seconds, lock wait seconds]
+_phases = {}       # (endpoint, phase) -> seconds
+_slow = {}         # endpoint -> count
+
+
+class RequestStats:
+    """요청 하나의 SQL 계측 결과 (database.TimedCursor가 record_query 호출)"""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.lock_wait = 0.0
+        self.statements = []
+
+    def record_query(self, sql, seconds, is_lock_wait):
+        self.queries += 1
+        self.query_time += seconds
+        if is_lock_wait:
+            self.lock_wait += seconds
+        if len(self.statements) < MAX_STATEMENTS_PER_REQUEST:
+            self.statements.append((seconds, sql))
+
+
+@contextmanager
+def section(name):
+    """요청 안의 구간 시간 측정 (예: with metrics.section('openpyxl'): ...)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if ENABLED and '_metrics_started' in g:
+            phases = g.setdefault('_metrics_phases', {})
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - started
+
+
+def _before_request():
+    g._metrics_started = time.perf_counter()
+    if SQL_SAMPLE_RATE > 0 and (SQL_SAMPLE_RATE >= 1 or random.random() < SQL_SAMPLE_RATE):
+        stats = RequestStats()
+        g._metrics_sql = stats
+        g._metrics_token = database.observe_queries(stats)
+
+
+def _after_request(response):
+    g._metrics_status = response.status_code
+    return response
+
+
+def _teardown_request(exc=None):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = g.pop('_metrics_sql', None)
+    token = g.pop('_metrics_token', None)
+    if token is not None:
+        database.stop_observing_queries(token)
+    phases = g.pop('_metrics_phases', {})
+    status = g.pop('_metrics_status', 500)
+    endpoint = request.endpoint or 'unmatched'
+    _observe(endpoint, request.method, status, elapsed, stats, phases)
+
+    if elapsed * 1000 >= SLOW_REQUEST_MS:
+        _log_slow_request(elapsed, status, stats, phases)
+
+
+def _observe(endpoint, method, status, elapsed, stats, phases):
+    with _lock:
+        key = (endpoint, method, status)
+        _requests[key] = _requests.get(key, 0) + 1
+
+        hist = _latency.get(endpoint)
+        if hist is None:
+            hist = _latency[endpoint] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed <= bound:
+                hist[i] += 1
+        hist[len(LATENCY_BUCKETS)] += 1
+        hist[-1] += elapsed
+
+        if stats is not None:
+            sql = _sql.setdefault(endpoint, [0, 0, 0.0, 0.0])
+            sql[0] += 1
+            sql[1] += stats.queries
+            sql[2] += stats.query_time
+            sql[3] += stats.lock_wait
+
+        for phase, seconds in phases.items():
+            _phases[(endpoint, phase)] = _phases.get((endpoint, phase), 0.0) + seconds
+
+        if elapsed * 1000 >= SLOW_REQUEST_MS:
+            _slow[endpoint] = _slow.get(endpoint, 0) + 1
+
+
+def _log_slow_request(elapsed, status, stats, phases):
+    summary = f"[SLOW] {request.method} {request.path} {status} {elapsed * 1000:.0f}ms"
+    if stats is not None:
+        summary += (
+            f" sql={stats.queries} ({stats.query_time * 1000:.0f}ms, "
+            f"lock wait {stats.lock_wait * 1000:.0f}ms)"
+        )
+    if phases:
+        summary += ' ' + ' '.join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in phases.items())
+    print(summary)
+    if stats is not None:
+        for seconds, sql in sorted(stats.statements, key=lambda s: s[0], reverse=True)[:SLOW_LOG_STATEMENTS]:
+            print(f"    {seconds * 1000:8.1f}ms  {' '.join(sql.split())[:300]}")
+
+
+def _before_render(sender, template, context, **extra):
+    if '_metrics_started' in g:
+        g._metrics_render_started = time.perf_counter()
+
+
+def _rendered(sender, template, context, **extra):
+    started = g.pop('_metrics_render_started', None)
+    if started is not None:
+        phases = g.setdefault('_metrics_phases', {})
+        phases['template'] = phases.get('template', 0.0) + time.perf_counter() - started
+
+
+# --- Prometheus 출력 ---
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{_label_value(v)}"' for k, v in labels.items()) + '}'
+
+
+def render_prometheus():
+    """현재 프로세스의 메트릭을 Prometheus 텍스트 형식(0.0.4)으로 반환"""
+    with _lock:
+        requests = dict(_requests)
+        latency = {k: list(v) for k, v in _latency.items()}
+        sql = {k: list(v) for k, v in _sql.items()}
+        phases = dict(_phases)
+        slow = dict(_slow)
+
+    lines = [
+        '# HELP screengolf_http_requests_total HTTP requests by endpoint, method and status.',
+        '# TYPE screengolf_http_requests_total counter',
+    ]
+    for (endpoint, method, status), count in sorted(requests.items()):
+        lines.append(f"screengolf_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+    lines += [
+        '# HELP screengolf_http_request_duration_seconds Request latency until the response is returned.',
+        '# TYPE screengolf_http_request_duration_seconds histogram',
+    ]
+    for endpoint, hist in sorted(latency.items()):
+        for bound, count in zip(LATENCY_BUCKETS, hist):
+            lines.append(
+                f"screengolf_http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le=bound)} {count}"
+            )
+        lines.append(
+            f"screengolf_http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le='+Inf')} "
+            f"{hist[len(LATENCY_BUCKETS)]}"
+        )
+        lines.append(f"screengolf_http_request_duration_seconds_sum{_labels(endpoint=endpoint)} {hist[-1]:.6f}")
+        lines.append(
+            f"screengolf_http_request_duration_seconds_count{_labels(endpoint=endpoint)} {hist[len(LATENCY_BUCKETS)]}"
+        )
+
+    sql_metrics = [
+        ('screengolf_sql_sampled_requests_total', 'Requests whose SQL was instrumented.', 0, '{}'),
+        ('screengolf_sql_queries_total', 'SQL statements executed in sampled requests.', 1, '{}'),
+        ('screengolf_sql_query_seconds_total', 'SQL execution time in sampled requests.', 2, '{:.6f}'),
+        ('screengolf_sql_lock_wait_seconds_total',
+         'Time spent acquiring the SQLite write lock (BEGIN IMMEDIATE/EXCLUSIVE and the first write '
+         'statement of an implicit transaction, including that statement).', 3, '{:.6f}'),
+    ]
+    for name, help_text, index, fmt in sql_metrics:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for endpoint, values in sorted(sql.items()):
+            lines.append(f"{name}{_labels(endpoint=endpoint)} {fmt.format(values[index])}")
+
+    lines += [
+        '# HELP screengolf_request_phase_seconds_total Time spent in named phases (template, openpyxl, pandas).',
+        '# TYPE screengolf_request_phase_seconds_total counter',
+    ]
+    for (endpoint, phase), seconds in sorted(phases.items()):
+        lines.append(f"screengolf_request_phase_seconds_total{_labels(endpoint=endpoint, phase=phase)} {seconds:.6f}")
+
+    lines += [
+        f'# HELP screengolf_slow_requests_total Requests slower than {SLOW_REQUEST_MS:g}ms.',
+        '# TYPE screengolf_slow_requests_total counter',
+    ]
+    for endpoint, count in sorted(slow.items()):
+        lines.append(f"screengolf_slow_requests_total{_labels(endpoint=endpoint)} {count}")
+
+    lines += [
+        '# HELP screengolf_db_pool_idle_connections Idle connections in this process pool.',
+        '# TYPE screengolf_db_pool_idle_connections gauge',
+        f"screengolf_db_pool_idle_connections {database.get_pool().idle_count()}",
+    ]
+
+    writes = write_queue.stats()
+    if writes['enabled']:
+        lines += [
+            '# HELP screengolf_write_queue_groups_total Group transactions committed by the writer thread.',
+            '# TYPE screengolf_write_queue_groups_total counter',
+            f"screengolf_write_queue_groups_total {writes['groups']}",
+            '# HELP screengolf_write_queue_jobs_total Inserts and cancels committed through the writer thread.',
+            '# TYPE screengolf_write_queue_jobs_total counter',
+            f"screengolf_write_queue_jobs_total {writes['jobs']}",
+            '# HELP screengolf_write_queue_pending Jobs waiting for the writer thread.',
+            '# TYPE screengolf_write_queue_pending gauge',
+            f"screengolf_write_queue_pending {writes['pending']}",
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+def authorized_by_token():
+    """METRICS_TOKEN이 설정되어 있고 Authorization: Bearer 값이 일치하면 True"""
+    return bool(TOKEN) and request.headers.get('Authorization') == f'Bearer {TOKEN}'
+
+
+def reset():
+    """누적 메트릭 초기화"""
+    with _lock:
+        _requests.clear()
+        _latency.clear()
+        _sql.clear()
+        _phases.clear()
+        _slow.clear()
+
+
+def init_app(app):
+    """
+    계측 훅 등록. Flask-Limiter 등 다른 before_request 훅보다 먼저 등록해야
+    제한(429)으로 끝난 요청도 집계됩니다.
+    """
+    if not ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
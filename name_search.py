@@ -0,0 +1,122 @@
+"""
+관리자 대리 등록용 사원 이름 검색 인덱스 (프로세스 내 n-gram 인덱스).
+이름과 초성 문자열의 1-gram/2-gram 역색인으로 후보를 좁힌 뒤 부분 일치를 확인하고,
+완전 일치 > 앞부분 일치 > 부분 일치 순으로 정렬해 limit 건만 반환합니다.
+사원 수/최대 id나 데이터 세대(초기화·스냅샷 복원)가 바뀌면(다른 워커에서 바뀐 경우 포함)
+다음 검색 때 인덱스를 다시 만듭니다.
+"""
+import threading
+
+import database
+
+DEFAULT_LIMIT = 20
+
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+_CHOSEONG_SET = set(CHOSEONG)
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+
+_lock = threading.Lock()
+_index = None
+_index_key = None
+
+
+def to_choseong(text):
+    """한글 음절을 초성으로 변환 ('홍길동' -> 'ㅎㄱㄷ'). 한글이 아닌 문자는 그대로 둡니다."""
+    result = []
+    for ch in text:
+        code = ord(ch)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            result.append(CHOSEONG[(code - _HANGUL_BASE) // 588])
+        else:
+            result.append(ch)
+    return ''.join(result)
+
+
+def _ngrams(text):
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class _NameIndex:
+    def __init__(self, rows):
+        self.entries = []     # [(emp_id, name, 검색용 이름, 초성)]
+        self.names = {}       # n-gram -> {entry index} (이름)
+        self.choseong = {}    # n-gram -> {entry index} (초성)
+        for emp_id, name in rows:
+            folded = name.strip().lower()
+            initials = to_choseong(folded)
+            idx = len(self.entries)
+            self.entries.append((emp_id, name, folded, initials))
+            for gram in _ngrams(folded):
+                self.names.setdefault(gram, set()).add(idx)
+            for gram in _ngrams(initials):
+                self.choseong.setdefault(gram, set()).add(idx)
+
+    def search(self, query, limit):
+        # 초성만으로 이루어진 검색어('ㅎㄱㄷ')는 초성 문자열에서 찾음
+        by_choseong = all(ch in _CHOSEONG_SET for ch in query)
+        postings = self.choseong if by_choseong else self.names
+        field = 3 if by_choseong else 2
+
+        grams = [query[i:i + 2] for i in range(len(query) - 1)] or [query]
+        candidates = None
+        for gram in sorted(grams, key=lambda g: len(postings.get(g, ()))):
+            matched = postings.get(gram)
+            if not matched:
+                return []
+            candidates = set(matched) if candidates is None else candidates & matched
+            if not candidates:
+                return []
+
+        ranked = []
+        for idx in candidates:
+            entry = self.entries[idx]
+            pos = entry[field].find(query)
+            if pos < 0:
+                continue
+            if entry[field] == query:
+                rank = 0
+            elif pos == 0:
+                rank = 1
+            else:
+                rank = 2
+            ranked.append((rank, pos, len(entry[1]), entry[1], entry[0]))
+        ranked.sort()
+        return [{'emp_id': emp_id, 'name': name} for _, _, _, name, emp_id in ranked[:limit]]
+
+
+def _current_key(conn):
+    row = conn.execute('SELECT COUNT(*), MAX(id) FROM employees').fetchone()
+    # 복원된 DB는 사원 수/최대 id가 우연히 같을 수 있으므로 세대도 비교
+    return database.DB_NAME, database.get_data_generation(conn), row[0], row[1]
+
+
+def search(query, limit=DEFAULT_LIMIT):
+    """이름(또는 초성) 검색. 반환: [{'emp_id', 'name'}, ...] (최대 limit건, 순위순)"""
+    global _index, _index_key
+    query = (query or '').strip().lower()
+    if not query:
+        return []
+
+    conn = database.get_db_connection()
+    try:
+        key = _current_key(conn)
+        with _lock:
+            if _index is None or _index_key != key:
+                rows = conn.execute('SELECT emp_id, name FROM employees').fetchall()
+                _index = _NameIndex((row['emp_id'], row['name']) for row in rows)
+                _index_key = key
+            index = _index
+    finally:
+        conn.close()
+    return index.search(query, limit)
+
+
+def invalidate():
+    """사원 등록/일괄 등록 후 호출하면 다음 검색에서 인덱스를 다시 만듭니다."""
+    global _index, _index_key
+    with _lock:
+        _index = None
+        _index_key = None
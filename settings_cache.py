@@ -0,0 +1,79 @@
+"""
+system_settings 테이블 앞단의 프로세스 내 캐시.
+모든 설정을 한 번에 읽어 두고, 이 프로세스의 set_setting()은 즉시 무효화,
+다른 워커의 변경은 database.DataVersionWatcher(전용 커넥션의 PRAGMA data_version)로 감지합니다.
+CHECK_INTERVAL(초) 이내의 반복 조회는 DB에 접근하지 않습니다.
+"""
+import os
+import threading
+import time
+
+import database
+
+CHECK_INTERVAL = float(os.environ.get('SETTINGS_CHECK_INTERVAL', 1.0))
+
+_lock = threading.Lock()
+_values = None
+_data_version = None
+_checked_at = 0.0
+_watcher = database.DataVersionWatcher()
+
+
+def _reset_state():
+    global _values, _data_version, _checked_at
+    _values = None
+    _data_version = None
+    _checked_at = 0.0
+
+
+def _load():
+    global _values, _data_version, _checked_at
+    _data_version = _watcher.version()
+    rows = _watcher.connection().execute('SELECT key, value FROM system_settings').fetchall()
+    _values = {row['key']: row['value'] for row in rows}
+    _checked_at = time.monotonic()
+
+
+def _ensure_fresh():
+    global _checked_at
+    if _values is None:
+        _load()
+        return
+    now = time.monotonic()
+    if now - _checked_at < CHECK_INTERVAL:
+        return
+    if _watcher.version() != _data_version:
+        _load()
+    else:
+        _checked_at = now
+
+
+def get_setting(key, default=None):
+    """캐시된 설정값 반환 (database.get_setting과 동일한 시그니처)"""
+    with _lock:
+        _ensure_fresh()
+        return _values.get(key, default)
+
+
+def get_all_settings():
+    with _lock:
+        _ensure_fresh()
+        return dict(_values)
+
+
+def set_setting(key, value):
+    """설정 저장 후 이 프로세스의 캐시를 즉시 무효화"""
+    database.set_setting(key, value)
+    invalidate()
+
+
+def invalidate():
+    with _lock:
+        _reset_state()
+
+
+def reset():
+    """전용 커넥션까지 닫습니다. (DB 파일 교체 등)"""
+    with _lock:
+        _watcher.close()
+        _reset_state()
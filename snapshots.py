@@ -0,0 +1,232 @@
+"""
+DB 스냅샷(백업)·복원·데이터 초기화.
+sqlite3 backup API를 SNAPSHOT_PAGES 페이지 단위로 나눠 실행하므로 백업 중에도 등록/취소 요청이 막히지 않습니다.
+스냅샷은 SNAPSHOT_DIR/<시각>_<이름>/ 아래에 운영 DB(main.db)와 보관 DB(archive.db), meta.json으로 저장되며
+최근 SNAPSHOT_KEEP개만 남기고 오래된 것부터 지웁니다.
+
+복원과 초기화는 새 내용을 담은 파일을 운영 DB 파일 위로 backup API로 덮어씁니다.
+(파일 이름을 바꿔 끼우면 다른 워커가 열어 둔 옛 파일에 계속 쓰게 되므로, SQLite 잠금을 거쳐 한 번에 교체)
+
+    python snapshots.py create [이름]   # 스냅샷 생성
+    python snapshots.py list            # 목록
+    python snapshots.py restore <이름>  # 복원 (복원 직전 상태도 스냅샷으로 남김)
+"""
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import uuid
+from datetime import datetime
+
+import database
+import idempotency
+import settings_cache
+import totals_cache
+
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', 'snapshots')
+SNAPSHOT_KEEP = int(os.environ.get('SNAPSHOT_KEEP', 14))
+# 한 번에 복사할 페이지 수와 단계 사이 대기 시간 (단계 사이에는 잠금을 놓음)
+SNAPSHOT_PAGES = int(os.environ.get('SNAPSHOT_PAGES', 1024))
+SNAPSHOT_STEP_SLEEP = float(os.environ.get('SNAPSHOT_STEP_SLEEP', 0.005))
+
+MAIN_FILE = 'main.db'
+ARCHIVE_FILE = 'archive.db'
+META_FILE = 'meta.json'
+
+
+def _live_files():
+    """(스냅샷 파일 이름, 운영 파일 경로) 목록"""
+    return [(MAIN_FILE, database.DB_NAME), (ARCHIVE_FILE, database.archive_db_name())]
+
+
+def _backup(src_path, dest_path, pages=SNAPSHOT_PAGES, sleep=SNAPSHOT_STEP_SLEEP):
+    src = sqlite3.connect(src_path, timeout=30)
+    dest = sqlite3.connect(dest_path, timeout=30)
+    try:
+        src.backup(dest, pages=pages, sleep=sleep)
+    finally:
+        dest.close()
+        src.close()
+
+
+def _snapshot_path(name):
+    path = os.path.join(SNAPSHOT_DIR, name)
+    # 이름에 경로 구분자가 섞여 SNAPSHOT_DIR 밖을 가리키지 않도록 확인
+    if os.path.dirname(os.path.normpath(path)) != os.path.normpath(SNAPSHOT_DIR):
+        raise ValueError(f'잘못된 스냅샷 이름입니다: {name}')
+    return path
+
+
+def create_snapshot(label='manual'):
+    """
+    운영 DB와 보관 DB의 스냅샷 생성 후 보관 개수를 넘는 오래된 스냅샷 삭제.
+    반환: 스냅샷 정보 dict (list_snapshots 항목과 같은 형식)
+    """
+    label = ''.join(ch for ch in label if ch.isalnum() or ch in '-_') or 'manual'
+    base = f"{datetime.now(database.KST).strftime('%Y%m%d_%H%M%S')}_{label}"
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    # 같은 초에 여러 번 만들면 이름 뒤에 번호를 붙임
+    name, seq = base, 1
+    while os.path.exists(os.path.join(SNAPSHOT_DIR, name)):
+        seq += 1
+        name = f'{base}_{seq}'
+    tmp_dir = os.path.join(SNAPSHOT_DIR, f'.{name}.{uuid.uuid4().hex}.tmp')
+    os.makedirs(tmp_dir)
+    try:
+        for filename, live_path in _live_files():
+            _backup(live_path, os.path.join(tmp_dir, filename))
+        conn = sqlite3.connect(os.path.join(tmp_dir, MAIN_FILE))
+        try:
+            meta = {
+                'name': name,
+                'label': label,
+                'created_at': datetime.now(database.KST).isoformat(),
+                'schema_version': database.get_schema_version(conn),
+                'employees': conn.execute('SELECT COUNT(*) FROM employees').fetchone()[0],
+                'usage_records': conn.execute('SELECT COUNT(*) FROM usage_records').fetchone()[0],
+            }
+        finally:
+            conn.close()
+        with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.rename(tmp_dir, os.path.join(SNAPSHOT_DIR, name))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    _rotate()
+    return meta
+
+
+def _created_key(meta, meta_path):
+    """정렬 키: meta.json의 생성 시각, 같거나 읽을 수 없으면 meta.json 수정 시각
+    (이름순 정렬은 같은 초의 _2/_10 등이나 시계가 되돌아간 경우 순서가 틀림)"""
+    mtime = os.stat(meta_path).st_mtime
+    try:
+        created = datetime.fromisoformat(meta['created_at']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        created = mtime
+    return created, mtime
+
+
+def list_snapshots():
+    """스냅샷 목록 (최신순)"""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    snapshots = []
+    for name in os.listdir(SNAPSHOT_DIR):
+        meta_path = os.path.join(SNAPSHOT_DIR, name, META_FILE)
+        if name.startswith('.') or not os.path.exists(meta_path):
+            continue
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        snapshots.append((_created_key(meta, meta_path), meta))
+    snapshots.sort(key=lambda item: item[0], reverse=True)
+    return [meta for _, meta in snapshots]
+
+
+def _rotate(keep=SNAPSHOT_KEEP):
+    for meta in list_snapshots()[keep:]:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, meta['name']), ignore_errors=True)
+
+
+def _replace_live_databases(source_dir):
+    """
+    source_dir의 main.db/archive.db 내용으로 운영 DB를 교체합니다.
+    backup API로 한 번에(pages=-1) 덮어쓰므로 다른 커넥션·워커에는 교체 전 또는 후의 상태만 보입니다.
+    """
+    for filename, live_path in _live_files():
+        _backup(os.path.join(source_dir, filename), live_path, pages=-1, sleep=0)
+    # 이 프로세스의 커넥션/캐시는 새로 연결 (스키마·설정이 바뀌었을 수 있음)
+    database.close_pool()
+    settings_cache.reset()
+    totals_cache.reset()
+    idempotency.reset()
+    database.init_db()
+    # 내용이 통째로 바뀌었음을 알림 (id가 다시 시작되거나 되돌아감)
+    database.rotate_data_generation()
+
+
+def _page_size(path):
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        return conn.execute('PRAGMA page_size').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _build_fresh_databases(target_dir, settings):
+    """현재 스키마의 빈 운영/보관 DB를 target_dir에 생성 (system_settings만 복사)"""
+    main_path = os.path.join(target_dir, MAIN_FILE)
+    archive_path = os.path.join(target_dir, ARCHIVE_FILE)
+    # WAL 모드 운영 DB 위에 backup하려면 페이지 크기가 같아야 함
+    for path, live_path in ((main_path, database.DB_NAME), (archive_path, database.archive_db_name())):
+        conn = sqlite3.connect(path)
+        conn.execute(f'PRAGMA page_size = {_page_size(live_path)}')
+        conn.execute('VACUUM')
+        conn.close()
+
+    conn = sqlite3.connect(main_path)
+    try:
+        database.apply_migrations(conn)
+        conn.executemany('INSERT OR REPLACE INTO system_settings (key, value) VALUES (?, ?)', settings)
+        conn.commit()
+        conn.execute('ATTACH DATABASE ? AS archive', (archive_path,))
+        database._ensure_archive_schema(conn)
+    finally:
+        conn.close()
+
+
+def restore_snapshot(name):
+    """스냅샷으로 복원. 복원 직전 상태는 'pre-restore' 스냅샷으로 남깁니다. 반환: 복원 직전 스냅샷 정보"""
+    source_dir = _snapshot_path(name)
+    if not os.path.exists(os.path.join(source_dir, META_FILE)):
+        raise FileNotFoundError(f'스냅샷이 없습니다: {name}')
+    safety = create_snapshot('pre-restore')
+    _replace_live_databases(source_dir)
+    return safety
+
+
+def reset_all_data():
+    """
+    모든 데이터 초기화 (시스템 설정 제외).
+    현재 상태를 'pre-reset' 스냅샷으로 남긴 뒤, 빈 DB 파일로 교체합니다. (행 단위 DELETE 없음)
+    """
+    try:
+        snapshot = create_snapshot('pre-reset')
+        conn = database.get_pool().acquire()
+        try:
+            # 보관 경계와 증분 내보내기 워터마크는 지운 데이터 기준이므로 제외 (id가 1부터 다시 시작)
+            settings = [
+                (row['key'], row['value']) for row in conn.execute('SELECT key, value FROM system_settings')
+                if row['key'] not in (database.ARCHIVE_MAX_DATE_KEY, database.ARCHIVE_MAX_ACTIVE_DATE_KEY)
+                and not row['key'].startswith(database.DELTA_WATERMARK_PREFIX)
+            ]
+        finally:
+            conn.close()
+
+        with tempfile.TemporaryDirectory(dir=SNAPSHOT_DIR) as fresh_dir:
+            _build_fresh_databases(fresh_dir, settings)
+            _replace_live_databases(fresh_dir)
+        return True, f"모든 데이터가 초기화되었습니다. (백업: {snapshot['name']})"
+    except Exception as e:
+        print(f"Error resetting data: {e}")
+        return False, str(e)
+
+
+if __name__ == '__main__':
+    import sys
+    database.init_db()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'create':
+        print(f"Snapshot created: {create_snapshot(sys.argv[2] if len(sys.argv) > 2 else 'manual')}")
+    elif command == 'restore' and len(sys.argv) > 2:
+        safety = restore_snapshot(sys.argv[2])
+        print(f"Restored {sys.argv[2]} (previous state saved as {safety['name']})")
+    elif command == 'list':
+        for meta in list_snapshots():
+            print(f"{meta['name']}  employees={meta['employees']}  usage_records={meta['usage_records']}  "
+                  f"schema=v{meta['schema_version']}")
+    else:
+        print('usage: python snapshots.py create [이름] | list | restore <이름>')
+        sys.exit(1)
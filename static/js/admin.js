@@ -0,0 +1,674 @@
+// 템플릿에서 전달한 URL (script 태그의 data-* 속성)
+const adminConfig = document.currentScript.dataset;
+
+const bulkInput = document.getElementById('bulk-input');
+const previewArea = document.getElementById('preview-area');
+const previewTbody = document.getElementById('preview-tbody');
+const previewCount = document.getElementById('preview-count');
+
+function parseInput() {
+    const text = bulkInput.value;
+    if (!text.trim()) {
+        alert('데이터를 입력해주세요.');
+        return;
+    }
+
+    const lines = text.trim().split('\n');
+    previewTbody.innerHTML = '';
+    let count = 0;
+
+    lines.forEach((line, index) => {
+        const cols = line.split('\t').map(c => c.trim());
+        if (cols.length >= 2) { // 최소 2개 컬럼
+            const emp_id = cols[0];
+            const name = cols[1];
+
+            if (emp_id && name) {
+                const tr = document.createElement('tr');
+                tr.innerHTML = `
+                    <td contenteditable="true" style="background:#fff;">${emp_id}</td>
+                    <td contenteditable="true" style="background:#fff;">${name}</td>
+                    <td><button class="btn-danger" style="padding: 2px 5px; font-size: 0.8rem;" onclick="this.closest('tr').remove(); updateCount();">삭제</button></td>
+                `;
+                previewTbody.appendChild(tr);
+                count++;
+            }
+        }
+    });
+
+    updateCount();
+
+    if (count > 0) {
+        previewArea.style.display = 'block';
+    } else {
+        alert('유효한 데이터가 없습니다. (탭으로 구분된 2개 열 필요)');
+        previewArea.style.display = 'none';
+    }
+}
+
+function updateCount() {
+    const rows = previewTbody.querySelectorAll('tr');
+    previewCount.textContent = rows.length;
+    if (rows.length === 0) {
+        previewArea.style.display = 'none';
+    }
+}
+
+function registerBulkData() {
+    const rows = previewTbody.querySelectorAll('tr');
+    if (rows.length === 0) return;
+
+    if (!confirm(`${rows.length}명의 데이터를 등록하시겠습니까?`)) return;
+
+    const finalData = [];
+    rows.forEach(tr => {
+        const tds = tr.querySelectorAll('td');
+        finalData.push({
+            emp_id: tds[0].innerText.trim(),
+            name: tds[1].innerText.trim(),
+            password: tds[2].innerText.trim()
+        });
+    });
+
+    if (finalData.some(d => !d.emp_id || !d.name || !d.password)) {
+        alert('사번, 이름, 비밀번호가 비어있는 행이 있습니다. 확인해주세요.');
+        return;
+    }
+
+    fetch(adminConfig.bulkAddUrl, {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json"
+        },
+        body: JSON.stringify({ data: finalData })
+    })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert(data.message);
+                bulkInput.value = '';
+                previewArea.style.display = 'none';
+                previewTbody.innerHTML = '';
+            } else {
+                alert('오류 발생: ' + data.message);
+            }
+        })
+        .catch(err => {
+            console.error(err);
+            alert('서버 통신 오류');
+        });
+}
+
+// --- 대리 실적 등록 관련 로직 ---
+document.getElementById('proxy-date').valueAsDate = new Date();
+let selectedProxyItem = null;
+
+function searchProxyUser() {
+    const name = document.getElementById('proxy-name-input').value.trim();
+    const selectBox = document.getElementById('proxy-user-select');
+
+    if (!name) {
+        alert('검색할 이름을 입력해주세요.');
+        return;
+    }
+
+    fetch(adminConfig.searchUserUrl, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ name: name })
+    })
+        .then(res => res.json())
+        .then(data => {
+            selectBox.innerHTML = '<option value="">검색 후 선택해주세요</option>';
+
+            if (data.success) {
+                if (data.users.length === 0) {
+                    alert('검색 결과가 없습니다.');
+                }
+                data.users.forEach(user => {
+                    const option = document.createElement('option');
+                    option.value = user.emp_id;
+                    option.text = `${user.name} (${user.emp_id})`;
+                    selectBox.appendChild(option);
+                });
+                // 결과가 1명이면 자동 선택
+                if (data.users.length === 1) {
+                    selectBox.value = data.users[0].emp_id;
+                    validateProxyForm();
+                }
+            } else {
+                alert(data.message);
+                validateProxyForm();
+            }
+        })
+        .catch(err => alert("서버 오류: " + err));
+}
+
+function selectProxyItem(item) {
+    selectedProxyItem = item;
+    updateProxyItemButtons();
+    validateProxyForm();
+}
+
+function updateProxyItemButtons() {
+    const btn9 = document.getElementById('btn-9hole');
+    const btn18 = document.getElementById('btn-18hole');
+
+    // 초기화
+    [btn9, btn18].forEach(btn => {
+        btn.style.backgroundColor = '#fff';
+        btn.style.color = '#333';
+        btn.style.borderColor = '#ccc';
+        btn.style.fontWeight = 'normal';
+    });
+
+    if (selectedProxyItem === '9홀') {
+        btn9.style.backgroundColor = '#3498db';
+        btn9.style.color = 'white';
+        btn9.style.fontWeight = 'bold';
+        btn9.style.borderColor = '#3498db';
+    } else if (selectedProxyItem === '18홀') {
+        btn18.style.backgroundColor = '#3498db';
+        btn18.style.color = 'white';
+        btn18.style.fontWeight = 'bold';
+        btn18.style.borderColor = '#3498db';
+    }
+}
+
+function validateProxyForm() {
+    const selectBox = document.getElementById('proxy-user-select');
+    const submitBtn = document.getElementById('btn-proxy-submit');
+
+    if (selectBox.value && selectedProxyItem) {
+        submitBtn.disabled = false;
+        submitBtn.style.backgroundColor = "#2ecc71";
+        submitBtn.style.cursor = "pointer";
+    } else {
+        submitBtn.disabled = true;
+        submitBtn.style.backgroundColor = "#bdc3c7";
+        submitBtn.style.cursor = "not-allowed";
+    }
+}
+
+function submitProxyUsage() {
+    const selectBox = document.getElementById('proxy-user-select');
+    const usageDate = document.getElementById('proxy-date').value;
+    const quantity = document.getElementById('proxy-quantity').value;
+    const roomNumber = document.querySelector('input[name="proxy_room_number"]:checked').value;
+
+    if (!selectBox.value || !selectedProxyItem) {
+        alert('대상자와 상품을 선택해주세요.');
+        return;
+    }
+
+    const selectedText = selectBox.options[selectBox.selectedIndex].text;
+
+    if (!confirm(`${selectedText}님의 ${usageDate}일자 (${roomNumber}번방) ${selectedProxyItem} ${quantity}게임 실적을 등록하시겠습니까?`)) return;
+
+    const body = JSON.stringify({
+        emp_id: selectBox.value,
+        usage_date: usageDate,
+        item_name: selectedProxyItem,
+        quantity: quantity,
+        room_number: roomNumber
+    });
+    fetch(adminConfig.addUsageUrl, {
+        method: "POST",
+        headers: { "Content-Type": "application/json", "Idempotency-Key": idempotencyKeyFor(body) },
+        body: body
+    })
+        .then(res => res.json())
+        .then(data => {
+            if (data.success) {
+                alert(data.message);
+                // 입력 초기화
+                document.getElementById('proxy-name-input').value = '';
+                selectBox.innerHTML = '<option value="">검색 후 선택해주세요</option>';
+                selectBox.value = '';
+                document.getElementById('proxy-quantity').value = '1';
+                selectedProxyItem = null;
+                updateProxyItemButtons();
+                validateProxyForm();
+                // 페이지 새로고침하여 목록 갱신
+                location.reload();
+            } else {
+                alert("오류: " + data.message);
+            }
+        })
+        .catch(err => alert("서버 오류: " + err));
+}
+
+// --- 일괄 대리 등록 (목록에 담아 한 번에 등록) ---
+const proxyBatch = [];
+
+function addProxyToBatch() {
+    const selectBox = document.getElementById('proxy-user-select');
+    if (!selectBox.value || !selectedProxyItem) {
+        alert('대상자와 상품을 선택해주세요.');
+        return;
+    }
+    proxyBatch.push({
+        label: selectBox.options[selectBox.selectedIndex].text,
+        emp_id: selectBox.value,
+        usage_date: document.getElementById('proxy-date').value,
+        item_name: selectedProxyItem,
+        quantity: Number(document.getElementById('proxy-quantity').value),
+        room_number: document.querySelector('input[name="proxy_room_number"]:checked').value
+    });
+    renderProxyBatch();
+}
+
+function removeProxyBatchItem(index) {
+    proxyBatch.splice(index, 1);
+    renderProxyBatch();
+}
+
+function renderProxyBatch(results) {
+    // results: 일괄 등록 실패 시 서버가 돌려준 항목별 결과 (index 순서)
+    const tbody = document.getElementById('proxy-batch-tbody');
+    document.getElementById('proxy-batch-panel').style.display = proxyBatch.length ? 'block' : 'none';
+    document.getElementById('proxy-batch-count').textContent = proxyBatch.length;
+    tbody.innerHTML = '';
+    proxyBatch.forEach((item, index) => {
+        const tr = document.createElement('tr');
+        const result = results ? results[index] : null;
+        const cells = [
+            item.label,
+            item.usage_date,
+            `${item.room_number}번방`,
+            item.item_name,
+            `${item.quantity}게임`,
+            result ? result.message : '',
+        ];
+        cells.forEach(value => {
+            const td = document.createElement('td');
+            td.style.cssText = 'white-space: nowrap; padding: 8px; text-align: center;';
+            td.textContent = value;
+            tr.appendChild(td);
+        });
+        if (result && !result.success) {
+            tr.lastChild.style.color = '#e74c3c';
+        }
+
+        const manage = document.createElement('td');
+        manage.style.cssText = 'white-space: nowrap; padding: 8px; text-align: center;';
+        const button = document.createElement('button');
+        button.textContent = '빼기';
+        button.style.cssText = 'padding: 4px 8px; font-size: 0.8rem; width: auto;';
+        button.onclick = () => removeProxyBatchItem(index);
+        manage.appendChild(button);
+        tr.appendChild(manage);
+        tbody.appendChild(tr);
+    });
+}
+
+function submitProxyBatch() {
+    if (!proxyBatch.length) return;
+    if (!confirm(`목록의 실적 ${proxyBatch.length}건을 한 번에 등록하시겠습니까?\n한 건이라도 오류가 있으면 모두 등록되지 않습니다.`)) return;
+
+    postAdminBatch({ registrations: proxyBatch.map(({ label, ...item }) => item) })
+        .then(data => {
+            alert(data.message);
+            if (data.success) {
+                proxyBatch.length = 0;
+                renderProxyBatch();
+                searchRecords();
+            } else if (data.results) {
+                renderProxyBatch(data.results.filter(r => r.type === 'register'));
+            }
+        })
+        .catch(err => alert("서버 오류: " + err));
+}
+
+// 일괄 취소/등록 API 호출 (하나의 트랜잭션으로 처리)
+function postAdminBatch(body) {
+    return fetch(adminConfig.batchUrl, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    }).then(res => res.json());
+}
+
+function resetAllData() {
+    if (!confirm('경고: 정말로 모든 데이터를 삭제하고 시스템을 초기화하시겠습니까?\n초기화 직전 상태는 서버의 snapshots 폴더에 백업됩니다.')) return;
+    if (!confirm('마지막 확인: 모든 사원 정보와 이용 내역이 삭제됩니다. 진행하시겠습니까?')) return;
+
+    fetch('/api/admin/reset', {
+        method: 'POST'
+    })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert(data.message);
+                window.location.reload();
+            } else {
+                alert('오류 발생: ' + data.message);
+            }
+        })
+        .catch(err => {
+            console.error(err);
+            alert('서버 통신 오류');
+        });
+}
+
+// --- 관리자 내역 검색(필터) 로직 ---
+function searchFilterUser() {
+    const name = document.getElementById('filter-name-input').value.trim();
+    const selectBox = document.getElementById('filter-user-select');
+
+    if (!name) {
+        alert('검색할 이름을 입력해주세요.');
+        return;
+    }
+
+    fetch(adminConfig.searchUserUrl, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ name: name })
+    })
+        .then(res => res.json())
+        .then(data => {
+            selectBox.innerHTML = '<option value="">검색 후 선택해주세요</option>';
+
+            if (data.success) {
+                if (data.users.length === 0) {
+                    alert('검색 결과가 없습니다.');
+                }
+                data.users.forEach(user => {
+                    const option = document.createElement('option');
+                    option.value = user.emp_id;
+                    option.text = `${user.name} (${user.emp_id})`;
+                    selectBox.appendChild(option);
+                });
+
+                // 1명일때는 자동선택 후 필터적용
+                if (data.users.length === 1) {
+                    selectBox.value = data.users[0].emp_id;
+                    applyFilterUser();
+                }
+            } else {
+                alert(data.message);
+            }
+        })
+        .catch(err => alert("서버 오류: " + err));
+}
+
+function applyFilterUser() {
+    const selectBox = document.getElementById('filter-user-select');
+    const empId = selectBox.value;
+    if (empId) {
+        document.getElementById('search-emp-id').value = empId;
+        searchRecords();
+    }
+}
+
+function resetFilter() {
+    document.getElementById('record-search-form').reset();
+    document.getElementById('search-emp-id').value = '';
+    document.getElementById('filter-name-input').value = '';
+    document.getElementById('filter-user-select').innerHTML = '<option value="">이름 검색 후 선택해주세요</option>';
+    searchRecords();
+}
+
+// --- 이용 내역 검색 (조건 조합, 키셋 페이지 단위로 이어 붙임) ---
+const recordsTbody = document.getElementById('records-tbody');
+const loadMoreButton = document.getElementById('btn-load-more');
+let recordSearchParams = null;
+let recordCursor = null;
+let recordLoading = false;
+// 결과 표의 열 수 (안내 행의 colspan)
+const RECORD_COLUMNS = 10;
+
+function searchRecords() {
+    const params = new URLSearchParams();
+    new FormData(document.getElementById('record-search-form')).forEach((value, key) => {
+        if (value.trim()) params.append(key, value.trim());
+    });
+    recordSearchParams = params;
+    recordCursor = null;
+    showRecordMessage('로딩 중...');
+    document.getElementById('records-scroll').scrollTop = 0;
+    loadRecordPage(true);
+}
+
+function loadMoreRecords() {
+    if (recordCursor) loadRecordPage(false);
+}
+
+function loadRecordPage(isFirstPage) {
+    if (recordLoading) return;
+    recordLoading = true;
+    loadMoreButton.disabled = true;
+
+    const params = new URLSearchParams(recordSearchParams);
+    if (recordCursor) params.set('cursor', recordCursor);
+
+    fetch(`${adminConfig.searchRecordsUrl}?${params}`)
+        .then(res => res.json())
+        .then(data => {
+            if (!data.success) {
+                recordsTbody.innerHTML = '';
+                showRecordMessage(data.message);
+                return;
+            }
+            if (isFirstPage) {
+                recordsTbody.innerHTML = '';
+                document.getElementById('record-check-all').checked = false;
+                const t = data.totals;
+                document.getElementById('search-totals').textContent =
+                    `검색 결과 ${t.records.toLocaleString()}건 / ${t.quantity.toLocaleString()}게임 / ${t.amount.toLocaleString()}원`;
+                if (data.data.length === 0) {
+                    showRecordMessage('조건에 맞는 이용 내역이 없습니다.');
+                }
+            }
+            appendRecordRows(data.data);
+            recordCursor = data.next_cursor;
+            loadMoreButton.style.display = recordCursor ? 'block' : 'none';
+        })
+        .catch(err => {
+            console.error(err);
+            showRecordMessage('서버 통신 오류');
+        })
+        .finally(() => {
+            recordLoading = false;
+            loadMoreButton.disabled = false;
+        });
+}
+
+function showRecordMessage(message) {
+    recordsTbody.innerHTML = '';
+    const tr = document.createElement('tr');
+    const td = document.createElement('td');
+    td.colSpan = RECORD_COLUMNS;
+    td.className = 'text-center';
+    td.textContent = message;
+    tr.appendChild(td);
+    recordsTbody.appendChild(tr);
+}
+
+function appendRecordRows(records) {
+    const fragment = document.createDocumentFragment();
+    records.forEach(r => {
+        const tr = document.createElement('tr');
+        const check = document.createElement('td');
+        check.style.cssText = 'white-space: nowrap; padding: 10px; text-align: center;';
+        if (!r.is_canceled) {
+            const checkbox = document.createElement('input');
+            checkbox.type = 'checkbox';
+            checkbox.className = 'record-check';
+            checkbox.value = r.id;
+            check.appendChild(checkbox);
+        }
+        tr.appendChild(check);
+        const cells = [
+            r.usage_date,
+            r.room_number ? r.room_number : '-',
+            (r.created_at || '').substring(11, 19),
+            r.emp_id,
+            r.name || '',
+            r.item_name,
+            `${r.quantity}게임`,
+            `${r.amount.toLocaleString()}원`,
+        ];
+        cells.forEach(value => {
+            const td = document.createElement('td');
+            td.style.cssText = 'white-space: nowrap; padding: 10px; text-align: center;';
+            td.textContent = value;
+            tr.appendChild(td);
+        });
+
+        const manage = document.createElement('td');
+        manage.style.cssText = 'white-space: nowrap; padding: 10px; text-align: center;';
+        if (r.is_canceled) {
+            manage.textContent = '취소됨';
+            manage.style.color = '#999';
+        } else {
+            const button = document.createElement('button');
+            button.textContent = '취소';
+            button.style.cssText = 'padding: 4px 8px; font-size: 0.8rem; background-color: #e74c3c; color: white; border: none; border-radius: 3px; cursor: pointer;';
+            button.onclick = () => adminCancelRecord(r.id);
+            manage.appendChild(button);
+        }
+        tr.appendChild(manage);
+        fragment.appendChild(tr);
+    });
+    recordsTbody.appendChild(fragment);
+}
+
+searchRecords();
+
+// --- 백그라운드 작업 (엑셀 가져오기/내보내기) ---
+const JOB_KIND_LABELS = { import: '사원 명부 가져오기', export: '이용 내역 내보내기' };
+const JOB_STATUS_LABELS = { queued: '대기 중', running: '진행 중', done: '완료', failed: '실패' };
+const JOB_POLL_INTERVAL = 2000;
+let jobPollTimer = null;
+
+function submitExportJob(form) {
+    const body = {};
+    new FormData(form).forEach((value, key) => { body[key] = value; });
+
+    fetch(adminConfig.jobsUrl, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    })
+        .then(res => res.json())
+        .then(data => {
+            if (data.success) {
+                loadJobs();
+            } else {
+                alert('오류: ' + data.message);
+            }
+        })
+        .catch(err => alert('서버 오류: ' + err));
+}
+
+function loadJobs() {
+    clearTimeout(jobPollTimer);
+    fetch(adminConfig.jobsUrl)
+        .then(res => res.json())
+        .then(data => {
+            if (!data.success) return;
+            renderJobs(data.jobs);
+            // 끝나지 않은 작업이 있는 동안만 폴링
+            if (data.jobs.some(job => job.status === 'queued' || job.status === 'running')) {
+                jobPollTimer = setTimeout(loadJobs, JOB_POLL_INTERVAL);
+            }
+        })
+        .catch(err => console.error(err));
+}
+
+function renderJobs(jobList) {
+    const panel = document.getElementById('job-panel');
+    const tbody = document.getElementById('job-tbody');
+    panel.style.display = jobList.length ? 'block' : 'none';
+    tbody.innerHTML = '';
+
+    jobList.forEach(job => {
+        const tr = document.createElement('tr');
+        let progress = '-';
+        if (job.progress_total) {
+            progress = `${Math.floor(job.progress_done * 100 / job.progress_total)}% (${job.progress_done.toLocaleString()}/${job.progress_total.toLocaleString()})`;
+        } else if (job.status === 'done') {
+            progress = '100%';
+        }
+        const cells = [
+            (job.created_at || '').substring(5, 19),
+            JOB_KIND_LABELS[job.kind] || job.kind,
+            JOB_STATUS_LABELS[job.status] || job.status,
+            progress,
+        ];
+        cells.forEach(value => {
+            const td = document.createElement('td');
+            td.style.cssText = 'white-space: nowrap; padding: 8px; text-align: center;';
+            td.textContent = value;
+            tr.appendChild(td);
+        });
+
+        const result = document.createElement('td');
+        result.style.cssText = 'padding: 8px;';
+        result.textContent = job.message || '';
+        if (job.status === 'failed') result.style.color = '#e74c3c';
+        if (job.status === 'done' && job.file_name) {
+            const link = document.createElement('a');
+            link.href = `${adminConfig.jobsUrl}/${job.id}/download`;
+            link.textContent = ` [${job.file_name} 다운로드]`;
+            result.appendChild(link);
+        }
+        tr.appendChild(result);
+        tbody.appendChild(tr);
+    });
+}
+
+loadJobs();
+
+// --- 관리자 이력 취소 로직 ---
+function adminCancelRecord(recordId) {
+    if (!confirm('이 실적을 관리자 권한으로 삭제(취소)하시겠습니까?\n취소 시 복구할 수 없습니다.')) return;
+
+    fetch(`/api/admin/cancel_record/${recordId}`, {
+        method: 'POST'
+    })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert(data.message);
+                searchRecords(); // 현재 조건으로 다시 조회
+            } else {
+                alert('오류 발생: ' + data.message);
+            }
+        })
+        .catch(err => {
+            console.error(err);
+            alert('서버 통신 오류가 발생했습니다.');
+        });
+}
+
+// --- 선택 항목 일괄 취소 ---
+function toggleAllRecords(checked) {
+    recordsTbody.querySelectorAll('input.record-check').forEach(checkbox => { checkbox.checked = checked; });
+}
+
+function cancelSelectedRecords() {
+    const ids = Array.from(recordsTbody.querySelectorAll('input.record-check:checked'), checkbox => Number(checkbox.value));
+    if (!ids.length) {
+        alert('취소할 내역을 선택해주세요.');
+        return;
+    }
+    if (!confirm(`선택한 ${ids.length}건을 관리자 권한으로 삭제(취소)하시겠습니까?\n취소 시 복구할 수 없습니다.`)) return;
+
+    postAdminBatch({ cancels: ids })
+        .then(data => {
+            if (data.success) {
+                alert(data.message);
+            } else {
+                const failedIds = (data.results || []).filter(r => !r.success).map(r => r.id);
+                alert(`오류 발생: ${data.message}` + (failedIds.length ? `\n실패한 내역: ${failedIds.join(', ')}` : ''));
+            }
+            searchRecords(); // 현재 조건으로 다시 조회
+        })
+        .catch(err => {
+            console.error(err);
+            alert('서버 통신 오류가 발생했습니다.');
+        });
+}
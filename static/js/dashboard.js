@@ -0,0 +1,317 @@
+// 템플릿에서 전달한 URL (script 태그의 data-* 속성)
+const dashboardConfig = document.currentScript.dataset;
+
+// 오늘 날짜 자동 설정
+document.getElementById('usage_date').valueAsDate = new Date();
+
+let cart = [];
+
+function addToCart(name, price) {
+    const existingItem = cart.find(item => item.name === name);
+    if (existingItem) {
+        existingItem.quantity += 1;
+    } else {
+        cart.push({ name: name, price: price, quantity: 1 });
+    }
+    renderCart();
+}
+
+function removeFromCart(index) {
+    cart.splice(index, 1);
+    renderCart();
+}
+
+function updateQty(index, delta) {
+    const item = cart[index];
+    item.quantity += delta;
+    if (item.quantity <= 0) {
+        cart.splice(index, 1);
+    }
+    renderCart();
+}
+
+function renderCart() {
+    const tbody = document.getElementById('cart-tbody');
+    const emptyMsg = document.getElementById('empty-cart-msg');
+    const totalSpan = document.getElementById('total-amount');
+
+    tbody.innerHTML = '';
+
+    if (cart.length === 0) {
+        const tr = document.createElement('tr');
+        tr.innerHTML = '<td colspan="4" style="text-align: center; padding: 20px; color: #999;">상품을 선택해주세요.</td>';
+        tbody.appendChild(tr);
+        totalSpan.textContent = '0';
+        return;
+    }
+
+    let total = 0;
+
+    cart.forEach((item, index) => {
+        const tr = document.createElement('tr');
+        const subtotal = item.price * item.quantity;
+        total += subtotal;
+
+        tr.innerHTML = `
+            <td style="padding: 10px;">${item.name}</td>
+            <td style="padding: 10px;">
+                <div class="qty-control">
+                    <button class="qty-btn" onclick="updateQty(${index}, -1)">-</button>
+                    <input type="number" class="qty-input" value="${item.quantity}" readonly>
+                    <button class="qty-btn" onclick="updateQty(${index}, 1)">+</button>
+                </div>
+            </td>
+            <td style="padding: 10px; text-align: right;">${subtotal.toLocaleString()}원</td>
+            <td style="padding: 10px; text-align: center;">
+                <button class="btn-delete" onclick="removeFromCart(${index})">삭제</button>
+            </td>
+        `;
+        tbody.appendChild(tr);
+    });
+
+    totalSpan.textContent = total.toLocaleString();
+}
+
+function deleteRecord(id) {
+    if (!confirm('해당 이용 내역을 정말 삭제하시겠습니까?')) return;
+
+    // API 요청 (DELETE)
+    fetch(`/api/record/${id}`, { method: 'DELETE' })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert(data.message);
+                window.location.reload();
+            } else {
+                alert('삭제 실패: ' + data.message);
+            }
+        })
+        .catch(err => {
+            console.error(err);
+            alert('오류가 발생했습니다.');
+        });
+}
+
+// 모달 로직
+const modal = document.getElementById('confirmModal');
+const modalBody = document.getElementById('modal-cart-summary');
+const modalTotal = document.getElementById('modal-total-amount');
+
+function openConfirmModal() {
+    if (cart.length === 0) {
+        alert('상품을 담아주세요.');
+        return;
+    }
+
+    const usage_date = document.getElementById('usage_date').value;
+    if (!usage_date) {
+        alert('날짜를 선택해주세요.');
+        return;
+    }
+
+    let html = '<ul style="list-style:none; padding:0; margin:0;">';
+    let total = 0;
+    cart.forEach(item => {
+        let sub = item.price * item.quantity;
+        total += sub;
+        html += `<li style="padding: 8px 0; border-bottom: 1px solid #eee; display:flex; justify-content:space-between;">
+                    <span>${item.name} x ${item.quantity}</span>
+                    <span style="font-weight:bold;">${sub.toLocaleString()}원</span>
+                 </li>`;
+    });
+    html += '</ul>';
+    html = `<div style="margin-bottom:15px; color:#666; font-size:0.9rem;">
+                이용 날짜: <strong>${usage_date}</strong><br>
+                방 번호: <strong>${document.querySelector('input[name="room_number"]:checked').value}번방</strong>
+            </div>` + html;
+
+    modalBody.innerHTML = html;
+    modalTotal.textContent = total.toLocaleString();
+    modal.style.display = 'flex';
+}
+
+function closeConfirmModal() {
+    modal.style.display = 'none';
+}
+
+function finalSubmit() {
+    const usage_date = document.getElementById('usage_date').value;
+    const room_number = document.querySelector('input[name="room_number"]:checked').value;
+    const payload = {
+        usage_date: usage_date,
+        room_number: room_number,
+        cart: cart.map(item => ({
+            item_name: item.name,
+            quantity: item.quantity,
+            price: item.price
+        }))
+    };
+
+    const body = JSON.stringify(payload);
+    fetch(dashboardConfig.addRecordUrl, {
+        method: "POST",
+        headers: { "Content-Type": "application/json", "Idempotency-Key": idempotencyKeyFor(body) },
+        body: body
+    })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert(data.message);
+                window.location.reload();
+            } else {
+                alert('오류: ' + data.message);
+                closeConfirmModal();
+            }
+        })
+        .catch(err => {
+            console.error(err);
+            alert('서버 통신 중 오류가 발생했습니다.');
+            closeConfirmModal();
+        });
+}
+
+// --- 전체 내역 모달 로직 ---
+const historyModal = document.getElementById('historyModal');
+
+// 페이지 단위로 불러와서 스크롤이 끝에 가까워지면 다음 페이지를 이어 붙임
+const historyScroll = document.getElementById('history-scroll');
+let historyCursor = null;
+let historyLoading = false;
+let historyDone = false;
+
+function openHistoryModal() {
+    historyModal.style.display = 'flex';
+    loadHistoryData();
+}
+
+function closeHistoryModal() {
+    historyModal.style.display = 'none';
+}
+
+function loadHistoryData() {
+    const tbody = document.getElementById('history-tbody');
+    tbody.innerHTML = '<tr id="history-status"><td colspan="6" style="text-align:center; padding:20px;">로딩 중...</td></tr>';
+    historyScroll.scrollTop = 0;
+    historyCursor = null;
+    historyDone = false;
+    loadHistoryPage();
+}
+
+function loadHistoryPage() {
+    if (historyLoading || historyDone) return;
+    historyLoading = true;
+
+    const url = historyCursor ? `/api/history?cursor=${encodeURIComponent(historyCursor)}` : '/api/history';
+    fetchHistoryPage(url)
+        .then(data => {
+            if (data.success) {
+                historyCursor = data.next_cursor;
+                historyDone = !historyCursor;
+                appendHistoryRows(data.data);
+            } else {
+                setHistoryStatus(data.message, 'red');
+            }
+        })
+        .catch(err => {
+            console.error(err);
+            setHistoryStatus('오류 발생', 'red');
+        })
+        .finally(() => {
+            historyLoading = false;
+            // 첫 페이지가 스크롤이 생길 만큼 길지 않으면 이어서 로드
+            if (!historyDone && historyModal.style.display !== 'none'
+                && historyScroll.scrollHeight <= historyScroll.clientHeight) {
+                loadHistoryPage();
+            }
+        });
+}
+
+// 페이지 응답을 ETag와 함께 보관했다가 If-None-Match로 재검증 (변경이 없으면 서버가 304만 반환)
+function fetchHistoryPage(url) {
+    const cacheKey = 'history:' + url;
+    let cached = null;
+    try {
+        cached = JSON.parse(sessionStorage.getItem(cacheKey));
+    } catch (e) { }
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+
+    return fetch(url, { headers: headers, cache: 'no-store' })
+        .then(res => {
+            if (res.status === 304 && cached) {
+                return cached.body;
+            }
+            return res.json().then(body => {
+                const etag = res.headers.get('ETag');
+                if (etag && body.success) {
+                    try {
+                        sessionStorage.setItem(cacheKey, JSON.stringify({ etag: etag, body: body }));
+                    } catch (e) { }
+                }
+                return body;
+            });
+        });
+}
+
+function setHistoryStatus(message, color) {
+    const tbody = document.getElementById('history-tbody');
+    let status = document.getElementById('history-status');
+    if (!message) {
+        if (status) status.remove();
+        return;
+    }
+    if (!status) {
+        status = document.createElement('tr');
+        status.id = 'history-status';
+    }
+    status.innerHTML = `<td colspan="6" style="text-align:center; padding:20px; color:${color || '#999'};">${message}</td>`;
+    tbody.appendChild(status);
+}
+
+function appendHistoryRows(records) {
+    const tbody = document.getElementById('history-tbody');
+    const isFirstPage = tbody.querySelectorAll('tr[data-record]').length === 0;
+
+    if (isFirstPage && records.length === 0) {
+        setHistoryStatus('이용 내역이 없습니다.', '#333');
+        return;
+    }
+
+    // 한 번에 붙여서 리플로우를 페이지당 1회로 제한
+    const fragment = document.createDocumentFragment();
+    records.forEach(r => {
+        const tr = document.createElement('tr');
+        tr.dataset.record = r.id;
+        tr.innerHTML = `
+            <td style="padding:10px 5px; border-bottom:1px solid #eee; text-align:center; font-size: 0.9rem;">${r.usage_date}</td>
+            <td style="padding:10px 5px; border-bottom:1px solid #eee; text-align:center; font-size: 0.9rem;">${r.room_number ? r.room_number + '번방' : '-'}</td>
+            <td style="padding:10px 5px; border-bottom:1px solid #eee; text-align:center; font-size: 0.9rem;">${r.item_name}</td>
+            <td style="padding:10px 5px; border-bottom:1px solid #eee; text-align:center; font-size: 0.9rem;">${r.quantity}</td>
+            <td style="padding:10px 5px; border-bottom:1px solid #eee; text-align:center; font-size: 0.9rem; font-weight: bold;">${r.amount.toLocaleString()}원</td>
+            <td style="padding:10px 5px; border-bottom:1px solid #eee; text-align:center;">
+                <button onclick="deleteRecord(this.dataset.id)" data-id="${r.id}" style="background:#ff7675; color:white; border:none; border-radius:4px; padding:1px 4px; cursor:pointer; font-size:0.7rem;">삭제</button>
+            </td>
+        `;
+        fragment.appendChild(tr);
+    });
+    setHistoryStatus(null);
+    tbody.appendChild(fragment);
+    if (!historyDone) {
+        setHistoryStatus('스크롤하면 더 불러옵니다...');
+    }
+}
+
+historyScroll.addEventListener('scroll', () => {
+    if (historyScroll.scrollTop + historyScroll.clientHeight >= historyScroll.scrollHeight - 100) {
+        loadHistoryPage();
+    }
+});
+
+// 모달 닫기 이벤트 통합
+window.onclick = function (event) {
+    if (event.target == modal) {
+        closeConfirmModal();
+    }
+    if (event.target == historyModal) {
+        closeHistoryModal();
+    }
+}
@@ -0,0 +1,19 @@
+// 사용자 대시보드(dashboard.js)와 관리자 화면(admin.js) 공용: 등록 요청 멱등 키 (Idempotency-Key 헤더)
+// 각 화면 스크립트보다 먼저 포함합니다.
+
+// 응답을 못 받고(모바일 연결 끊김 등) 같은 내용을 다시 보내면 같은 키를 보내서 서버가 중복 등록하지 않도록 함
+let submitKey = null;
+let submitBody = null;
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Array.from(crypto.getRandomValues(new Uint8Array(16)), b => b.toString(16).padStart(2, '0')).join('');
+}
+
+function idempotencyKeyFor(body) {
+    if (body !== submitBody) {
+        submitBody = body;
+        submitKey = newIdempotencyKey();
+    }
+    return submitKey;
+}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 저장소 루트의 모듈(database 등)을 pytest 실행 위치와 관계없이 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+"""사원 엑셀/붙여넣기 일괄 등록 (database.bulk_import_employees / import_employees_from_excel)"""
+import pandas as pd
+import pytest
+
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_NAME', str(tmp_path / 'screengolf.db'))
+    database.init_db()
+    yield
+    database.close_pool()
+
+
+def _write_sheet(path, rows, columns):
+    pd.DataFrame(rows, columns=[f'col{i}' for i in range(columns)]).to_excel(path, index=False)
+
+
+def test_excel_with_missing_columns_reports_rows_as_invalid(db, tmp_path):
+    # 사번(11)/이름(12) 열이 없는 시트: 오류 없이 모든 행을 누락으로 집계
+    path = tmp_path / 'short.xlsx'
+    _write_sheet(path, [['a'] * 5, ['b'] * 5], columns=5)
+
+    report = database.import_employees_from_excel(str(path))
+
+    assert report == {'inserted': 0, 'skipped': 0, 'invalid': 2}
+    assert database.upsert_employees_from_excel_file(str(path))[1].startswith('성공')
+
+
+def test_excel_without_name_column(db, tmp_path):
+    path = tmp_path / 'no_name.xlsx'
+    _write_sheet(path, [[None] * 11 + ['1001']], columns=12)
+
+    assert database.import_employees_from_excel(str(path)) == {'inserted': 0, 'skipped': 0, 'invalid': 1}
+
+
+def test_excel_cleans_emp_id_only(db, tmp_path):
+    path = tmp_path / 'employees.xlsx'
+    _write_sheet(path, [[None] * 11 + [1001.0, '홍길동'], [None] * 11 + ['nan', '누락']], columns=13)
+
+    assert database.import_employees_from_excel(str(path)) == {'inserted': 1, 'skipped': 0, 'invalid': 1}
+    assert database.verify_user('1001', '1001') is not None
+
+
+def test_bulk_import_keeps_pasted_passwords_verbatim(db):
+    report = database.bulk_import_employees(['100', '101'], ['가', '나'], [' pw1.0 ', ''])
+
+    assert report == {'inserted': 2, 'skipped': 0, 'invalid': 0}
+    assert database.verify_user('100', 'pw1.0') is not None
+    assert database.verify_user('101', '101') is not None
+
+
+def test_bulk_import_without_passwords_column(db):
+    report = database.bulk_import_employees(['200'], ['다'])
+
+    assert report['inserted'] == 1
+    assert database.verify_user('200', '200') is not None
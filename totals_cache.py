@@ -0,0 +1,51 @@
+"""
+관리자 검색의 건수/합계 캐시 (프로세스 내 LRU).
+검색 조건별 database.get_usage_totals() 결과를 보관하다가, database.DataVersionWatcher로 본
+운영 DB와 보관 DB의 data_version이 바뀌면 - 이 프로세스나 다른 워커가 무엇이든 커밋하면 - 다음 조회 때 모두 버립니다.
+같은 조건으로 페이지를 넘기거나 새로고침할 때는 합계 쿼리를 다시 실행하지 않습니다.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import database
+
+MAX_ENTRIES = int(os.environ.get('TOTALS_CACHE_SIZE', 256))
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # 조건 키 -> 합계 dict
+_version = None
+_watcher = database.DataVersionWatcher(('main', 'archive'))
+
+
+def get_totals(filters):
+    """normalize_usage_filters() 결과에 대한 {'records', 'quantity', 'amount'} (캐시 사용)"""
+    global _version
+    key = tuple(sorted(filters.items()))
+    with _lock:
+        version = _watcher.version()
+        if version != _version:
+            _entries.clear()
+            _version = version
+        cached = _entries.get(key)
+        if cached is not None:
+            _entries.move_to_end(key)
+            return dict(cached)
+
+    totals = database.get_usage_totals(filters)
+    with _lock:
+        # 집계하는 동안 다른 변경이 감지되어 캐시가 비워졌다면 저장하지 않음
+        if _version == version:
+            _entries[key] = totals
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+    return dict(totals)
+
+
+def reset():
+    """전용 커넥션까지 닫습니다. (DB 파일 교체 등)"""
+    global _version
+    with _lock:
+        _watcher.close()
+        _version = None
+        _entries.clear()
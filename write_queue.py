@@ -0,0 +1,206 @@
+"""
+이용 내역 쓰기 파이프라인 (group commit, 선택 기능).
+WRITE_QUEUE_ENABLED=1이면 프로세스당 하나의 writer 스레드가 요청들의 등록/취소를 모아
+하나의 트랜잭션(BEGIN IMMEDIATE ... COMMIT)으로 처리합니다.
+요청 스레드는 자기 작업이 커밋될 때까지 기다렸다가 결과를 받으므로 API는 그대로 동기식이며,
+응답 시점에는 이미 커밋(영속화)되어 있습니다.
+
+- 작업마다 SAVEPOINT를 사용하므로 한 작업이 실패해도 같은 묶음의 다른 작업은 커밋됩니다.
+- 큐가 비어 있으면 바로 커밋하고, 쌓여 있으면 최대 WRITE_QUEUE_MAX_GROUP건까지 묶습니다.
+  WRITE_QUEUE_WINDOW_MS만큼 추가로 기다려 더 모을 수 있습니다. (기본 2ms)
+- 꺼져 있으면 아래 함수들은 database의 같은 이름 함수를 그대로 호출합니다.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import datetime
+
+import database
+
+ENABLED = os.environ.get('WRITE_QUEUE_ENABLED', '0') == '1'
+WINDOW = float(os.environ.get('WRITE_QUEUE_WINDOW_MS', 2)) / 1000
+MAX_GROUP = int(os.environ.get('WRITE_QUEUE_MAX_GROUP', 64))
+# 요청이 결과를 기다리는 최대 시간 (기존 sqlite3 timeout과 동일)
+RESULT_TIMEOUT = 30
+
+_lock = threading.Lock()
+_writer = None
+
+
+class _Job:
+    __slots__ = ('kind', 'args', 'future')
+
+    def __init__(self, kind, args):
+        self.kind = kind
+        self.args = args
+        self.future = Future()
+
+    @property
+    def failure(self):
+        return None if self.kind in ('insert', 'insert_once') else False
+
+    def apply(self, conn, now):
+        if self.kind == 'insert':
+            return database._insert_usage_records(conn, self.args[0], now)
+        if self.kind == 'insert_once':
+            return database._insert_usage_records_once(conn, self.args[0], now, self.args[1])
+        record_id, emp_id = self.args
+        return database._cancel_usage_record(conn, record_id, emp_id, now)
+
+
+class _Writer:
+    def __init__(self):
+        self.pid = os.getpid()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='usage-writer', daemon=True)
+        self.groups = 0
+        self.jobs = 0
+        self.thread.start()
+
+    def submit(self, job):
+        self.queue.put(job)
+        return job.future
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join(timeout=RESULT_TIMEOUT)
+
+    def _collect(self, first):
+        """첫 작업에 이어 이미 쌓인 작업(+ WINDOW 동안 들어온 작업)을 묶음으로 반환. None은 종료 신호"""
+        batch = [first]
+        deadline = time.monotonic() + WINDOW
+        while len(batch) < MAX_GROUP:
+            try:
+                job = self.queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            batch, stopping = self._collect(job)
+            self._commit_group(batch)
+            if stopping:
+                return
+
+    def _commit_group(self, batch):
+        # 기다리다 시간 초과로 취소된 작업은 건너뜀 (요청에는 이미 실패로 응답함)
+        # 여기서 실행 중으로 표시된 작업은 더 이상 취소되지 않으므로 요청이 결과를 끝까지 기다림
+        batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        conn = database.get_pool().acquire()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # 쓰기 잠금을 얻은 뒤의 시각 (잠금을 기다리는 동안 다른 쓰기가 더 늦은 취소일시로 먼저 커밋하지 않도록,
+            # 증분 내보내기 워터마크 기준)
+            now = datetime.now(database.KST)
+            for job in batch:
+                conn.execute('SAVEPOINT job')
+                try:
+                    results.append(job.apply(conn, now))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO job')
+                    print(f"Error in queued {job.kind}: {e}")
+                    results.append(job.failure)
+                conn.execute('RELEASE job')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Error committing write group ({len(batch)} jobs): {e}")
+            results = [job.failure for job in batch]
+        finally:
+            conn.close()
+
+        self.groups += 1
+        self.jobs += len(batch)
+        for job, result in zip(batch, results):
+            if not job.future.done():
+                job.future.set_result(result)
+
+
+def _get_writer():
+    global _writer
+    writer = _writer
+    if writer is None or writer.pid != os.getpid():
+        with _lock:
+            if _writer is None or _writer.pid != os.getpid():
+                # fork된 자식은 부모의 스레드를 물려받지 않으므로 새로 시작
+                _writer = _Writer()
+            writer = _writer
+    return writer
+
+
+def _wait(job):
+    future = _get_writer().submit(job)
+    try:
+        return future.result(timeout=RESULT_TIMEOUT)
+    except FutureTimeout:
+        # 아직 시작 전이면 취소해서 writer가 건너뛰게 함 (실패로 응답한 뒤 나중에 커밋되면 재전송 시 중복 등록)
+        if future.cancel():
+            print(f"Timed out waiting for queued {job.kind}")
+            return job.failure
+        # 이미 커밋 중인 작업은 결과를 그대로 기다림 (SQLite 잠금 대기 시간 안에 끝남)
+        return future.result()
+
+
+def add_usage_records_batch(records):
+    """database.add_usage_records_batch와 동일 (성공 시 새 id 목록, 실패 시 None)"""
+    if not ENABLED:
+        return database.add_usage_records_batch(records)
+    if not records:
+        return []
+    return _wait(_Job('insert', (records,)))
+
+
+def add_usage_records_once(records, idempotency):
+    """database.add_usage_records_once와 동일 (멱등 키 기록도 같은 트랜잭션)"""
+    if not ENABLED:
+        return database.add_usage_records_once(records, idempotency)
+    return _wait(_Job('insert_once', (records, idempotency)))
+
+
+def delete_usage_record(record_id, emp_id):
+    """database.delete_usage_record와 동일 (본인 내역만 취소)"""
+    if not ENABLED:
+        return database.delete_usage_record(record_id, emp_id)
+    return bool(_wait(_Job('cancel', (record_id, emp_id))))
+
+
+def admin_cancel_usage_record(record_id):
+    """database.admin_cancel_usage_record와 동일 (사번 검증 없음)"""
+    if not ENABLED:
+        return database.admin_cancel_usage_record(record_id)
+    return bool(_wait(_Job('cancel', (record_id, None))))
+
+
+def stats():
+    """현재 프로세스 writer의 누적 묶음/작업 수 (묶음당 평균 작업 수 확인용)"""
+    writer = _writer
+    if writer is None or writer.pid != os.getpid():
+        return {'enabled': ENABLED, 'groups': 0, 'jobs': 0, 'pending': 0}
+    return {'enabled': ENABLED, 'groups': writer.groups, 'jobs': writer.jobs, 'pending': writer.queue.qsize()}
+
+
+@atexit.register
+def _shutdown():
+    """종료 시 남은 작업을 커밋하고 writer 스레드 정리"""
+    writer = _writer
+    if writer is not None and writer.pid == os.getpid():
+        writer.stop()